@@ -0,0 +1,199 @@
+import asyncio
+import base64
+import io
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo import DeleteOne, ReplaceOne
+from starlette.concurrency import run_in_threadpool
+
+from images import downscale_image
+from jobs import Lease, yield_to_foreground
+from metrics import archived_documents
+
+ARCHIVE_ENABLED = os.environ.get("ARCHIVE_ENABLED", "true").lower() == "true"
+# Finished orders and decided submissions older than this move to the archive collections
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", 30))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get("ARCHIVE_INTERVAL_SECONDS", 3600))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 200))
+# Pause between batches, so archival never holds more than a sliver of the pool or the loop
+ARCHIVE_PAUSE_MS = float(os.environ.get("ARCHIVE_PAUSE_MS", 250))
+# thumbnail | drop: what happens to submission photos on the way to the archive
+ARCHIVE_SUBMISSION_IMAGES = os.environ.get("ARCHIVE_SUBMISSION_IMAGES", "thumbnail")
+ARCHIVE_THUMBNAIL_SIDE = int(os.environ.get("ARCHIVE_THUMBNAIL_SIDE", 256))
+
+logger = logging.getLogger("archive")
+
+
+def compact_image(image_base64: str, mode: str = ARCHIVE_SUBMISSION_IMAGES) -> str:
+    """A small JPEG thumbnail of a submission photo, or "" when dropped or undecodable. Blocking."""
+    if mode != "thumbnail" or not image_base64:
+        return ""
+    try:
+        data = base64.b64decode(image_base64)
+        return base64.b64encode(downscale_image(io.BytesIO(data), ARCHIVE_THUMBNAIL_SIDE, quality=60)).decode()
+    except Exception:
+        return ""
+
+
+def archived_order(doc: dict) -> dict:
+    # Nobody accepted it in time, so the order can no longer be served
+    status = "expired" if doc["status"] == "pending" else doc["status"]
+    return {**doc, "status": status}
+
+
+def archived_submission(doc: dict) -> dict:
+    return {**doc, "image_base64": compact_image(doc.get("image_base64", ""))}
+
+
+class ArchiveRule:
+    """Which documents of a hot collection are finished, and how they look once archived."""
+
+    def __init__(self, collection: str, archive: str, query: Callable[[str], dict], transform: Callable[[dict], dict],
+                 blocking: bool = False):
+        self.collection = collection
+        self.archive = archive
+        self.query = query
+        self.transform = transform
+        # Run the transform in the thread pool (image decoding)
+        self.blocking = blocking
+
+
+ARCHIVE_RULES = [
+    ArchiveRule(
+        "taxi_orders", "taxi_orders_archive",
+        # Accepted rides are over long before the cut-off; pending ones that old were never picked up
+        lambda cutoff: {"status": {"$in": ["accepted", "pending"]}, "created_at": {"$lt": cutoff}},
+        archived_order,
+    ),
+    ArchiveRule(
+        "task_submissions", "task_submissions_archive",
+        lambda cutoff: {"status": {"$in": ["approved", "rejected", "error"]}, "created_at": {"$lt": cutoff}},
+        archived_submission,
+        blocking=True,
+    ),
+]
+
+
+class Archiver:
+    """Moves finished documents from the hot collections to archive collections in small, paced batches.
+
+    Each batch is upserted into the archive before it is deleted from the hot
+    collection, so an interrupted run repeats work instead of losing documents,
+    and counts over hot plus archive stay exact. A document that changed
+    between the copy and the delete stays hot and its copy is withdrawn. One
+    worker at a time holds the ``archival`` lease in ``jobs`` and schedules
+    passes; every pass, scheduled or started by an admin, runs under the
+    ``archival-pass`` lease so two never overlap. Batches wait while requests
+    are queueing for a Mongo connection.
+    """
+
+    def __init__(self, db, rules: List[ArchiveRule] = ARCHIVE_RULES, after_days: float = ARCHIVE_AFTER_DAYS,
+                 batch_size: int = ARCHIVE_BATCH_SIZE, pause_ms: float = ARCHIVE_PAUSE_MS,
+                 interval_seconds: float = ARCHIVE_INTERVAL_SECONDS):
+        self.db = db
+        self.rules = rules
+        self.after = timedelta(days=after_days)
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.interval = interval_seconds
+        self.lease = Lease(db.jobs, "archival", interval_seconds)
+        self.pass_lease = Lease(db.jobs, "archival-pass", interval_seconds)
+        self._running = asyncio.Lock()
+        self.last_run: Optional[dict] = None
+        self._indexed = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        if not self._indexed:
+            for rule in self.rules:
+                await self.db[rule.collection].create_index([("status", 1), ("created_at", 1)])
+                await self.db[rule.archive].create_index("id", unique=True)
+                await self.db[rule.archive].create_index("status")
+                await self.db[rule.archive].create_index([("created_at", 1), ("id", 1)])
+            self._indexed = True
+
+    async def _archive_batch(self, rule: ArchiveRule, cutoff: str) -> int:
+        query = rule.query(cutoff)
+        docs = await self.db[rule.collection].find(query, {"_id": 0}).sort("created_at", 1).to_list(self.batch_size)
+        if not docs:
+            return 0
+        if rule.blocking:
+            archived = await run_in_threadpool(lambda: [rule.transform(doc) for doc in docs])
+        else:
+            archived = [rule.transform(doc) for doc in docs]
+        now = datetime.now(timezone.utc).isoformat()
+        await self.db[rule.archive].bulk_write(
+            [ReplaceOne({"id": doc["id"]}, {**doc, "archived_at": now}, upsert=True) for doc in archived],
+            ordered=False,
+        )
+
+        ids = [doc["id"] for doc in docs]
+        # Only documents still in the state that was copied; e.g. an order accepted meanwhile stays hot
+        result = await self.db[rule.collection].bulk_write(
+            [DeleteOne({"id": doc["id"], "status": doc["status"]}) for doc in docs], ordered=False)
+        if result.deleted_count < len(ids):
+            # Updated since we read it (e.g. a driver accepted the order, or its id was migrated): it stays hot
+            kept = [
+                doc["id"] if doc["id"] in ids else doc["legacy_id"]
+                async for doc in self.db[rule.collection].find(
+                    {"$or": [{"id": {"$in": ids}}, {"legacy_id": {"$in": ids}}]}, {"id": 1, "legacy_id": 1})
+            ]
+            await self.db[rule.archive].delete_many({"id": {"$in": kept}})
+        archived_documents.inc(rule.collection, amount=result.deleted_count)
+        return result.deleted_count
+
+    async def run_once(self) -> Dict[str, int]:
+        """One full pass over every rule; returns the number of documents archived per collection."""
+        await self.ensure_indexes()
+        cutoff = (datetime.now(timezone.utc) - self.after).isoformat()
+        moved = {}
+        for rule in self.rules:
+            moved[rule.collection] = 0
+            while True:
+                count = await self._archive_batch(rule, cutoff)
+                moved[rule.collection] += count
+                if count < self.batch_size:
+                    break
+                await yield_to_foreground(self.pause)
+        self.last_run = {"finished_at": datetime.now(timezone.utc).isoformat(), "archived": moved}
+        return moved
+
+    async def run_exclusive(self) -> Optional[Dict[str, int]]:
+        """``run_once`` unless a pass is already running in any worker, in which case None."""
+        if self._running.locked():
+            return None
+        async with self._running:
+            if not await self.pass_lease.acquire():
+                return None
+            try:
+                return await self.run_once()
+            finally:
+                await self.pass_lease.release()
+
+    async def _loop(self):
+        # Let startup and warmup finish first
+        await asyncio.sleep(min(self.interval, 60))
+        while True:
+            try:
+                if await self.lease.acquire():
+                    moved = await self.run_exclusive()
+                    if moved and any(moved.values()):
+                        logger.info(f"Archived {moved}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Archival pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if ARCHIVE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.lease.release()
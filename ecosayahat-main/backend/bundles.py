@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from catalog import CatalogPayload
+from serialization import dumps
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; bundles are always available as JSON
+    msgpack = None
+
+BUNDLE_LANGUAGES = ("ru", "en", "kz")
+# Charging stations this close to any attraction of a region ship with its bundle
+BUNDLE_STATION_RADIUS_KM = float(os.environ.get("BUNDLE_STATION_RADIUS_KM", 150))
+# How long old bundle versions stay usable as a delta base
+BUNDLE_HISTORY_DAYS = float(os.environ.get("BUNDLE_HISTORY_DAYS", 90))
+BUNDLE_DELTA_CACHE_SIZE = int(os.environ.get("BUNDLE_DELTA_CACHE_SIZE", 512))
+# Manifests of earlier versions kept in memory as delta bases; the rest are read back from Mongo
+BUNDLE_MANIFEST_CACHE_SIZE = int(os.environ.get("BUNDLE_MANIFEST_CACHE_SIZE", 256))
+
+BUNDLE_FORMATS = {"json": "application/json", "msgpack": "application/x-msgpack"}
+LOCALIZED_SUFFIXES = tuple(f"_{lang}" for lang in BUNDLE_LANGUAGES)
+
+logger = logging.getLogger("bundles")
+
+Manifest = Dict[str, str]
+
+
+def localize(doc: dict, language: str) -> dict:
+    """Keep only ``language`` of the ``*_ru/_en/_kz`` fields, falling back to English when it is empty."""
+    out = {}
+    for key, value in doc.items():
+        if key.endswith(LOCALIZED_SUFFIXES):
+            base = key[:-3]
+            if key.endswith(f"_{language}"):
+                out[key] = value or doc.get(f"{base}_en", "")
+        else:
+            out[key] = value
+    return out
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def region_content(catalog, region: dict, language: str) -> Dict[str, List[dict]]:
+    attractions = [a for a in catalog.attractions if a["region_id"] == region["id"]]
+    stations = [
+        s for s in catalog.charging_stations
+        if any(distance_km(s["latitude"], s["longitude"], a["latitude"], a["longitude"]) <= BUNDLE_STATION_RADIUS_KM
+               for a in attractions)
+    ]
+    content = {
+        "regions": [region],
+        "attractions": attractions,
+        "hotels": [h for h in catalog.hotels if h["region_id"] == region["id"]],
+        "tasks": catalog.tasks,
+        "charging_stations": stations,
+    }
+    return {name: [localize(doc, language) for doc in docs] for name, docs in content.items()}
+
+
+def content_manifest(content: Dict[str, List[dict]]) -> Manifest:
+    """``"collection:id" -> hash`` of every entity; two versions differ exactly where their hashes do."""
+    return {
+        f"{name}:{doc['id']}": hashlib.sha1(dumps(doc)).hexdigest()[:12]
+        for name, docs in content.items() for doc in docs
+    }
+
+
+def manifest_version(region_id: str, language: str, manifest: Manifest) -> str:
+    digest = hashlib.sha1(f"{region_id}:{language}".encode())
+    for key in sorted(manifest):
+        digest.update(f"{key}={manifest[key]};".encode())
+    return digest.hexdigest()[:16]
+
+
+def image_urls(content: Dict[str, List[dict]]) -> List[str]:
+    """Images the app can prefetch for offline use, in bundle order."""
+    return list(dict.fromkeys(doc["image_url"] for docs in content.values() for doc in docs if doc.get("image_url")))
+
+
+def encode(data, fmt: str) -> CatalogPayload:
+    if fmt == "msgpack":
+        return CatalogPayload(data, encoder=msgpack.packb, media_type=BUNDLE_FORMATS["msgpack"])
+    return CatalogPayload(data)
+
+
+class RegionBundle:
+    __slots__ = ("region_id", "language", "version", "content", "manifest", "payloads")
+
+    def __init__(self, region_id: str, language: str, content: Dict[str, List[dict]]):
+        self.region_id = region_id
+        self.language = language
+        self.content = content
+        self.manifest = content_manifest(content)
+        self.version = manifest_version(region_id, language, self.manifest)
+        self.payloads: Dict[str, CatalogPayload] = {}
+
+    def full(self) -> dict:
+        return {
+            "region_id": self.region_id,
+            "language": self.language,
+            "version": self.version,
+            "delta": False,
+            "collections": self.content,
+            "images": image_urls(self.content),
+        }
+
+    def delta(self, since: str, base: Manifest) -> dict:
+        changed: Dict[str, List[dict]] = {}
+        for name, docs in self.content.items():
+            for doc in docs:
+                key = f"{name}:{doc['id']}"
+                if base.get(key) != self.manifest[key]:
+                    changed.setdefault(name, []).append(doc)
+        removed: Dict[str, List[str]] = {}
+        for key in base.keys() - self.manifest.keys():
+            name, doc_id = key.split(":", 1)
+            removed.setdefault(name, []).append(doc_id)
+        return {
+            "region_id": self.region_id,
+            "language": self.language,
+            "version": self.version,
+            "since": since,
+            "delta": True,
+            "collections": changed,
+            "removed": removed,
+            "images": image_urls(changed),
+        }
+
+
+class BundleBuilder:
+    """Per-region, per-language offline bundles of the catalog, versioned by a hash of their content.
+
+    Bundles are rebuilt when the catalog version changes; serialized and
+    compressed forms are made on first request and kept until then. The
+    entity manifest of every version is stored in ``collection`` so that a
+    client holding any recent version, from any worker or before a restart,
+    receives only what changed since.
+    """
+
+    def __init__(self, catalog, collection, history_days: float = BUNDLE_HISTORY_DAYS):
+        self.catalog = catalog
+        self.collection = collection
+        self.history = timedelta(days=history_days)
+        self.version = None
+        self.bundles: Dict[Tuple[str, str], RegionBundle] = {}
+        self._manifests: Dict[Tuple[str, str, str], Manifest] = {}
+        self._deltas: Dict[Tuple[str, str, str], CatalogPayload] = {}
+        self._unsaved: List[RegionBundle] = []
+        self._indexed = False
+
+    def sync(self):
+        if self.version == self.catalog.version:
+            return
+        bundles = {}
+        for region in self.catalog.regions:
+            for language in BUNDLE_LANGUAGES:
+                bundle = RegionBundle(region["id"], language, region_content(self.catalog, region, language))
+                previous = self.bundles.get((region["id"], language))
+                # Unchanged bundles keep their encoded payloads
+                bundles[(region["id"], language)] = previous if previous and previous.version == bundle.version else bundle
+        # Bundles of the previous version whose manifest is still unsaved stay queued: clients may already hold them
+        self._unsaved += [b for key, b in bundles.items() if self.bundles.get(key) is not b]
+        self.bundles = bundles
+        self._deltas = {}
+        self.version = self.catalog.version
+
+    async def _save_manifests(self):
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        expires_at = datetime.now(timezone.utc) + self.history
+        # Each bundle leaves the queue only once its manifest is stored, so a failed write is retried next time
+        for bundle in list(self._unsaved):
+            await self.collection.update_one(
+                {"_id": bundle.version},
+                {
+                    "$setOnInsert": {"region_id": bundle.region_id, "language": bundle.language, "manifest": bundle.manifest},
+                    # A version that comes back into use stays available as a base for longer
+                    "$set": {"expires_at": expires_at},
+                },
+                upsert=True,
+            )
+            self._remember(bundle.region_id, bundle.language, bundle.version, bundle.manifest)
+            if bundle in self._unsaved:
+                self._unsaved.remove(bundle)
+
+    def _remember(self, region_id: str, language: str, version: str, manifest: Manifest):
+        if len(self._manifests) >= BUNDLE_MANIFEST_CACHE_SIZE:
+            self._manifests.clear()
+        self._manifests[(region_id, language, version)] = manifest
+
+    async def _base_manifest(self, bundle: RegionBundle, since: str) -> Optional[Manifest]:
+        manifest = self._manifests.get((bundle.region_id, bundle.language, since))
+        if manifest is None:
+            try:
+                doc = await self.collection.find_one(
+                    {"_id": since, "region_id": bundle.region_id, "language": bundle.language}, {"manifest": 1})
+            except Exception as e:
+                logger.warning(f"Could not load bundle manifest {since}, sending the full bundle: {e}")
+                return None
+            if doc is None:
+                return None
+            manifest = doc["manifest"]
+            self._remember(bundle.region_id, bundle.language, since, manifest)
+        return manifest
+
+    async def payload(self, region_id: str, language: str, since: Optional[str] = None, fmt: str = "json") -> Optional[CatalogPayload]:
+        """The bundle, or a delta from ``since`` when that version is known; None for an unknown region."""
+        self.sync()
+        if self._unsaved:
+            try:
+                await self._save_manifests()
+            except Exception as e:
+                # The bundles are already in memory; unsaved manifests stay queued for the next request
+                logger.warning(f"Could not save bundle manifests, {len(self._unsaved)} queued: {e}")
+        bundle = self.bundles.get((region_id, language))
+        if bundle is None:
+            return None
+
+        if since:
+            key = (bundle.version, since, fmt)
+            payload = self._deltas.get(key)
+            if payload is None:
+                base = bundle.manifest if since == bundle.version else await self._base_manifest(bundle, since)
+                if base is not None:
+                    if len(self._deltas) >= BUNDLE_DELTA_CACHE_SIZE:
+                        self._deltas.clear()
+                    payload = self._deltas[key] = encode(bundle.delta(since, base), fmt)
+            # An unknown or expired base falls through to the full bundle
+            if payload is not None:
+                return payload
+
+        payload = bundle.payloads.get(fmt)
+        if payload is None:
+            payload = bundle.payloads[fmt] = encode(bundle.full(), fmt)
+        return payload
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import Request, Response
+
+from models import Region, Attraction, Hotel, Task, ChargingStation
+from database import deadline
+from compression import GZIP_MIN_SIZE, compress, negotiate_encoding, supported_encodings
+from serialization import dumps
+
+CATALOG_COLLECTIONS = {
+    "regions": Region,
+    "attractions": Attraction,
+    "hotels": Hotel,
+    "tasks": Task,
+    "charging_stations": ChargingStation,
+}
+
+# Catalog payloads are compressed once per build, so spend the CPU on the best ratio
+PRECOMPRESS_LEVELS = {"br": 11, "gzip": 9}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match list, as RFC 9110 prescribes for GET."""
+    if not if_none_match:
+        return False
+    tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+class CatalogPayload:
+    """A serialized catalog response with its gzip/Brotli variants kept in memory."""
+
+    __slots__ = ("body", "etag", "variants", "media_type")
+
+    def __init__(self, data, encoder: Callable[[Any], bytes] = dumps, media_type: str = "application/json"):
+        self.body = encoder(data)
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.variants: Dict[str, bytes] = {}
+        if len(self.body) >= GZIP_MIN_SIZE:
+            for encoding in supported_encodings():
+                compressed = compress(self.body, encoding, level=PRECOMPRESS_LEVELS[encoding])
+                if len(compressed) < len(self.body):
+                    self.variants[encoding] = compressed
+
+    @classmethod
+    def restore(cls, etag: str, body, variants: Dict) -> "CatalogPayload":
+        """A payload over already serialized buffers, e.g. slices of a mapped snapshot."""
+        payload = cls.__new__(cls)
+        payload.etag = etag
+        payload.body = body
+        payload.variants = variants
+        payload.media_type = "application/json"
+        return payload
+
+    def response(self, request: Request) -> Response:
+        body = self.body
+        etag = self.etag
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding in self.variants:
+            body = self.variants[encoding]
+            # Each encoding is its own representation with its own bytes, so it gets its own strong tag
+            etag = f'{self.etag[:-1]}-{encoding}"'
+            headers["Content-Encoding"] = encoding
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        # bytes() copies snapshot slices for this response only; plain bytes pass through as-is
+        return Response(content=bytes(body), media_type=self.media_type, headers=headers)
+
+
+EMPTY_LIST = CatalogPayload([])
+
+
+class Catalog:
+    """In-memory snapshot of the reference collections (regions, attractions, hotels, tasks, stations).
+
+    The snapshot is built on first use, seeding empty collections, and stays
+    until ``invalidate`` is called after the reference data changes. With a
+    ``SharedSnapshot`` one worker builds and the others map its result, and an
+    invalidation in any worker reaches all of them.
+    """
+
+    def __init__(self, db, seeders: Dict[str, Callable[[], Awaitable[None]]], read_db=None, snapshot=None):
+        self.db = db
+        self.read_db = read_db if read_db is not None else db
+        self.seeders = seeders
+        self.snapshot = snapshot
+        self.version = 0
+        self._lock = asyncio.Lock()
+        self._payloads: Optional[Dict[str, CatalogPayload]] = None
+
+        self.regions: List[dict] = []
+        self.attractions: List[dict] = []
+        self.hotels: List[dict] = []
+        self.tasks: List[dict] = []
+        self.charging_stations: List[dict] = []
+        self.attractions_by_id: Dict[str, dict] = {}
+        self.hotels_by_id: Dict[str, dict] = {}
+        self.tasks_by_id: Dict[str, dict] = {}
+
+    @property
+    def is_built(self) -> bool:
+        return self._payloads is not None
+
+    def _is_current(self) -> bool:
+        return self._payloads is not None and (self.snapshot is None or self.snapshot.is_current(self.version))
+
+    async def ensure(self) -> "Catalog":
+        if not self._is_current():
+            async with self._lock:
+                if not self._is_current():
+                    if self.snapshot is None:
+                        await self._build()
+                    else:
+                        await self._refresh_shared()
+        return self
+
+    def invalidate(self):
+        self._payloads = None
+        if self.snapshot is not None:
+            self.snapshot.invalidate()
+
+    def payload(self, key: str, default: Optional[CatalogPayload] = None) -> Optional[CatalogPayload]:
+        return self._payloads.get(key, default)
+
+    async def _load(self, name: str) -> List[dict]:
+        with deadline("catalog"):
+            docs = await self.read_db[name].find({}, {"_id": 0}).to_list(None)
+            if not docs:
+                # A lagging secondary may still be empty; only the primary decides about seeding
+                docs = await self.db[name].find({}, {"_id": 0}).to_list(None)
+        if not docs and name in self.seeders:
+            await self.seeders[name]()
+            docs = await self.db[name].find({}, {"_id": 0}).to_list(None)
+        model = CATALOG_COLLECTIONS[name]
+        return [model(**doc).model_dump() for doc in docs]
+
+    async def _load_all(self) -> Dict[str, List[dict]]:
+        data = {}
+        # Sequential on purpose: seeding regions also seeds attractions
+        for name in CATALOG_COLLECTIONS:
+            data[name] = await self._load(name)
+        return data
+
+    def _adopt(self, data: Dict[str, List[dict]]):
+        self.regions = data["regions"]
+        self.attractions = data["attractions"]
+        self.hotels = data["hotels"]
+        self.tasks = data["tasks"]
+        self.charging_stations = data["charging_stations"]
+        self.attractions_by_id = {a["id"]: a for a in self.attractions}
+        self.hotels_by_id = {h["id"]: h for h in self.hotels}
+        self.tasks_by_id = {t["id"]: t for t in self.tasks}
+
+    def _make_payloads(self) -> Dict[str, CatalogPayload]:
+        attractions_by_region = defaultdict(list)
+        for attraction in self.attractions:
+            attractions_by_region[attraction["region_id"]].append(attraction)
+        hotels_by_region = defaultdict(list)
+        for hotel in self.hotels:
+            hotels_by_region[hotel["region_id"]].append(hotel)
+
+        payloads = {
+            "regions": CatalogPayload(self.regions),
+            "tasks": CatalogPayload(self.tasks),
+            "charging_stations": CatalogPayload(self.charging_stations),
+        }
+        for region_id, attractions in attractions_by_region.items():
+            payloads[f"attractions:{region_id}"] = CatalogPayload(attractions)
+        for region_id, hotels in hotels_by_region.items():
+            payloads[f"hotels:{region_id}"] = CatalogPayload(hotels)
+        for attraction in self.attractions:
+            payloads[f"attraction:{attraction['id']}"] = CatalogPayload(attraction)
+        return payloads
+
+    async def _build(self):
+        self._adopt(await self._load_all())
+        payloads = self._make_payloads()
+        self.version += 1
+        self._payloads = payloads
+        logging.info(f"Catalog v{self.version} built: {len(payloads)} payloads")
+
+    async def _refresh_shared(self):
+        generation = self.snapshot.fresh_generation()
+        if generation is None:
+            async with self.snapshot.build_lock():
+                # Another worker may have published while we waited for the lock
+                generation = self.snapshot.fresh_generation()
+                if generation is None:
+                    epoch = self.snapshot.epoch
+                    data = await self._load_all()
+                    self._adopt(data)
+                    payloads = self._make_payloads()
+                    self.version = self.snapshot.publish(epoch, data, payloads)
+                    self._payloads = payloads
+                    logging.info(f"Catalog v{self.version} built and shared: {len(payloads)} payloads")
+                    return
+
+        parts = self.snapshot.read(generation)
+        self._adopt(parts.collections)
+        self._payloads = {
+            key: CatalogPayload.restore(etag, body, variants) for key, (etag, body, variants) in parts.payloads.items()
+        }
+        self.version = generation
+        logging.info(f"Catalog v{self.version} mapped from shared snapshot")
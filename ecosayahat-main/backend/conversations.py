@@ -0,0 +1,119 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from metrics import estimate_tokens
+
+CHAT_HISTORY_MAX_MESSAGES = int(os.environ.get("CHAT_HISTORY_MAX_MESSAGES", 40))
+CHAT_HISTORY_TTL_HOURS = float(os.environ.get("CHAT_HISTORY_TTL_HOURS", 72))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get("CHAT_HISTORY_TOKEN_BUDGET", 1200))
+# Longer messages are cut before storage; the history is context, not an archive
+CHAT_MESSAGE_MAX_CHARS = 2000
+
+# Constant so providers can cache it; everything per-request goes into the user prompt
+ASSISTANT_SYSTEM_MESSAGE = """You are EcoSayahat AI Assistant. You help tourists in Kazakhstan with eco-tourism: regions, attractions, hotels, eco-tasks and eco-coins.
+Reply in the language requested in the prompt (ru = Russian, en = English, kz = Kazakh). Be concise and friendly, and encourage eco-friendly behavior.
+Prefer the catalog facts given in the prompt; if they do not cover the question, say so rather than inventing details."""
+
+
+class ConversationStore:
+    """One document per user holding their most recent messages, capped and expired by a TTL index."""
+
+    def __init__(self, collection, max_messages: int = CHAT_HISTORY_MAX_MESSAGES, ttl_hours: float = CHAT_HISTORY_TTL_HOURS):
+        self.collection = collection
+        self.max_messages = max_messages
+        self.ttl = timedelta(hours=ttl_hours)
+        self._indexed = False
+
+    async def ensure_index(self):
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+    async def history(self, user_id: str) -> List[dict]:
+        doc = await self.collection.find_one({"_id": user_id}, {"messages": 1})
+        return doc["messages"] if doc else []
+
+    async def append(self, user_id: str, user_text: str, assistant_text: str):
+        await self.ensure_index()
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"_id": user_id},
+            {
+                "$push": {"messages": {
+                    "$each": [
+                        {"role": "user", "content": user_text[:CHAT_MESSAGE_MAX_CHARS], "at": now.isoformat()},
+                        {"role": "assistant", "content": assistant_text[:CHAT_MESSAGE_MAX_CHARS], "at": now.isoformat()},
+                    ],
+                    "$slice": -self.max_messages,
+                }},
+                "$set": {"expires_at": now + self.ttl},
+            },
+            upsert=True,
+        )
+
+    async def clear(self, user_id: str):
+        await self.collection.delete_one({"_id": user_id})
+
+
+def _first_sentence(text: str, limit: int = 60) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "…"
+
+
+def fit_history(messages: List[dict], budget: int) -> Tuple[str, List[dict]]:
+    """Keep the newest messages that fit ``budget`` tokens; condense older user questions into a one-line summary."""
+    kept: List[dict] = []
+    used = 0
+    for message in reversed(messages):
+        cost = estimate_tokens(message["content"]) + 2
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    if kept and kept[0]["role"] == "assistant":
+        # An answer without its question reads as noise
+        kept = kept[1:]
+    older = messages[:len(messages) - len(kept)]
+    questions = [_first_sentence(m["content"]) for m in older if m["role"] == "user"]
+    summary = ""
+    if questions:
+        # The most recent of the dropped questions are the most likely to still matter
+        summary = "Earlier the user asked about: " + "; ".join(questions[-6:])
+    return summary, kept
+
+
+class ContextBuilder:
+    """Builds the assistant prompt from the stored conversation and catalog snippets within a token budget.
+
+    ``retriever.search(query, language)`` returns the catalog snippets relevant
+    to the question.
+    """
+
+    def __init__(self, store: ConversationStore, retriever, history_budget: int = CHAT_HISTORY_TOKEN_BUDGET):
+        self.store = store
+        self.retriever = retriever
+        self.history_budget = history_budget
+
+    def facts(self, message: str, language: str, messages: List[dict]) -> List[str]:
+        # Follow-up questions ("how do I get there?") refer back to the previous user message
+        previous = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return self.retriever.search(f"{message}\n{previous}", language)
+
+    async def build(self, user_id: str, message: str, language: str) -> str:
+        messages = await self.store.history(user_id)
+        summary, recent = fit_history(messages, self.history_budget)
+
+        sections = [f"Language: {language}"]
+        facts = self.facts(message, language, messages)
+        if facts:
+            sections.append("Catalog facts:\n" + "\n".join(f"- {fact}" for fact in facts))
+        if summary:
+            sections.append(summary)
+        if recent:
+            sections.append("Conversation so far:\n" + "\n".join(
+                f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in recent))
+        sections.append(f"User: {message}")
+        return "\n\n".join(sections)
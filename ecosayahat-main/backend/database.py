@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pymongo
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+from pymongo.monitoring import ConnectionPoolListener
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+from metrics import (
+    registry, command_metrics, db_pool_wait_queue_depth, db_pool_connections,
+    db_pool_checkouts, db_pool_checkout_seconds, db_pool_checkout_max
+)
+from tracing import command_tracer
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Latency buckets (ms) for pool checkout waits
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class PoolStats(ConnectionPoolListener):
+    """Tracks connection pool checkout latency and the number of operations waiting for a connection.
+
+    Checkouts happen synchronously on Motor's executor threads, so the start
+    time of the pending checkout is kept per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.wait_queue_depth = 0
+        self.wait_queue_peak = 0
+        self.connections_open = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.checkout_ms_sum = 0.0
+        self.checkout_ms_max = 0.0
+        self.checkout_buckets = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+        self.pool_clears = 0
+
+    def _finish_wait(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        self.wait_queue_depth -= 1
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.wait_queue_depth += 1
+            self.wait_queue_peak = max(self.wait_queue_peak, self.wait_queue_depth)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            elapsed = self._finish_wait()
+            self.checked_out += 1
+            self.checkouts += 1
+            self.checkout_ms_sum += elapsed
+            self.checkout_ms_max = max(self.checkout_ms_max, elapsed)
+            for i, bound in enumerate(CHECKOUT_BUCKETS_MS):
+                if elapsed <= bound:
+                    self.checkout_buckets[i] += 1
+                    break
+            else:
+                self.checkout_buckets[-1] += 1
+        db_pool_checkouts.inc("ok")
+        db_pool_checkout_seconds.inc(amount=elapsed / 1000)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._finish_wait()
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+        db_pool_checkouts.inc("failed")
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "wait_queue_depth": self.wait_queue_depth,
+                "wait_queue_peak": self.wait_queue_peak,
+                "connections_open": self.connections_open,
+                "connections_checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "checkout_ms_avg": round(self.checkout_ms_sum / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_ms_max": round(self.checkout_ms_max, 3),
+                "checkout_ms_buckets": {
+                    **{f"le_{b}": n for b, n in zip(CHECKOUT_BUCKETS_MS, self.checkout_buckets)},
+                    "le_inf": self.checkout_buckets[-1],
+                },
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_stats = PoolStats()
+
+
+def _collect_pool_metrics():
+    stats = pool_stats.snapshot()
+    db_pool_wait_queue_depth.set(value=stats["wait_queue_depth"])
+    db_pool_connections.set("open", value=stats["connections_open"])
+    db_pool_connections.set("checked_out", value=stats["connections_checked_out"])
+    db_pool_checkout_max.set(value=stats["checkout_ms_max"] / 1000)
+
+
+registry.add_collector(_collect_pool_metrics)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def create_client(mongo_url: str) -> AsyncIOMotorClient:
+    """Build the shared Motor client with pool sizing, timeouts and retry settings from the environment."""
+    return AsyncIOMotorClient(
+        mongo_url,
+        minPoolSize=_env_int("MONGO_MIN_POOL_SIZE", 0),
+        maxPoolSize=_env_int("MONGO_MAX_POOL_SIZE", 100),
+        maxConnecting=_env_int("MONGO_MAX_CONNECTING", 2),
+        maxIdleTimeMS=_env_int("MONGO_MAX_IDLE_TIME_MS", 300000),
+        serverSelectionTimeoutMS=_env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        connectTimeoutMS=_env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        # Default deadline for every operation; pymongo forwards the remainder as maxTimeMS.
+        # Waiting for a pooled connection counts against it too, so the pool wait is bounded by
+        # this or by the tighter per-kind deadline() around the operation (no waitQueueTimeoutMS,
+        # which pymongo ignores in favour of timeoutMS)
+        timeoutMS=_env_int("MONGO_TIMEOUT_MS", 10000),
+        retryWrites=os.environ.get("MONGO_RETRY_WRITES", "true").lower() == "true",
+        retryReads=os.environ.get("MONGO_RETRY_READS", "true").lower() == "true",
+        event_listeners=[pool_stats, command_metrics, command_tracer],
+    )
+
+
+def secondary_read_preference():
+    """Read preference for catalog and leaderboard reads (MONGO_SECONDARY_READ_PREFERENCE)."""
+    name = os.environ.get("MONGO_SECONDARY_READ_PREFERENCE", "secondaryPreferred")
+    max_staleness = _env_int("MONGO_MAX_STALENESS_SECONDS", -1)
+    mode = read_pref_mode_from_name(name)
+    if mode == ReadPreference.PRIMARY.mode:
+        return ReadPreference.PRIMARY
+    return make_read_preference(mode, tag_sets=None, max_staleness=max_staleness)
+
+
+# Per-query deadlines (ms) for reads that should give up sooner than MONGO_TIMEOUT_MS,
+# including any time spent queued for a pooled connection
+DEADLINES_MS = {
+    "auth": _env_int("MONGO_DEADLINE_AUTH_MS", 2000),
+    "catalog": _env_int("MONGO_DEADLINE_CATALOG_MS", 5000),
+    "leaderboard": _env_int("MONGO_DEADLINE_LEADERBOARD_MS", 1000),
+    "list": _env_int("MONGO_DEADLINE_LIST_MS", 3000),
+}
+
+
+@contextmanager
+def deadline(kind: str):
+    """Bound every Mongo operation inside the block by the deadline configured for ``kind``."""
+    with pymongo.timeout(DEADLINES_MS[kind] / 1000):
+        yield
+
+
+client = create_client(os.environ['MONGO_URL'])
+db = client[os.environ['DB_NAME']]
+# Catalog and leaderboard reads tolerate replication lag, so they may go to secondaries
+secondary_db = client.get_database(os.environ['DB_NAME'], read_preference=secondary_read_preference())
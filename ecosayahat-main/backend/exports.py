@@ -0,0 +1,149 @@
+import base64
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import EcocoinTransaction, Review, TaskSubmission, TaxiOrder
+from serialization import dumps, model_fields, project
+
+# Documents fetched per getMore; memory per export stays at about one batch
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+# Rows are buffered into chunks of about this size before they are written to the socket
+EXPORT_CHUNK_BYTES = int(os.environ.get("EXPORT_CHUNK_BYTES", 64 * 1024))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Exports walk (created_at, id) in order, which also makes the resume cursor a plain range query
+EXPORT_SORT = [("created_at", 1), ("id", 1)]
+
+
+class Export:
+    """An exportable collection: its model, the fields left out and whether it has a status."""
+
+    def __init__(self, collection: str, model: Type[BaseModel], exclude: Tuple[str, ...] = (), has_status: bool = True):
+        self.collection = collection
+        self.model = model
+        self.fields = tuple(name for name, _ in model_fields(model) if name not in exclude)
+        self.projection = {**{name: 1 for name in self.fields}, "_id": 0}
+        self.has_status = has_status
+
+
+EXPORTS: Dict[str, Export] = {
+    "reviews": Export("reviews", Review),
+    "taxi-orders": Export("taxi_orders", TaxiOrder),
+    # Photos would dwarf everything else; they stay available per submission
+    "task-submissions": Export("task_submissions", TaskSubmission, exclude=("image_base64",)),
+    "ecocoin-transactions": Export("ecocoin_transactions", EcocoinTransaction, has_status=False),
+    # Finished documents moved out of the hot collections by archive.Archiver
+    "taxi-orders-archive": Export("taxi_orders_archive", TaxiOrder),
+    "task-submissions-archive": Export("task_submissions_archive", TaskSubmission, exclude=("image_base64",)),
+}
+
+
+def encode_cursor(created_at: str, doc_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, doc_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(created_at), str(doc_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_bound(value: str, end: bool = False) -> str:
+    """An ISO date or datetime as a UTC ``created_at`` bound; a plain ``date_to`` date includes that whole day."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def build_query(export: Export, status: Optional[str] = None, user_id: Optional[str] = None,
+                date_from: Optional[str] = None, date_to: Optional[str] = None, cursor: Optional[str] = None) -> dict:
+    """The Mongo filter for an export request; raises ValueError for invalid parameters."""
+    query = {}
+    if status is not None:
+        if not export.has_status:
+            raise ValueError(f"{export.collection} cannot be filtered by status")
+        query["status"] = status
+    if user_id is not None:
+        query["user_id"] = user_id
+    created = {}
+    if date_from:
+        created["$gte"] = parse_bound(date_from)
+    if date_to:
+        created["$lt"] = parse_bound(date_to, end=True)
+    if created:
+        query["created_at"] = created
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        query["$or"] = [{"created_at": {"$gt": created_at}}, {"created_at": created_at, "id": {"$gt": doc_id}}]
+    return query
+
+
+class Exporter:
+    """Streams an export straight from a Motor cursor as NDJSON or CSV.
+
+    Every row carries a ``_cursor`` token; after an interrupted download,
+    passing the token of the last complete row resumes right after it. A
+    resumed CSV export has no header, so it can be appended to the partial
+    file.
+    """
+
+    def __init__(self, db, batch_size: int = EXPORT_BATCH_SIZE, chunk_bytes: int = EXPORT_CHUNK_BYTES):
+        self.db = db
+        self.batch_size = batch_size
+        self.chunk_bytes = chunk_bytes
+        self._indexed = False
+
+    async def ensure_indexes(self):
+        if not self._indexed:
+            for export in EXPORTS.values():
+                await self.db[export.collection].create_index([("created_at", 1), ("id", 1)])
+            self._indexed = True
+
+    async def stream(self, export: Export, fmt: str, query: dict, header: bool = True) -> AsyncIterator[bytes]:
+        await self.ensure_indexes()
+        cursor = self.db[export.collection].find(query, export.projection).sort(EXPORT_SORT).batch_size(self.batch_size)
+        out = io.StringIO()
+        writer = csv.writer(out) if fmt == "csv" else None
+        if writer is not None and header:
+            writer.writerow(export.fields + ("_cursor",))
+        buffer = bytearray(out.getvalue().encode())
+        try:
+            async for doc in cursor:
+                row = project(doc, export.model)
+                token = encode_cursor(row["created_at"], row["id"])
+                if writer is None:
+                    row = {name: row[name] for name in export.fields}
+                    row["_cursor"] = token
+                    buffer += dumps(row)
+                    buffer += b"\n"
+                else:
+                    out.seek(0)
+                    out.truncate()
+                    writer.writerow(["" if row[name] is None else row[name] for name in export.fields] + [token])
+                    buffer += out.getvalue().encode()
+                if len(buffer) >= self.chunk_bytes:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            # Also runs when the client disconnects, releasing the server-side cursor at once
+            await cursor.close()
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+# Tariff in tenge, like hotel prices
+TAXI_BASE_FARE = float(os.environ.get("TAXI_BASE_FARE", 500))
+TAXI_PER_KM = float(os.environ.get("TAXI_PER_KM", 120))
+TAXI_PER_MINUTE = float(os.environ.get("TAXI_PER_MINUTE", 25))
+TAXI_MIN_FARE = float(os.environ.get("TAXI_MIN_FARE", 800))
+TAXI_FARE_STEP = float(os.environ.get("TAXI_FARE_STEP", 10))
+# Roads are longer than the great circle; mountain roads to the parks more so
+TAXI_ROAD_FACTOR = float(os.environ.get("TAXI_ROAD_FACTOR", 1.3))
+# The first TAXI_CITY_KM of a trip run at city speed, the rest at highway speed
+TAXI_CITY_KM = float(os.environ.get("TAXI_CITY_KM", 10))
+TAXI_CITY_SPEED_KMH = float(os.environ.get("TAXI_CITY_SPEED_KMH", 25))
+TAXI_HIGHWAY_SPEED_KMH = float(os.environ.get("TAXI_HIGHWAY_SPEED_KMH", 70))
+# Pending orders stored without a pickup point are given one at startup, this many per write
+TAXI_PICKUP_BACKFILL_BATCH = int(os.environ.get("TAXI_PICKUP_BACKFILL_BATCH", 500))
+
+EARTH_RADIUS_KM = 6371.0
+TRIP_COORDINATES = ("from_lat", "from_lng", "to_lat", "to_lng")
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distances between arrays of points in degrees."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    # Non-finite coordinates come out as NaN, which annotate turns into None
+    with np.errstate(invalid="ignore"):
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def road_minutes(road_km: np.ndarray) -> np.ndarray:
+    city_km = np.minimum(road_km, TAXI_CITY_KM)
+    return (city_km / TAXI_CITY_SPEED_KMH + (road_km - city_km) / TAXI_HIGHWAY_SPEED_KMH) * 60
+
+
+def trip_quotes(from_lat, from_lng, to_lat, to_lng) -> Dict[str, np.ndarray]:
+    """Road distance, duration and fare of every trip, one array element per trip."""
+    road_km = haversine_km(from_lat, from_lng, to_lat, to_lng) * TAXI_ROAD_FACTOR
+    minutes = road_minutes(road_km)
+    fare = TAXI_BASE_FARE + TAXI_PER_KM * road_km + TAXI_PER_MINUTE * minutes
+    fare = np.ceil(np.maximum(fare, TAXI_MIN_FARE) / TAXI_FARE_STEP) * TAXI_FARE_STEP
+    return {"distance_km": road_km, "duration_minutes": minutes, "fare": fare}
+
+
+def pickup_estimates(lat: float, lng: float, from_lat, from_lng) -> Dict[str, np.ndarray]:
+    """Road distance and time from a driver at (``lat``, ``lng``) to every pickup point."""
+    road_km = haversine_km(lat, lng, from_lat, from_lng) * TAXI_ROAD_FACTOR
+    return {"pickup_km": road_km, "pickup_minutes": road_minutes(road_km)}
+
+
+def coordinates(orders: List[dict], fields=TRIP_COORDINATES) -> List[np.ndarray]:
+    return [np.fromiter((o[f] for o in orders), dtype=np.float64, count=len(orders)) for f in fields]
+
+
+def pickup_point(lat: float, lng: float) -> dict:
+    """GeoJSON point for the ``pickup`` field, which a 2dsphere index ranks for drivers nearby."""
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+async def ensure_pickup_index(collection):
+    """Create the pickup 2dsphere index and add pickup points to pending orders stored before it existed.
+
+    Orders with coordinates out of range (or NaN, which no range matches) get
+    none: the index would refuse them, and they have no fare to offer anyway.
+    """
+    await collection.create_index([("pickup", "2dsphere"), ("status", 1)])
+    query = {"status": "pending", "pickup": {"$exists": False},
+             "from_lat": {"$gte": -90, "$lte": 90}, "from_lng": {"$gte": -180, "$lte": 180}}
+    while True:
+        docs = await collection.find(query, {"_id": 1, "from_lat": 1, "from_lng": 1}).to_list(TAXI_PICKUP_BACKFILL_BATCH)
+        if not docs:
+            return
+        await collection.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"pickup": pickup_point(doc["from_lat"], doc["from_lng"])}})
+            for doc in docs
+        ], ordered=False)
+
+
+def annotate(orders: List[dict], lat: Optional[float] = None, lng: Optional[float] = None) -> List[dict]:
+    """Add the trip quote and, given a driver position, the pickup estimate to each of ``orders`` in place.
+
+    Estimates that are not finite, from orders with NaN or infinite coordinates, are None.
+    """
+    if not orders:
+        return orders
+    from_lat, from_lng, to_lat, to_lng = coordinates(orders)
+    columns = trip_quotes(from_lat, from_lng, to_lat, to_lng)
+    if lat is not None and lng is not None:
+        columns.update(pickup_estimates(lat, lng, from_lat, from_lng))
+    # Filled a column at a time: building a merged dict per order costs more than all of the math
+    for name, column in columns.items():
+        finite = np.isfinite(column)
+        values = (np.where(finite, column, 0).astype(np.int64) if name == "fare" else np.round(column, 1)).tolist()
+        if not finite.all():
+            # NaN or infinite coordinates give no estimate rather than a garbage number
+            values = [value if ok else None for value, ok in zip(values, finite.tolist())]
+        for order, value in zip(orders, values):
+            order[name] = value
+    return orders
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import warmup_duration
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_RETRY_SECONDS = float(os.environ.get("WARMUP_RETRY_SECONDS", 5))
+
+logger = logging.getLogger("health")
+
+
+class Warmup:
+    """Runs the startup warmup steps in the background and reports readiness.
+
+    The process answers liveness probes as soon as it serves requests, while
+    readiness waits until every step has succeeded once, so a new pod takes
+    traffic only after its Mongo pool, catalog and indexes are warm. A failed
+    step is retried from where it stopped every ``retry_seconds``.
+    """
+
+    def __init__(self, retry_seconds: float = WARMUP_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self.steps: List[Tuple[str, Callable[[], Awaitable[None]]]] = []
+        self.durations: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    def step(self, name: str):
+        """Register a coroutine function as a warmup step; steps run in registration order."""
+        def decorator(fn):
+            self.steps.append((name, fn))
+            return fn
+        return decorator
+
+    async def _run(self):
+        started = time.perf_counter()
+        for name, fn in self.steps:
+            while True:
+                step_started = time.perf_counter()
+                try:
+                    await fn()
+                    break
+                except Exception as e:
+                    self.error = f"{name}: {e}"
+                    logger.warning(f"Warmup step {name} failed, retrying in {self.retry_seconds:.0f}s: {e}")
+                    await asyncio.sleep(self.retry_seconds)
+            self.durations[name] = time.perf_counter() - step_started
+            warmup_duration.set(name, value=self.durations[name])
+        self.error = None
+        self.ready = True
+        warmup_duration.set("total", value=time.perf_counter() - started)
+        logger.info(f"Warm in {(time.perf_counter() - started) * 1000:.0f} ms: "
+                    + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.durations.items()))
+
+    def start(self):
+        if not WARMUP_ENABLED:
+            self.ready = True
+        elif self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming",
+            "steps": {name: round(seconds * 1000, 1) for name, seconds in self.durations.items()},
+            "error": self.error,
+        }
+
+
+warmup = Warmup()
@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from models import Hotel
+from serialization import model_fields
+
+HOTEL_SEARCH_MAX_LIMIT = 100
+HOTEL_FIELDS = tuple(name for name, _ in model_fields(Hotel))
+SORT_FIELDS = {"price": "price_per_night", "price_per_night": "price_per_night", "rating": "rating", "name": "name"}
+DEFAULT_SORT = (("price_per_night", False),)
+
+SortSpec = Tuple[Tuple[str, bool], ...]
+
+
+def parse_sort(sort: str) -> SortSpec:
+    """``"price,-rating"`` -> ``(("price_per_night", False), ("rating", True))``; raises ValueError for unknown keys."""
+    spec = []
+    for part in filter(None, (p.strip() for p in sort.split(","))):
+        descending = part.startswith("-")
+        field = SORT_FIELDS.get(part.lstrip("-+"))
+        if field is None:
+            raise ValueError(f"Cannot sort by {part.lstrip('-+')}")
+        spec.append((field, descending))
+    return tuple(spec) or DEFAULT_SORT
+
+
+def parse_fields(fields: str) -> Optional[Tuple[str, ...]]:
+    if not fields:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in HOTEL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def query_key(region_id: Optional[str], min_price: Optional[int], max_price: Optional[int],
+              min_rating: Optional[float], is_partner: Optional[bool], spec: SortSpec) -> str:
+    """Short hash of what selects and orders the hotels, so a cursor only continues the listing it came from."""
+    normalized = [region_id, min_price, max_price, None if min_rating is None else float(min_rating), is_partner, spec]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()[:16]
+
+
+def encode_cursor(version: int, offset: int, key: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([version, offset, key]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, str]:
+    try:
+        version, offset, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(version), max(0, int(offset)), str(key)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _ordered(hotels: List[dict], spec: SortSpec) -> List[dict]:
+    ordered = sorted(hotels, key=lambda h: h["id"])
+    # Stable sorts applied from the last key to the first give a multi-key order with per-key direction
+    for field, descending in reversed(spec):
+        ordered.sort(key=lambda h: h[field], reverse=descending)
+    return ordered
+
+
+class HotelSearch:
+    """Filtered, sorted and paginated hotel listings served from the cached catalog.
+
+    Orderings are computed once per (region, sort) and catalog version. Price
+    ranges on price-sorted listings are narrowed with a binary search, and
+    other filters stop scanning as soon as a page is full.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.version = None
+        self._by_region: Dict[Optional[str], List[dict]] = {}
+        self._orders: Dict[Tuple[Optional[str], SortSpec], Tuple[List[dict], List[int]]] = {}
+
+    def _sync(self):
+        if self.version == self.catalog.version:
+            return
+        by_region: Dict[Optional[str], List[dict]] = {None: list(self.catalog.hotels)}
+        for hotel in self.catalog.hotels:
+            by_region.setdefault(hotel["region_id"], []).append(hotel)
+        self._by_region = by_region
+        self._orders = {}
+        self.version = self.catalog.version
+
+    def _order(self, region_id: Optional[str], spec: SortSpec) -> Tuple[List[dict], List[int]]:
+        key = (region_id, spec)
+        order = self._orders.get(key)
+        if order is None:
+            hotels = _ordered(self._by_region.get(region_id, []), spec)
+            order = self._orders[key] = (hotels, [h["price_per_night"] for h in hotels])
+        return order
+
+    def search(self, region_id: Optional[str] = None, min_price: Optional[int] = None, max_price: Optional[int] = None,
+               min_rating: Optional[float] = None, is_partner: Optional[bool] = None, sort: str = "",
+               fields: str = "", limit: int = 20, offset: int = 0, cursor: Optional[str] = None) -> dict:
+        spec = parse_sort(sort)
+        selected = parse_fields(fields)
+        limit = max(1, min(limit, HOTEL_SEARCH_MAX_LIMIT))
+
+        self._sync()
+        key = query_key(region_id, min_price, max_price, min_rating, is_partner, spec)
+        if cursor:
+            version, offset, cursor_key = decode_cursor(cursor)
+            # Offsets into an older ordering, or into another filter or sort, would skip or repeat hotels
+            if version != self.version:
+                raise ValueError("Cursor expired: the hotel list has changed, start again from the first page")
+            if cursor_key != key:
+                raise ValueError("Cursor belongs to a search with other filters or sort, start again from the first page")
+        hotels, prices = self._order(region_id, spec)
+        start, stop = 0, len(hotels)
+        if spec[0] == ("price_per_night", False):
+            if min_price is not None:
+                start = bisect_left(prices, min_price)
+            if max_price is not None:
+                stop = bisect_right(prices, max_price)
+
+        page = []
+        skipped = 0
+        has_more = False
+        for hotel in hotels[start:stop]:
+            if min_price is not None and hotel["price_per_night"] < min_price:
+                continue
+            if max_price is not None and hotel["price_per_night"] > max_price:
+                continue
+            if min_rating is not None and hotel["rating"] < min_rating:
+                continue
+            if is_partner is not None and hotel["is_partner"] != is_partner:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(page) == limit:
+                has_more = True
+                break
+            page.append(hotel if selected is None else {f: hotel[f] for f in selected})
+
+        return {
+            "items": page,
+            "next_cursor": encode_cursor(self.version, offset + limit, key) if has_more else None,
+        }
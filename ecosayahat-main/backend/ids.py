@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+import uuid
+from typing import Optional
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def uuid7(unix_ms: Optional[int] = None) -> str:
+    """A UUIDv7 string: 48-bit millisecond timestamp, then random bits (RFC 9562).
+
+    Without ``unix_ms`` the 12 bits after the version are a per-process
+    counter, so ids made in the same millisecond still sort in creation order.
+    """
+    global _last_ms, _sequence
+    if unix_ms is None:
+        with _lock:
+            unix_ms = time.time_ns() // 1_000_000
+            if unix_ms <= _last_ms:
+                unix_ms = _last_ms
+                _sequence += 1
+                if _sequence > 0xFFF:
+                    unix_ms += 1
+                    _sequence = 0
+            else:
+                # Start low so the counter has room to grow within the millisecond
+                _sequence = int.from_bytes(os.urandom(2), "big") & 0x7FF
+            _last_ms = unix_ms
+            sequence = _sequence
+    else:
+        sequence = int.from_bytes(os.urandom(2), "big") & 0xFFF
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (unix_ms << 80) | (0x7 << 76) | (sequence << 64) | (0b10 << 62) | random_bits
+    return str(uuid.UUID(int=value))
+
+
+def is_uuid7(value: str) -> bool:
+    return len(value) == 36 and value[14] == "7"
+
+
+def id_query(value: str) -> dict:
+    """Filter for a document by id, also matching the pre-migration id it may still be addressed by."""
+    if is_uuid7(value):
+        return {"id": value}
+    return {"$or": [{"id": value}, {"legacy_id": value}]}
+
+
+# Lists run newest first by (created_at, id): ids alone are only time-ordered once IdMigration has finished
+NEWEST_FIRST = [("created_at", -1), ("id", -1)]
+
+
+async def keyset_filter(collection, query: dict, before: Optional[str]) -> dict:
+    """Page filter for a NEWEST_FIRST list; ``before`` is the id (current or legacy) of the last item already seen.
+
+    Raises ValueError when ``before`` names no document.
+    """
+    if before:
+        last = await collection.find_one(id_query(before), {"_id": 0, "id": 1, "created_at": 1})
+        if last is None:
+            raise ValueError("Unknown 'before' item")
+        created_at = last.get("created_at")
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": last["id"]}},
+        ]
+    return query
@@ -0,0 +1,261 @@
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from starlette.concurrency import run_in_threadpool
+
+from images import resize_to_width
+from metrics import image_proxy_requests
+
+IMAGE_PROXY_CACHE_DIR = os.environ.get("IMAGE_PROXY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ecosayahat-images"))
+IMAGE_PROXY_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_PROXY_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+IMAGE_PROXY_WIDTHS = tuple(sorted(int(w) for w in os.environ.get("IMAGE_PROXY_WIDTHS", "160,320,640,960,1280").split(",")))
+# host[:port] entries; the catalog's sources by default
+IMAGE_PROXY_ALLOWED_HOSTS = frozenset(
+    h.strip().lower() for h in os.environ.get("IMAGE_PROXY_ALLOWED_HOSTS", "images.pexels.com,images.unsplash.com").split(",") if h.strip()
+)
+IMAGE_PROXY_FETCH_TIMEOUT_SECONDS = float(os.environ.get("IMAGE_PROXY_FETCH_TIMEOUT_SECONDS", 10))
+IMAGE_PROXY_MAX_SOURCE_BYTES = int(os.environ.get("IMAGE_PROXY_MAX_SOURCE_BYTES", 20 * 1024 * 1024))
+IMAGE_PROXY_WEBP_QUALITY = int(os.environ.get("IMAGE_PROXY_WEBP_QUALITY", 75))
+IMAGE_PROXY_JPEG_QUALITY = int(os.environ.get("IMAGE_PROXY_JPEG_QUALITY", 80))
+# Variants are named after the source URL and width, so they never change and can be cached for good
+IMAGE_PROXY_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+logger = logging.getLogger("image_proxy")
+
+
+class ImageProxyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def width_bucket(width: Optional[int]) -> int:
+    """The smallest configured width at least ``width`` wide, so clients share a few cached variants."""
+    if not width:
+        return IMAGE_PROXY_WIDTHS[-1]
+    return IMAGE_PROXY_WIDTHS[min(bisect_left(IMAGE_PROXY_WIDTHS, width), len(IMAGE_PROXY_WIDTHS) - 1)]
+
+
+def negotiate_format(fmt: str, accept: str) -> str:
+    if fmt in MEDIA_TYPES:
+        return fmt
+    return "webp" if "image/webp" in accept else "jpeg"
+
+
+def check_source(url: str, allowed_hosts=IMAGE_PROXY_ALLOWED_HOSTS):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or parts.netloc.lower() not in allowed_hosts:
+        raise ImageProxyError(400, f"Images from {parts.netloc or 'this URL'} are not proxied")
+
+
+class DiskLRU:
+    """Files in one directory, evicted least recently used first once they exceed ``max_bytes``.
+
+    Recency is the file mtime, refreshed on every hit, so the workers sharing
+    the directory agree on it; a file evicted by another worker is simply a
+    miss. The running total lives in a ``.size`` file updated under ``flock``,
+    so the cap holds across all of those workers rather than per process.
+    """
+
+    SIZE_FILE = ".size"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._size_path = os.path.join(directory, self.SIZE_FILE)
+        self._update_size(lambda size: self._scan_size())
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The cached bytes; read here rather than served by path, since another worker may evict the file at any time."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        # A key written twice is counted twice until the next eviction rescans, which only evicts early
+        self._update_size(lambda size: size + len(data))
+
+    def _update_size(self, change: Callable[[int], int]):
+        fd = os.open(self._size_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                size = int(os.pread(fd, 32, 0))
+            except ValueError:
+                # A new or damaged size file
+                size = self._scan_size()
+            size = change(size)
+            if size > self.max_bytes:
+                size = self._evict()
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, str(size).encode(), 0)
+        finally:
+            os.close(fd)
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and not entry.name.startswith(".") and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> int:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        # Down to 90% so that every put near the cap does not rescan the directory
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+class ImageProxy:
+    """Fetches allowed catalog images once and serves width-bucketed WebP/JPEG variants from a disk cache.
+
+    Originals and variants share one ``DiskLRU``. Concurrent requests for
+    the same source or variant wait for a single fetch or resize, and the
+    resizing runs in the thread pool.
+    """
+
+    def __init__(self, cache_dir: str = IMAGE_PROXY_CACHE_DIR, max_bytes: int = IMAGE_PROXY_CACHE_MAX_BYTES,
+                 allowed_hosts=IMAGE_PROXY_ALLOWED_HOSTS, timeout: float = IMAGE_PROXY_FETCH_TIMEOUT_SECONDS):
+        self.cache = DiskLRU(cache_dir, max_bytes)
+        self.allowed_hosts = allowed_hosts
+        self.timeout = timeout
+        self.fetches = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(timeout=self.timeout, follow_redirects=False)
+        return self._http
+
+    async def _once(self, key: str, produce: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Run ``produce`` for ``key`` unless a run is already in flight, then share its result.
+
+        The run is a task of its own, so a caller that is cancelled (its client
+        went away) leaves it running for everyone else waiting on it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(produce())
+            task.add_done_callback(lambda finished: self._finished(key, finished))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Every waiter may have gone; mark the exception as retrieved
+            task.exception()
+
+    async def _fetch(self, url: str) -> bytes:
+        import httpx
+
+        self.fetches += 1
+        try:
+            async with self._client().stream("GET", url) as response:
+                if response.status_code != 200:
+                    raise ImageProxyError(502, f"Source answered {response.status_code}")
+                if not response.headers.get("content-type", "").startswith("image/"):
+                    raise ImageProxyError(502, "Source is not an image")
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) > IMAGE_PROXY_MAX_SOURCE_BYTES:
+                        raise ImageProxyError(502, "Source image is too large")
+                return bytes(body)
+        except httpx.HTTPError as e:
+            raise ImageProxyError(502, f"Could not fetch the source image: {e.__class__.__name__}")
+
+    async def _source(self, url: str, digest: str) -> bytes:
+        key = f"{digest}.src"
+        data = await run_in_threadpool(self.cache.get, key)
+        if data is not None:
+            return data
+
+        async def produce():
+            data = await self._fetch(url)
+            await run_in_threadpool(self.cache.put, key, data)
+            return data
+
+        return await self._once(key, produce)
+
+    async def variant(self, url: str, width: Optional[int], fmt: str) -> Tuple[bytes, str]:
+        """Bytes and media type of ``url`` resized to the width bucket for ``width``; raises ImageProxyError."""
+        check_source(url, self.allowed_hosts)
+        digest = hashlib.sha256(url.encode()).hexdigest()[:32]
+        bucket = width_bucket(width)
+        key = f"{digest}-{bucket}.{fmt}"
+        data = await run_in_threadpool(self.cache.get, key)
+        if data is not None:
+            image_proxy_requests.inc("hit")
+            return data, MEDIA_TYPES[fmt]
+
+        async def produce():
+            source = await self._source(url, digest)
+            quality = IMAGE_PROXY_WEBP_QUALITY if fmt == "webp" else IMAGE_PROXY_JPEG_QUALITY
+
+            try:
+                data = await run_in_threadpool(resize_to_width, source, bucket, fmt, quality)
+            except Exception as e:
+                logger.warning(f"Could not resize {url}: {e}")
+                raise ImageProxyError(502, "Source image could not be decoded")
+            await run_in_threadpool(self.cache.put, key, data)
+            return data
+
+        try:
+            data = await self._once(key, produce)
+        except ImageProxyError:
+            image_proxy_requests.inc("error")
+            raise
+        image_proxy_requests.inc("miss")
+        return data, MEDIA_TYPES[fmt]
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
@@ -0,0 +1,160 @@
+import base64
+import io
+import json
+import os
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 15 * 1024 * 1024))
+# The whole multipart body: the image plus boundaries and the other form fields
+MAX_UPLOAD_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+IMAGE_MAX_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", 1280))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", 80))
+
+# Refuse decompression bombs well before they reach memory
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))
+
+
+def _pil():
+    """Pillow, imported on the first image rather than at startup."""
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    return Image
+
+
+def downscale_image(fileobj, max_side: int = IMAGE_MAX_SIDE, quality: int = IMAGE_JPEG_QUALITY) -> bytes:
+    """Decode an image, fit it within ``max_side`` pixels and re-encode it as a JPEG.
+
+    Blocking and CPU bound; call it through ``run_in_threadpool``.
+    """
+    from PIL import ImageOps
+
+    Image = _pil()
+    with Image.open(fileobj) as image:
+        # JPEG can decode directly at a reduced scale, which is much cheaper than a full decode
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def resize_to_width(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """Scale an image down to ``width`` pixels wide (never up) and encode it as WebP or JPEG.
+
+    Blocking and CPU bound; call it through ``run_in_threadpool``.
+    """
+    from PIL import ImageOps
+
+    Image = _pil()
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (width, width * 4))
+        image = ImageOps.exif_transpose(image)
+        # WebP keeps transparency; JPEG has none
+        mode = "RGBA" if fmt == "webp" and image.mode in ("RGBA", "LA", "PA") else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        out = io.BytesIO()
+        if fmt == "webp":
+            image.save(out, format="WEBP", quality=quality, method=4)
+        else:
+            image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """Answers 413 to multipart bodies over ``max_bytes`` before they are spooled to disk.
+
+    A declared Content-Length over the limit is refused before any of the
+    body is read; otherwise bytes are counted as they arrive, so a chunked or
+    understated upload stops at the limit too.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Image is too large"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        length = headers.get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        started = rejected = False
+
+        async def capped_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    if not started:
+                        rejected = True
+                        await self._reject(send)
+                    raise UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # The body parser turns the abort into an error response of its own; ours has already gone out
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, capped_receive, guarded_send)
+        except UploadTooLarge:
+            if not rejected:
+                raise
+
+
+async def upload_to_base64(upload: UploadFile, max_side: int = IMAGE_MAX_SIDE) -> str:
+    """Downscale an uploaded image in the thread pool and return it base64-encoded for storage or the LLM.
+
+    UploadLimitMiddleware has already refused bodies over the limit while they
+    were arriving; Starlette spooled the part into a temporary file, so only
+    the bounded re-encoded image is ever held in memory.
+    """
+    if upload.content_type and not upload.content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail="Only image uploads are supported")
+    if upload.size is not None and upload.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+
+    Image = _pil()
+    try:
+        data = await run_in_threadpool(downscale_image, upload.file, max_side)
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid image")
+    finally:
+        await upload.close()
+    return base64.b64encode(data).decode()
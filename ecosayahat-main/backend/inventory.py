@@ -0,0 +1,106 @@
+import asyncio
+import math
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+HOTEL_DEFAULT_ROOMS = int(os.environ.get("HOTEL_DEFAULT_ROOMS", 10))
+GUESTS_PER_ROOM = int(os.environ.get("GUESTS_PER_ROOM", 2))
+MAX_BOOKING_NIGHTS = int(os.environ.get("MAX_BOOKING_NIGHTS", 30))
+
+DUPLICATE_KEY = 11000
+
+
+def stay_nights(check_in: str, check_out: str, today: Optional[date] = None) -> List[str]:
+    """ISO dates of the nights between ``check_in`` and ``check_out``; raises ValueError for an invalid stay.
+
+    Check-in may be today at the earliest, by the UTC date.
+    """
+    try:
+        start = date.fromisoformat(check_in)
+        end = date.fromisoformat(check_out)
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    if start < (today or datetime.now(timezone.utc).date()):
+        raise ValueError("Check-in cannot be in the past")
+    count = (end - start).days
+    if count < 1:
+        raise ValueError("Check-out must be after check-in")
+    if count > MAX_BOOKING_NIGHTS:
+        raise ValueError(f"Stays are limited to {MAX_BOOKING_NIGHTS} nights")
+    return [(start + timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def rooms_for(guests: int) -> int:
+    return max(1, math.ceil(guests / GUESTS_PER_ROOM))
+
+
+def capacity(hotel: dict) -> int:
+    return hotel.get("rooms") or HOTEL_DEFAULT_ROOMS
+
+
+class InventoryStore:
+    """Free rooms per hotel and night, one document per (hotel, night) created on first use.
+
+    A stay is reserved with one conditional decrement per night; if any night
+    is sold out the nights already taken are given back, so concurrent
+    bookings can never push a night below zero.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def key(hotel_id: str, night: str) -> str:
+        return f"{hotel_id}:{night}"
+
+    async def _ensure_nights(self, hotel: dict, nights: List[str]):
+        requests = [
+            UpdateOne(
+                {"_id": self.key(hotel["id"], night)},
+                {"$setOnInsert": {"hotel_id": hotel["id"], "date": night, "available": capacity(hotel)}},
+                upsert=True,
+            )
+            for night in nights
+        ]
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent booking created the same night first, which is all we needed
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+
+    async def _take(self, hotel_id: str, night: str, rooms: int) -> bool:
+        result = await self.collection.update_one(
+            {"_id": self.key(hotel_id, night), "available": {"$gte": rooms}},
+            {"$inc": {"available": -rooms}},
+        )
+        return result.modified_count == 1
+
+    async def reserve(self, hotel: dict, nights: List[str], rooms: int) -> bool:
+        """Take ``rooms`` on every night of the stay, or nothing at all."""
+        await self._ensure_nights(hotel, nights)
+        taken = await asyncio.gather(*(self._take(hotel["id"], night, rooms) for night in nights))
+        if all(taken):
+            return True
+        await self.release(hotel["id"], [night for night, ok in zip(nights, taken) if ok], rooms)
+        return False
+
+    async def release(self, hotel_id: str, nights: List[str], rooms: int):
+        if not nights:
+            return
+        await self.collection.update_many(
+            {"_id": {"$in": [self.key(hotel_id, night) for night in nights]}},
+            {"$inc": {"available": rooms}},
+        )
+
+    async def availability(self, hotels: List[dict], nights: List[str]) -> Dict[str, int]:
+        """Rooms free on every night of the stay, per hotel, from a single ``_id`` lookup."""
+        ids = [self.key(hotel["id"], night) for hotel in hotels for night in nights]
+        free = {hotel["id"]: capacity(hotel) for hotel in hotels}
+        async for doc in self.collection.find({"_id": {"$in": ids}}, {"hotel_id": 1, "available": 1}):
+            free[doc["hotel_id"]] = min(free[doc["hotel_id"]], doc["available"])
+        return free
@@ -0,0 +1,43 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from database import pool_stats
+
+
+class Lease:
+    """A named lease in the ``jobs`` collection, so one worker at a time runs a background job.
+
+    Acquiring again while held renews it; an expired lease can be taken over.
+    """
+
+    def __init__(self, collection, name: str, ttl_seconds: float):
+        self.collection = collection
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = uuid.uuid4().hex
+
+    async def acquire(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.ttl}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The upsert collides on _id while another worker holds the lease
+            return False
+
+    async def release(self):
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+
+async def yield_to_foreground(pause: float):
+    """Sleep between batches of a background job, and longer while requests queue for a Mongo connection."""
+    await asyncio.sleep(pause)
+    while pool_stats.snapshot()["wait_queue_depth"] > 0:
+        await asyncio.sleep(pause)
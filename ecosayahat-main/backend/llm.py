@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Optional, Sequence
+
+from metrics import estimate_tokens, llm_circuit_open, llm_fallbacks, llm_request_duration, llm_tokens
+from tracing import start_span
+
+EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY", "")
+# emergent | openai (any OpenAI-compatible endpoint) | mock
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "emergent")
+LLM_VENDOR = os.environ.get("LLM_VENDOR", "gemini")
+LLM_MODEL = os.environ.get("LLM_MODEL", "gemini-3-flash-preview")
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "")
+LLM_API_KEY = os.environ.get("LLM_API_KEY", "")
+# Secondary model used when the primary fails, is circuit-broken or is slower than LLM_HEDGE_AFTER_MS
+LLM_FALLBACK_PROVIDER = os.environ.get("LLM_FALLBACK_PROVIDER", "")
+LLM_FALLBACK_MODEL = os.environ.get("LLM_FALLBACK_MODEL", "")
+LLM_HEDGE_AFTER_MS = float(os.environ.get("LLM_HEDGE_AFTER_MS", 8000))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 45))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 30))
+LLM_MOCK_LATENCY_MS = float(os.environ.get("LLM_MOCK_LATENCY_MS", 50))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast after ``failures`` consecutive errors, letting one probe through every ``reset_seconds``."""
+
+    def __init__(self, name: str, failures: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_seconds:
+            return False
+        # Half-open: this call is the probe; the next one waits for another reset period
+        self.opened_at = now
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logging.info(f"LLM circuit closed for {self.name}")
+        self.opened_at = None
+        llm_circuit_open.set(self.name, value=0)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.opened_at is not None or self.consecutive_failures >= self.failures:
+            if self.opened_at is None:
+                logging.warning(f"LLM circuit opened for {self.name} after {self.consecutive_failures} failures")
+            self.opened_at = time.monotonic()
+            llm_circuit_open.set(self.name, value=1)
+
+
+class EmergentProvider:
+    """The Emergent integration; imported on first use so the app starts without it."""
+
+    def __init__(self, api_key: str, vendor: str, model: str):
+        self.api_key = api_key
+        self.vendor = vendor
+        self.model = model
+        self.name = f"emergent:{model}"
+        self.breaker = CircuitBreaker(self.name)
+
+    async def complete(self, system_message: str, text: str, images: Sequence[str], session_id: str) -> str:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
+
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(self.vendor, self.model)
+        if images:
+            user_message = UserMessage(text=text, file_contents=[ImageContent(image_base64=image) for image in images])
+        else:
+            user_message = UserMessage(text=text)
+        return await chat.send_message(user_message)
+
+
+class OpenAICompatibleProvider:
+    """Any OpenAI-compatible chat completions endpoint, e.g. benchmarks/mock_llm_server.py."""
+
+    def __init__(self, base_url: str, model: str, api_key: str = ""):
+        self.model = model
+        self.name = f"openai:{model}"
+        self.breaker = CircuitBreaker(self.name)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        import httpx
+
+        # Timeouts are enforced per call by LLMClient
+        self._http = httpx.AsyncClient(base_url=base_url.rstrip("/"), headers=headers, timeout=None)
+
+    async def complete(self, system_message: str, text: str, images: Sequence[str], session_id: str) -> str:
+        content = [{"type": "text", "text": text}] + [
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}} for image in images
+        ]
+        response = await self._http.post("/v1/chat/completions", json={
+            "model": self.model,
+            "messages": [{"role": "system", "content": system_message}, {"role": "user", "content": content}],
+            "user": session_id,
+        })
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class MockProvider:
+    """Deterministic in-process model for tests and benchmarks.
+
+    Images are VERIFIED or REJECTED by a hash of their bytes, prompts listing
+    several images get one ``<N>: verdict`` line each, and text-only prompts
+    are echoed back.
+    """
+
+    def __init__(self, latency_ms: float = LLM_MOCK_LATENCY_MS, reject_ratio: float = 0.2):
+        self.latency = latency_ms / 1000
+        self.reject_ratio = reject_ratio
+        self.name = "mock"
+        self.breaker = CircuitBreaker(self.name)
+
+    def verdict(self, image: str) -> str:
+        digest = hashlib.sha1(image.encode()).digest()
+        return "REJECTED" if digest[0] < 256 * self.reject_ratio else "VERIFIED"
+
+    async def complete(self, system_message: str, text: str, images: Sequence[str], session_id: str) -> str:
+        await asyncio.sleep(self.latency)
+        if len(images) == 1:
+            return self.verdict(images[0])
+        if images:
+            return "\n".join(f"{i}: {self.verdict(image)}" for i, image in enumerate(images, 1))
+        return "Mock answer to: " + re.sub(r"\s+", " ", text)[:200]
+
+
+def create_provider(kind: str, model: str):
+    if kind == "emergent":
+        return EmergentProvider(EMERGENT_LLM_KEY, LLM_VENDOR, model)
+    if kind == "openai":
+        return OpenAICompatibleProvider(LLM_BASE_URL, model, LLM_API_KEY)
+    if kind == "mock":
+        return MockProvider()
+    raise ValueError(f"Unknown LLM provider: {kind}")
+
+
+class LLMClient:
+    """Sends prompts to the primary provider with a per-call timeout, hedging to the fallback if configured.
+
+    The fallback is started when the primary fails, is circuit-broken, or has
+    not answered within ``hedge_after_ms``; whichever answers first wins and
+    the other call is cancelled.
+    """
+
+    def __init__(self, primary, fallback=None, timeout: float = LLM_TIMEOUT_SECONDS,
+                 hedge_after_ms: Optional[float] = LLM_HEDGE_AFTER_MS):
+        self.providers = [p for p in (primary, fallback) if p is not None]
+        self.timeout = timeout
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms else None
+
+    async def _attempt(self, provider, purpose: str, system_message: str, text: str, images: Sequence[str],
+                       session_id: str) -> str:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with start_span("llm.request", purpose=purpose, model=provider.name):
+                response = await asyncio.wait_for(
+                    provider.complete(system_message, text, images, session_id), self.timeout)
+            outcome = "ok"
+            provider.breaker.record_success()
+            return response
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the provider's health
+            outcome = "cancelled"
+            raise
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            provider.breaker.record_failure()
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        finally:
+            llm_request_duration.observe(purpose, provider.name, outcome, value=time.perf_counter() - start)
+
+    async def _first_success(self, pending: set, timeout: Optional[float]):
+        """Wait up to ``timeout`` for one of ``pending`` to succeed; failed tasks are removed from the set."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        error = None
+        while pending:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                pending.discard(task)
+                if task.exception() is None:
+                    return task, None
+                error = task.exception()
+        return None, error
+
+    async def complete(self, purpose: str, system_message: str, text: str, images: Sequence[str] = (),
+                       session_id: Optional[str] = None) -> str:
+        session_id = session_id or str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        pending = set()
+        error: Optional[BaseException] = None
+        try:
+            for index, provider in enumerate(self.providers):
+                if not provider.breaker.allow():
+                    error = CircuitOpenError(f"LLM circuit open for {provider.name}")
+                    continue
+                if index:
+                    llm_fallbacks.inc(provider.name, "hedge" if pending else "failover")
+                pending.add(loop.create_task(
+                    self._attempt(provider, purpose, system_message, text, images, session_id)))
+                is_last = index == len(self.providers) - 1
+                winner, failure = await self._first_success(pending, None if is_last else self.hedge_after)
+                error = failure or error
+                if winner is not None:
+                    return self._finish(purpose, system_message, text, winner.result())
+            winner, failure = await self._first_success(pending, None)
+            if winner is not None:
+                return self._finish(purpose, system_message, text, winner.result())
+            raise failure or error or CircuitOpenError("No LLM provider available")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _finish(self, purpose: str, system_message: str, text: str, response: str) -> str:
+        llm_tokens.inc(purpose, "prompt", amount=estimate_tokens(system_message) + estimate_tokens(text))
+        llm_tokens.inc(purpose, "completion", amount=estimate_tokens(response))
+        return response
+
+
+llm = LLMClient(
+    create_provider(LLM_PROVIDER, LLM_MODEL),
+    create_provider(LLM_FALLBACK_PROVIDER or LLM_PROVIDER, LLM_FALLBACK_MODEL) if LLM_FALLBACK_MODEL else None,
+)
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 2.0))
+
+
+class EntityLoader:
+    """DataLoader-style lookups by ``id`` for one collection.
+
+    Lookups issued in the same event loop tick are coalesced into a single
+    ``$in`` query, and results are kept for ``ttl`` seconds across requests.
+    Callers that write to a document must ``invalidate`` it.
+    """
+
+    def __init__(self, collection, ttl: float, projection: Optional[dict] = None, max_batch: int = 100):
+        self.collection = collection
+        self.ttl = ttl
+        self.projection = projection or {"_id": 0}
+        self.max_batch = max_batch
+        self._cache: Dict[str, Tuple[float, Optional[dict]]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._batch: List[str] = []
+        # The loop only keeps weak references to tasks; these hold in-flight fetches until they finish
+        self._fetches: Set[asyncio.Task] = set()
+        self._epoch = 0
+        self.queries = 0
+
+    async def load(self, entity_id: str) -> Optional[dict]:
+        hit = self._cache.get(entity_id)
+        if hit is not None and hit[0] > time.monotonic():
+            return dict(hit[1]) if hit[1] is not None else None
+
+        future = self._pending.get(entity_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[entity_id] = future
+            self._batch.append(entity_id)
+            if len(self._batch) == 1:
+                asyncio.get_running_loop().call_soon(self._dispatch)
+        doc = await asyncio.shield(future)
+        return dict(doc) if doc is not None else None
+
+    async def load_many(self, entity_ids: List[str]) -> List[Optional[dict]]:
+        return list(await asyncio.gather(*(self.load(i) for i in entity_ids)))
+
+    def invalidate(self, entity_id: str):
+        self._cache.pop(entity_id, None)
+        self._epoch += 1
+
+    def _dispatch(self):
+        batch, self._batch = self._batch, []
+        for start in range(0, len(batch), self.max_batch):
+            task = asyncio.ensure_future(self._fetch(batch[start:start + self.max_batch]))
+            self._fetches.add(task)
+            task.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, ids: List[str]):
+        epoch = self._epoch
+        try:
+            self.queries += 1
+            docs = await self.collection.find({"id": {"$in": ids}}, self.projection).to_list(None)
+        except Exception as e:
+            for entity_id in ids:
+                future = self._pending.pop(entity_id)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found = {doc["id"]: doc for doc in docs}
+        # A write that landed while the query was in flight may not be reflected, so don't cache
+        cacheable = epoch == self._epoch
+        expires = time.monotonic() + self.ttl
+        for entity_id in ids:
+            doc = found.get(entity_id)
+            if cacheable:
+                self._cache[entity_id] = (expires, doc)
+            future = self._pending.pop(entity_id)
+            if not future.done():
+                future.set_result(doc)
+
+        if len(self._cache) > 10000:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+
+
+class RequestLoader:
+    """Per-request memo in front of a shared ``EntityLoader``."""
+
+    def __init__(self, loader: EntityLoader):
+        self.loader = loader
+        self._memo: Dict[str, Optional[dict]] = {}
+
+    async def load(self, entity_id: str) -> Optional[dict]:
+        if entity_id not in self._memo:
+            self._memo[entity_id] = await self.loader.load(entity_id)
+        return self._memo[entity_id]
+
+    def invalidate(self, entity_id: str):
+        self._memo.pop(entity_id, None)
+        self.loader.invalidate(entity_id)
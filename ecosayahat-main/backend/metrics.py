@@ -0,0 +1,257 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import Response
+from pymongo.monitoring import CommandListener
+from starlette.routing import Match
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, *labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [per-bucket counts including +Inf (not cumulative), sum, count]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, (list(s[0]), s[1], s[2])) for labels, s in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback refreshing gauges right before each scrape."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"))
+mongo_command_duration = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency", ("command", "collection"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+mongo_command_failures = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("command", "collection")))
+llm_request_duration = registry.register(Histogram(
+    "llm_request_duration_seconds", "LLM call latency", ("purpose", "model", "outcome")))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "LLM tokens, estimated from text length (4 chars per token)", ("purpose", "direction")))
+llm_fallbacks = registry.register(Counter(
+    "llm_fallback_requests_total", "Requests sent to the fallback model, while the primary is slow (hedge) or after it failed (failover)",
+    ("model", "reason")))
+llm_circuit_open = registry.register(Gauge(
+    "llm_circuit_open", "1 while the circuit breaker for a model is open", ("model",)))
+retrieval_duration = registry.register(Histogram(
+    "assistant_retrieval_seconds", "Catalog retrieval time per assistant question, including index sync",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)))
+background_tasks_in_flight = registry.register(Gauge(
+    "background_tasks_in_flight", "Spawned background coroutines not yet finished", ("kind",)))
+rate_limited = registry.register(Counter(
+    "rate_limited_requests_total", "Requests rejected by the rate limiter", ("policy",)))
+verification_batch_size = registry.register(Histogram(
+    "task_verification_batch_size", "Submissions verified per LLM call", buckets=(1, 2, 4, 8, 16, 32)))
+verification_fallbacks = registry.register(Counter(
+    "task_verification_fallbacks_total", "Batches re-verified one submission per call", ("reason",)))
+archived_documents = registry.register(Counter(
+    "archived_documents_total", "Documents moved from hot collections to their archive", ("collection",)))
+image_proxy_requests = registry.register(Counter(
+    "image_proxy_requests_total", "Image proxy requests by cache outcome", ("outcome",)))
+warmup_duration = registry.register(Gauge(
+    "app_warmup_seconds", "Time each startup warmup step took", ("step",)))
+db_pool_wait_queue_depth = registry.register(Gauge(
+    "mongodb_pool_wait_queue_depth", "Operations waiting to check out a pooled connection"))
+db_pool_connections = registry.register(Gauge(
+    "mongodb_pool_connections", "Pooled MongoDB connections", ("state",)))
+db_pool_checkouts = registry.register(Counter(
+    "mongodb_pool_checkouts_total", "Connection checkouts", ("outcome",)))
+db_pool_checkout_seconds = registry.register(Counter(
+    "mongodb_pool_checkout_seconds_total", "Time spent waiting for successful connection checkouts"))
+db_pool_checkout_max = registry.register(Gauge(
+    "mongodb_pool_checkout_max_seconds", "Longest connection checkout wait since start"))
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+class CommandMetrics(CommandListener):
+    """Motor command monitoring: per-command latency by collection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._collections[(event.request_id, event.connection_id)] = collection
+
+    def _collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.request_id, event.connection_id), "")
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(event.command_name, self._collection(event),
+                                       value=event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_command_duration.observe(event.command_name, collection, value=event.duration_micros / 1e6)
+        mongo_command_failures.inc(event.command_name, collection)
+
+
+command_metrics = CommandMetrics()
+
+
+_route_templates: Dict[Callable, str] = {}
+
+
+def route_template(scope) -> str:
+    """Path template of the endpoint that handled ``scope`` (set by the router), to keep label cardinality bounded."""
+    if not _route_templates:
+        _route_templates.update(
+            (getattr(route, "endpoint", None), route.path) for route in scope["app"].routes
+        )
+    template = _route_templates.get(scope.get("endpoint"))
+    if template is None:
+        # Requests answered before routing (e.g. rate limited) are labelled with the route they were for
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+    return template
+
+
+class MetricsMiddleware:
+    """Records request duration per route template and status plus the in-flight gauge."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(scope["method"], route_template(scope), str(status),
+                                          value=time.perf_counter() - start)
+
+
+def metrics_response() -> Response:
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
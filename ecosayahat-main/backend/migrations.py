@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ids import is_uuid7, uuid7
+from jobs import Lease, yield_to_foreground
+
+ID_MIGRATION_ENABLED = os.environ.get("ID_MIGRATION_ENABLED", "true").lower() == "true"
+ID_MIGRATION_BATCH_SIZE = int(os.environ.get("ID_MIGRATION_BATCH_SIZE", 500))
+ID_MIGRATION_PAUSE_MS = float(os.environ.get("ID_MIGRATION_PAUSE_MS", 100))
+
+MIGRATION_ID = "migration:ids-v7"
+
+# Append-mostly collections whose lists are paginated by id; users keep their ids, which tokens and documents reference
+MIGRATED_COLLECTIONS = ("reviews", "ecocoin_transactions", "taxi_orders", "task_submissions",
+                        "taxi_orders_archive", "task_submissions_archive")
+
+# Indexes for the newest-first (created_at, id) list queries
+KEYSET_INDEXES = {
+    "reviews": [[("attraction_id", 1), ("status", 1), ("created_at", -1), ("id", -1)], [("created_at", -1), ("id", -1)]],
+    "ecocoin_transactions": [[("user_id", 1), ("created_at", -1), ("id", -1)]],
+    "taxi_orders": [[("user_id", 1), ("created_at", -1), ("id", -1)]],
+}
+
+logger = logging.getLogger("migrations")
+
+
+def created_at_ms(created_at: str) -> int:
+    parsed = datetime.fromisoformat(created_at)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def migrated_id(doc: dict) -> str:
+    """A UUIDv7 for ``doc`` from its ``created_at``, or from now when that is missing or unparseable."""
+    try:
+        return uuid7(created_at_ms(doc["created_at"]))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        logger.warning(f"Id migration: no usable created_at on {doc['id']}, using the current time")
+        return uuid7()
+
+
+class IdMigration:
+    """Online migration of legacy UUIDv4 ids to UUIDv7 ids derived from ``created_at``.
+
+    The old id is kept as ``legacy_id`` and ``id_query`` matches either, so
+    links and in-flight requests that still carry an old id keep working.
+    Each collection is walked once in ``_id`` order, with the last ``_id``
+    seen kept in the ``jobs`` marker so that a restart resumes there; legacy
+    ids are picked out in Python, as no index can answer "not a UUIDv7".
+    Batches are paced like the archiver and one worker at a time holds the
+    lease; the marker skips the walk once everything is migrated.
+    """
+
+    def __init__(self, db, collections=MIGRATED_COLLECTIONS, batch_size: int = ID_MIGRATION_BATCH_SIZE,
+                 pause_ms: float = ID_MIGRATION_PAUSE_MS):
+        self.db = db
+        self.collections = collections
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.lease = Lease(db.jobs, MIGRATION_ID + ":lease", ttl_seconds=300)
+        self.migrated: Dict[str, int] = {}
+        self._indexed = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        if not self._indexed:
+            for name in self.collections:
+                await self.db[name].create_index("id", unique=True)
+                await self.db[name].create_index("legacy_id", sparse=True)
+            for name, indexes in KEYSET_INDEXES.items():
+                for keys in indexes:
+                    await self.db[name].create_index(keys)
+            self._indexed = True
+
+    async def _migrate_batch(self, name: str, after) -> Tuple[int, object]:
+        """Migrate the next batch after ``_id`` ``after``; returns the documents migrated and the last ``_id`` seen."""
+        docs: List[dict] = await self.db[name].find(
+            {"_id": {"$gt": after}} if after is not None else {}, {"_id": 1, "id": 1, "created_at": 1, "legacy_id": 1}
+        ).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not docs:
+            return 0, None
+        legacy = [doc for doc in docs if "legacy_id" not in doc and isinstance(doc.get("id"), str) and not is_uuid7(doc["id"])]
+        migrated = 0
+        if legacy:
+            result = await self.db[name].bulk_write([
+                UpdateOne(
+                    {"_id": doc["_id"], "legacy_id": {"$exists": False}},
+                    {"$set": {"id": migrated_id(doc), "legacy_id": doc["id"]}},
+                )
+                for doc in legacy
+            ], ordered=False)
+            migrated = result.modified_count
+        return migrated, docs[-1]["_id"]
+
+    async def run(self) -> Dict[str, int]:
+        """Migrate every collection; returns the documents migrated per collection."""
+        await self.ensure_indexes()
+        marker = await self.db.jobs.find_one({"_id": MIGRATION_ID}) or {}
+        if marker.get("done"):
+            return self.migrated
+        if not await self.lease.acquire():
+            return self.migrated
+        try:
+            # Re-read under the lease: the previous holder may have moved on since
+            marker = await self.db.jobs.find_one({"_id": MIGRATION_ID}) or {}
+            resume = marker.get("resume", {})
+            for name in self.collections:
+                self.migrated.setdefault(name, 0)
+                after = resume.get(name)
+                while True:
+                    count, last = await self._migrate_batch(name, after)
+                    if last is None:
+                        break
+                    self.migrated[name] += count
+                    after = last
+                    await self.db.jobs.update_one({"_id": MIGRATION_ID}, {"$set": {f"resume.{name}": after}}, upsert=True)
+                    await self.lease.acquire()
+                    await yield_to_foreground(self.pause)
+            await self.db.jobs.update_one({"_id": MIGRATION_ID}, {"$set": {"done": True, "migrated": self.migrated}}, upsert=True)
+            logger.info(f"Id migration finished: {self.migrated}")
+        finally:
+            await self.lease.release()
+        return self.migrated
+
+    async def _run_in_background(self):
+        try:
+            await self.run()
+        except Exception as e:
+            logger.error(f"Id migration failed, will resume on next start: {e}")
+
+    def start(self):
+        if ID_MIGRATION_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run_in_background())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
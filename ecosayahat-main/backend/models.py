@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import Optional, List, Literal
 from datetime import datetime
-import uuid
+from ids import uuid7
 
 class UserRegister(BaseModel):
     email: EmailStr
@@ -15,7 +15,7 @@ class UserLogin(BaseModel):
 
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     email: EmailStr
     name: str
     role: str
@@ -35,7 +35,7 @@ class Region(BaseModel):
 
 class Attraction(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     region_id: str
     name_ru: str
     name_en: str
@@ -53,7 +53,7 @@ class Attraction(BaseModel):
 
 class Review(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     attraction_id: str
     user_id: str
     user_name: str
@@ -69,18 +69,19 @@ class ReviewCreate(BaseModel):
 
 class Hotel(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     region_id: str
     name: str
     description: str
     price_per_night: int
+    rooms: int = 10
     is_partner: bool = False
     image_url: str
     rating: float = 4.5
 
 class TaxiOrder(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     user_id: str
     driver_id: Optional[str] = None
     from_location: str
@@ -95,14 +96,33 @@ class TaxiOrder(BaseModel):
 class TaxiOrderCreate(BaseModel):
     from_location: str
     to_location: str
-    from_lat: float
-    from_lng: float
-    to_lat: float
-    to_lng: float
+    from_lat: float = Field(ge=-90, le=90, allow_inf_nan=False)
+    from_lng: float = Field(ge=-180, le=180, allow_inf_nan=False)
+    to_lat: float = Field(ge=-90, le=90, allow_inf_nan=False)
+    to_lng: float = Field(ge=-180, le=180, allow_inf_nan=False)
+
+class TaxiQuoteRequest(BaseModel):
+    from_lat: float = Field(ge=-90, le=90, allow_inf_nan=False)
+    from_lng: float = Field(ge=-180, le=180, allow_inf_nan=False)
+    to_lat: float = Field(ge=-90, le=90, allow_inf_nan=False)
+    to_lng: float = Field(ge=-180, le=180, allow_inf_nan=False)
+
+class TaxiQuote(BaseModel):
+    distance_km: float
+    duration_minutes: float
+    fare: int
+
+# None for orders stored before coordinates were validated, whose quote is not a number
+class QuotedTaxiOrder(TaxiOrder):
+    distance_km: Optional[float] = None
+    duration_minutes: Optional[float] = None
+    fare: Optional[int] = None
+    pickup_km: Optional[float] = None
+    pickup_minutes: Optional[float] = None
 
 class Task(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     title_ru: str
     title_en: str
     title_kz: str
@@ -115,7 +135,7 @@ class Task(BaseModel):
 
 class TaskSubmission(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     user_id: str
     task_id: str
     image_base64: str
@@ -129,7 +149,7 @@ class TaskSubmissionCreate(BaseModel):
 
 class EcocoinTransaction(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     user_id: str
     amount: int
     type: str
@@ -138,7 +158,7 @@ class EcocoinTransaction(BaseModel):
 
 class ChargingStation(BaseModel):
     model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=uuid7)
     name: str
     latitude: float
     longitude: float
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", 200))
+LOOP_LAG_CHECK_INTERVAL_MS = float(os.environ.get("LOOP_LAG_CHECK_INTERVAL_MS", 50))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+
+logger = logging.getLogger("profiling")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Render a frame's stack root-first in the ``a;b;c`` form used by flamegraph.pl and speedscope."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread (the event loop thread) from a helper thread.
+
+    Only one profile may run at a time; sampling ``sys._current_frames`` costs a
+    few microseconds per sample and does not stop the loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, thread_id: int, seconds: float, interval: float) -> Counter:
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[collapse_stack(frame)] += 1
+            time.sleep(interval)
+        return stacks
+
+    async def profile(self, seconds: float, interval_ms: float) -> str:
+        """Profile the calling event loop's thread for ``seconds`` and return collapsed stacks."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            thread_id = threading.get_ident()
+            seconds = min(seconds, PROFILE_MAX_SECONDS)
+            loop = asyncio.get_running_loop()
+            done = loop.create_future()
+
+            def run():
+                try:
+                    result = self._sample(thread_id, seconds, interval_ms / 1000)
+                    loop.call_soon_threadsafe(done.set_result, result)
+                except Exception as e:
+                    loop.call_soon_threadsafe(done.set_exception, e)
+
+            threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+            stacks = await done
+        finally:
+            self._lock.release()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class LoopLagMonitor:
+    """Detects callbacks that block the event loop longer than ``threshold_ms``.
+
+    A coroutine on the loop refreshes a heartbeat; a watchdog thread checks it
+    and, when it is stale, logs the loop thread's current stack (the blocking
+    code) once per stall.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_LAG_THRESHOLD_MS, interval_ms: float = LOOP_LAG_CHECK_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = (time.monotonic() - expected) * 1000
+            if lag > self.max_lag_ms:
+                self.max_lag_ms = lag
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+            logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms, loop thread stack:\n{stack}")
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "running": self._task is not None,
+        }
+
+
+profiler = SamplingProfiler()
+loop_lag_monitor = LoopLagMonitor()
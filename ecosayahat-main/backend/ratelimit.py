@@ -0,0 +1,210 @@
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import jwt
+from pymongo import ReturnDocument
+
+from auth import JWT_SECRET, JWT_ALGORITHM
+from metrics import rate_limited
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")
+# Only enable behind a proxy that appends the peer address to X-Forwarded-For; clients can send any
+# entries of their own, so the address is taken RATE_LIMIT_PROXY_HOPS entries from the right
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+RATE_LIMIT_PROXY_HOPS = max(1, int(os.environ.get("RATE_LIMIT_PROXY_HOPS", 1)))
+
+
+class RatePolicy:
+    def __init__(self, name: str, method: str, path: str, per_minute: float, burst: int,
+                 key: str = "user", max_concurrent: Optional[int] = None):
+        self.name = name
+        self.method = method
+        self.path = re.compile(path)
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.key = key
+        self.max_concurrent = max_concurrent
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self.path.fullmatch(path) is not None
+
+
+POLICIES = [
+    RatePolicy("login", "POST", r"/api/auth/login", per_minute=10, burst=5, key="ip"),
+    RatePolicy("register", "POST", r"/api/auth/register", per_minute=5, burst=5, key="ip"),
+    RatePolicy("ai_chat", "POST", r"/api/ai-assistant/chat(/upload)?", per_minute=10, burst=5, max_concurrent=2),
+    RatePolicy("task_submit", "POST", r"/api/tasks/submit(/upload)?", per_minute=20, burst=10, max_concurrent=3),
+]
+
+
+class MemoryBucketStore:
+    """Token buckets held in this worker's memory."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def ensure_index(self):
+        pass
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; returns 0 when allowed, otherwise the seconds until enough tokens refill."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (cost - tokens) / rate
+        if len(self._buckets) > self.max_keys:
+            # Buckets idle long enough to be full again carry no state
+            self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < burst / rate}
+        return retry_after
+
+
+class MongoBucketStore:
+    """Token buckets shared by all workers, updated atomically with a single pipeline update."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    async def ensure_index(self):
+        if not self._indexed:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        await self.ensure_index()
+
+        now = datetime.now(timezone.utc)
+        refilled = {"$min": [burst, {"$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [{"$divide": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, 1000]}, rate]},
+        ]}]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "expires_at": now + timedelta(seconds=burst / rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["allowed"]:
+            return 0.0
+        return (cost - doc["tokens"]) / rate
+
+
+def create_store(db):
+    if RATE_LIMIT_STORE == "mongo":
+        return MongoBucketStore(db.rate_limits)
+    return MemoryBucketStore()
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def client_ip(scope, trust_proxy: bool = RATE_LIMIT_TRUST_PROXY, hops: int = RATE_LIMIT_PROXY_HOPS) -> str:
+    """Client address; with ``trust_proxy``, the X-Forwarded-For entry added by the outermost of ``hops`` proxies."""
+    if trust_proxy:
+        entries = [e.strip() for e in _header(scope, b"x-forwarded-for").split(",") if e.strip()]
+        if len(entries) >= hops:
+            return entries[-hops]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def user_key(scope) -> Optional[str]:
+    """User id from a valid bearer token, without touching the database."""
+    authorization = _header(scope, b"authorization")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get("user_id")
+
+
+class RateLimitMiddleware:
+    """Applies token-bucket and concurrency limits before the request body is read or routed.
+
+    Policies keyed by ``user`` fall back to the client IP for anonymous or
+    invalid tokens, which the endpoint then rejects anyway.
+    """
+
+    def __init__(self, app, store, policies: List[RatePolicy] = POLICIES):
+        self.app = app
+        self.store = store
+        self.policies = policies
+        self._in_flight: Dict[str, int] = {}
+
+    async def _reject(self, send, policy: RatePolicy, retry_after: float, detail: str):
+        rate_limited.inc(policy.name)
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        policy = next((p for p in self.policies if p.matches(scope["method"], scope["path"])), None)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        identity = (user_key(scope) if policy.key == "user" else None) or f"ip:{client_ip(scope)}"
+        key = f"{policy.name}:{identity}"
+
+        try:
+            retry_after = await self.store.take(key, policy.rate, policy.burst)
+        except Exception as e:
+            # Fail open: an unavailable shared store must not take the endpoints down with it
+            logging.error(f"Rate limit store error: {e}")
+            retry_after = 0.0
+        if retry_after > 0:
+            await self._reject(send, policy, retry_after, "Too many requests")
+            return
+
+        if policy.max_concurrent is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self._in_flight.get(key, 0) >= policy.max_concurrent:
+            await self._reject(send, policy, 1, "Too many concurrent requests")
+            return
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
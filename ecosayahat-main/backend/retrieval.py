@@ -0,0 +1,173 @@
+import hashlib
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import retrieval_duration
+
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 4))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Crude stemming for Russian and Kazakh inflection: compare words by their first characters
+STEM_LENGTH = 6
+
+LANGUAGES = ("ru", "en", "kz")
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token[:STEM_LENGTH] for token in TOKEN_RE.findall(text.lower()) if len(token) > 1 or token.isdigit()]
+
+
+def _localized(doc: dict, field: str, language: str) -> str:
+    return doc.get(f"{field}_{language}") or doc.get(f"{field}_en") or doc.get(field, "")
+
+
+def _all_languages(doc: dict, field: str) -> str:
+    return " ".join(doc.get(f"{field}_{lang}", "") for lang in LANGUAGES) or doc.get(field, "")
+
+
+def catalog_documents(catalog) -> Dict[str, Tuple[str, Callable[[str], str]]]:
+    """Searchable text (every language at once) and a snippet renderer for each catalog entity."""
+    regions_by_id = {r["id"]: r for r in catalog.regions}
+
+    def region_name(region_id: str, language: str) -> str:
+        region = regions_by_id.get(region_id)
+        return _localized(region, "name", language) if region else ""
+
+    documents = {}
+    for region in catalog.regions:
+        documents[f"region:{region['id']}"] = (
+            _all_languages(region, "name") + " " + _all_languages(region, "description"),
+            lambda lang, r=region: f"Region {_localized(r, 'name', lang)}: {_localized(r, 'description', lang).rstrip('.')}.",
+        )
+    for attraction in catalog.attractions:
+        documents[f"attraction:{attraction['id']}"] = (
+            " ".join([_all_languages(attraction, "name"), _all_languages(attraction, "description"),
+                      _all_languages(regions_by_id.get(attraction["region_id"], {}), "name")]),
+            lambda lang, a=attraction: (
+                f"Attraction {_localized(a, 'name', lang)} ({region_name(a['region_id'], lang)}): "
+                f"{_localized(a, 'description', lang).rstrip('.')}. Rating {a.get('average_rating', 0)}."
+            ),
+        )
+    for hotel in catalog.hotels:
+        documents[f"hotel:{hotel['id']}"] = (
+            " ".join([hotel["name"], hotel["description"], "hotel hotels stay отель отели жильё қонақүй",
+                      _all_languages(regions_by_id.get(hotel["region_id"], {}), "name")]),
+            lambda lang, h=hotel: (
+                f"Hotel {h['name']} ({region_name(h['region_id'], lang)}): {h['description'].rstrip('.')}. "
+                f"{h['price_per_night']} KZT per night, rating {h.get('rating', 0)}"
+                + (", eco-partner." if h.get("is_partner") else ".")
+            ),
+        )
+    for task in catalog.tasks:
+        documents[f"task:{task['id']}"] = (
+            " ".join([_all_languages(task, "title"), _all_languages(task, "description"), "eco task tasks coins reward задание задания монеты награда тапсырма тапсырмалар"]),
+            lambda lang, t=task: (
+                f"Eco-task {_localized(t, 'title', lang)}: {_localized(t, 'description', lang).rstrip('.')}. "
+                f"Reward {t['reward_coins']} eco-coins."
+            ),
+        )
+    return documents
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index that can be updated document by document."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.terms: Dict[str, List[str]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def remove(self, doc_id: str):
+        if doc_id not in self.lengths:
+            return
+        for term in self.terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        self.fingerprints.pop(doc_id, None)
+
+    def add(self, doc_id: str, text: str):
+        fingerprint = hashlib.sha1(text.encode()).hexdigest()
+        if self.fingerprints.get(doc_id) == fingerprint:
+            return
+        self.remove(doc_id)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.terms[doc_id] = list(counts)
+        self.lengths[doc_id] = len(tokens)
+        self.fingerprints[doc_id] = fingerprint
+        self.total_length += len(tokens)
+
+    def search(self, query: str, k: int, min_relative_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Top ``k`` documents, dropping those scoring below ``min_relative_score`` times the best one."""
+        if not self.lengths:
+            return []
+        n = len(self.lengths)
+        average_length = self.total_length / n
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        if ranked and min_relative_score:
+            cutoff = ranked[0][1] * min_relative_score
+            ranked = [(doc_id, score) for doc_id, score in ranked if score >= cutoff]
+        return ranked
+
+
+class CatalogRetriever:
+    """Keeps a BM25 index in step with the catalog and returns localized snippets for a question.
+
+    When the catalog version changes only documents whose text changed are
+    re-indexed.
+    """
+
+    def __init__(self, catalog, top_k: int = RETRIEVAL_TOP_K):
+        self.catalog = catalog
+        self.top_k = top_k
+        self.index = BM25Index()
+        self.version = None
+        self._renderers: Dict[str, Callable[[str], str]] = {}
+
+    def sync(self):
+        if self.version == self.catalog.version:
+            return
+        documents = catalog_documents(self.catalog)
+        for doc_id in set(self.index.lengths) - set(documents):
+            self.index.remove(doc_id)
+        for doc_id, (text, _) in documents.items():
+            self.index.add(doc_id, text)
+        self._renderers = {doc_id: render for doc_id, (_, render) in documents.items()}
+        self.version = self.catalog.version
+
+    def search(self, query: str, language: str, k: Optional[int] = None) -> List[str]:
+        start = time.perf_counter()
+        self.sync()
+        # Weak matches on common words would only pad the prompt
+        hits = self.index.search(query, k or self.top_k, min_relative_score=0.35)
+        language = language if language in LANGUAGES else "en"
+        snippets = [self._renderers[doc_id](language) for doc_id, _ in hits]
+        retrieval_duration.observe(value=time.perf_counter() - start)
+        return snippets
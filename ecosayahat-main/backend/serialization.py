@@ -0,0 +1,65 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=None)
+def model_fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    """(name, default) pairs of a model, PydanticUndefined for required fields and factories."""
+    return tuple(
+        (name, field.default if field.default_factory is None else PydanticUndefined)
+        for name, field in model.model_fields.items()
+    )
+
+
+@lru_cache(maxsize=None)
+def projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection returning exactly the fields of ``model``."""
+    fields = {name: 1 for name, _ in model_fields(model)}
+    fields["_id"] = 0
+    return fields
+
+
+def project(doc: dict, model: Type[BaseModel]) -> dict:
+    """Shape a trusted document like ``model`` without validating it.
+
+    Documents are validated by the model when written, so reads only have to
+    drop unknown keys and fill defaults for fields added after the write.
+    """
+    out = {}
+    for name, default in model_fields(model):
+        if name in doc:
+            out[name] = doc[name]
+        elif default is not PydanticUndefined:
+            out[name] = default
+    return out
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_list(docs: Iterable[dict], model: Type[BaseModel]) -> List[dict]:
+    return [project(doc, model) for doc in docs]
+
+
+def trusted_response(docs: Iterable[dict], model: Type[BaseModel]) -> FastJSONResponse:
+    return FastJSONResponse(trusted_list(docs, model))
@@ -1,37 +1,98 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
-from dotenv import load_dotenv
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Query, Response
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
-import uuid
-from pathlib import Path
 from datetime import datetime, timezone
 from typing import List, Optional
 import asyncio
+import time
+from contextlib import asynccontextmanager
 
+from database import client, db, secondary_db, pool_stats, deadline
 from models import (
     User, UserRegister, UserLogin, Region, Attraction, Review, ReviewCreate,
-    Hotel, TaxiOrder, TaxiOrderCreate, Task, TaskSubmission, TaskSubmissionCreate,
+    Hotel, TaxiOrder, TaxiOrderCreate, TaxiQuoteRequest, TaxiQuote, QuotedTaxiOrder, Task, TaskSubmission, TaskSubmissionCreate,
     EcocoinTransaction, ChargingStation, AIMessage
 )
 from auth import (
     hash_password, verify_password, create_access_token, get_current_user
 )
+from catalog import Catalog, EMPTY_LIST
+from snapshot import create_snapshot
+from loaders import EntityLoader, RequestLoader, USER_CACHE_TTL_SECONDS
+from compression import CompressionMiddleware
+from metrics import (
+    MetricsMiddleware, metrics_response, background_tasks_in_flight
+)
+from profiling import profiler, loop_lag_monitor, PROFILE_MAX_SECONDS
+from ratelimit import RateLimitMiddleware, create_store
+from tracing import TracingMiddleware, start_span, hold_current_trace
+from serialization import FastJSONResponse, project, projection, trusted_list, trusted_response
+from images import UploadLimitMiddleware, upload_to_base64
+from verification import BatchVerifier
+from llm import llm, CircuitOpenError
+from conversations import ConversationStore, ContextBuilder, ASSISTANT_SYSTEM_MESSAGE
+from retrieval import CatalogRetriever
+from inventory import InventoryStore, stay_nights, rooms_for
+from hotel_search import HotelSearch
+from ids import NEWEST_FIRST, uuid7, id_query, keyset_filter
+from migrations import IdMigration
+from bundles import BundleBuilder, msgpack
+from health import warmup
+from exports import EXPORTS, EXPORT_FORMATS, Exporter, build_query
+from archive import Archiver
+from fares import annotate, ensure_pickup_index, pickup_point
+from image_proxy import ImageProxy, ImageProxyError, IMAGE_PROXY_CACHE_CONTROL, negotiate_format
 
-from emergentintegrations.llm.chat import LlmChat, UserMessage, ImageContent
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup, in order; shutdown undoes it in reverse
+    if os.environ.get("LOOP_LAG_MONITOR", "true").lower() == "true":
+        loop_lag_monitor.start()
+    catalog.snapshot = create_snapshot(os.environ['DB_NAME'])
+    # In the background: the server answers /health/live at once and /health/ready once warm
+    warmup.start()
+    archiver.start()
+    id_migration.start()
+    try:
+        yield
+    finally:
+        id_migration.stop()
+        await archiver.stop()
+        warmup.stop()
+        if catalog.snapshot is not None:
+            catalog.snapshot.close()
+        await image_proxy.close()
+        loop_lag_monitor.stop()
+        client.close()
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
-EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY", "")
+
+background_tasks = set()
+
+def spawn_background(kind: str, coro):
+    background_tasks_in_flight.inc(kind)
+    release_trace = hold_current_trace()
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+
+    def done(finished):
+        background_tasks.discard(finished)
+        background_tasks_in_flight.dec(kind)
+        release_trace()
+
+    task.add_done_callback(done)
+    return task
+
+user_loader = EntityLoader(db.users, ttl=USER_CACHE_TTL_SECONDS, projection={"_id": 0, "password_hash": 0})
+
+def get_user_loader() -> RequestLoader:
+    return RequestLoader(user_loader)
 
 @api_router.post("/auth/register")
 async def register(user_data: UserRegister):
@@ -57,7 +118,8 @@ async def register(user_data: UserRegister):
 
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
-    user_data = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+    with deadline("auth"):
+        user_data = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user_data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -69,43 +131,50 @@ async def login(credentials: UserLogin):
     return {"token": token, "user": user}
 
 @api_router.get("/auth/me", response_model=User)
-async def get_me(current_user: dict = Depends(get_current_user)):
-    user_data = await db.users.find_one({"id": current_user["user_id"]}, {"_id": 0})
+async def get_me(current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    user_data = await users.load(current_user["user_id"])
     if not user_data:
         raise HTTPException(status_code=404, detail="User not found")
     return User(**user_data)
 
 @api_router.get("/regions", response_model=List[Region])
-async def get_regions():
-    regions = await db.regions.find({}, {"_id": 0}).to_list(100)
-    if not regions:
-        await init_regions()
-        regions = await db.regions.find({}, {"_id": 0}).to_list(100)
-    return [Region(**r) for r in regions]
+async def get_regions(request: Request):
+    await catalog.ensure()
+    return catalog.payload("regions").response(request)
 
 @api_router.get("/regions/{region_id}/attractions", response_model=List[Attraction])
-async def get_attractions(region_id: str):
-    attractions = await db.attractions.find({"region_id": region_id}, {"_id": 0}).to_list(100)
-    return [Attraction(**a) for a in attractions]
+async def get_attractions(region_id: str, request: Request):
+    await catalog.ensure()
+    return catalog.payload(f"attractions:{region_id}", EMPTY_LIST).response(request)
 
 @api_router.get("/attractions/{attraction_id}", response_model=Attraction)
-async def get_attraction(attraction_id: str):
-    attraction = await db.attractions.find_one({"id": attraction_id}, {"_id": 0})
-    if not attraction:
+async def get_attraction(attraction_id: str, request: Request):
+    await catalog.ensure()
+    payload = catalog.payload(f"attraction:{attraction_id}")
+    if payload is None:
         raise HTTPException(status_code=404, detail="Attraction not found")
-    return Attraction(**attraction)
+    return payload.response(request)
+
+async def keyset(collection, query: dict, before: Optional[str]) -> dict:
+    try:
+        return await keyset_filter(collection, query, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @api_router.get("/attractions/{attraction_id}/reviews", response_model=List[Review])
-async def get_reviews(attraction_id: str):
-    reviews = await db.reviews.find(
-        {"attraction_id": attraction_id, "status": "approved"}, 
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    return [Review(**r) for r in reviews]
+async def get_reviews(attraction_id: str, before: Optional[str] = None, limit: int = Query(100, ge=1, le=100)):
+    with deadline("list"):
+        reviews = await db.reviews.find(
+            await keyset(db.reviews, {"attraction_id": attraction_id, "status": "approved"}, before), 
+            projection(Review)
+        ).sort(NEWEST_FIRST).to_list(limit)
+    return trusted_response(reviews, Review)
 
 @api_router.post("/attractions/{attraction_id}/reviews", response_model=Review)
-async def create_review(attraction_id: str, review_data: ReviewCreate, current_user: dict = Depends(get_current_user)):
-    user_data = await db.users.find_one({"id": current_user["user_id"]}, {"_id": 0})
+async def create_review(attraction_id: str, review_data: ReviewCreate, current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    user_data = await users.load(current_user["user_id"])
+    if not user_data:
+        raise HTTPException(status_code=404, detail="User not found")
     
     review = Review(
         attraction_id=attraction_id,
@@ -120,43 +189,148 @@ async def create_review(attraction_id: str, review_data: ReviewCreate, current_u
     await db.reviews.insert_one(review.model_dump())
     return review
 
+@api_router.get("/hotels/search")
+async def search_hotels(
+    region_id: Optional[str] = None,
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0),
+    is_partner: Optional[bool] = None,
+    sort: str = Query("price", description="Comma-separated keys (price, rating, name); prefix with - for descending"),
+    fields: str = Query("", description="Comma-separated hotel fields to return; all when empty"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None
+):
+    await catalog.ensure()
+    try:
+        result = hotel_search.search(region_id, min_price, max_price, min_rating, is_partner, sort, fields, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(result)
+
 @api_router.get("/hotels/{region_id}", response_model=List[Hotel])
-async def get_hotels(region_id: str):
-    hotels = await db.hotels.find({"region_id": region_id}, {"_id": 0}).to_list(100)
-    if not hotels:
-        await init_hotels()
-        hotels = await db.hotels.find({"region_id": region_id}, {"_id": 0}).to_list(100)
-    return [Hotel(**h) for h in hotels]
+async def get_hotels(region_id: str, request: Request):
+    await catalog.ensure()
+    return catalog.payload(f"hotels:{region_id}", EMPTY_LIST).response(request)
+
+@api_router.get("/regions/{region_id}/bundle")
+async def get_region_bundle(
+    region_id: str,
+    request: Request,
+    lang: str = Query("ru", pattern="^(ru|en|kz)$"),
+    since: Optional[str] = Query(None, description="Bundle version the client already has; returns only the changes"),
+    format: str = Query("json", pattern="^(json|msgpack)$")
+):
+    if format == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=406, detail="MessagePack is not available on this server")
+    await catalog.ensure()
+    payload = await region_bundles.payload(region_id, lang, since, format)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Region not found")
+    return payload.response(request)
+
+@api_router.get("/img")
+async def get_image(
+    request: Request,
+    url: str = Query(..., max_length=2048),
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Wanted width; rounded up to the nearest cached width"),
+    format: str = Query("auto", pattern="^(auto|webp|jpeg)$")
+):
+    fmt = negotiate_format(format, request.headers.get("accept", ""))
+    try:
+        data, media_type = await image_proxy.variant(url, w, fmt)
+    except ImageProxyError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    headers = {"Cache-Control": IMAGE_PROXY_CACHE_CONTROL}
+    if format == "auto":
+        headers["Vary"] = "Accept"
+    return Response(content=data, media_type=media_type, headers=headers)
+
+@api_router.get("/regions/{region_id}/hotels/availability")
+async def get_hotel_availability(region_id: str, check_in: str, check_out: str, guests: int = Query(2, ge=1)):
+    try:
+        nights = stay_nights(check_in, check_out)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await catalog.ensure()
+    hotels = [h for h in catalog.hotels if h["region_id"] == region_id]
+    free = await hotel_inventory.availability(hotels, nights)
+    rooms = rooms_for(guests)
+    return [
+        {
+            "hotel_id": hotel["id"],
+            "available_rooms": free[hotel["id"]],
+            "available": free[hotel["id"]] >= rooms,
+            "nights": len(nights),
+            "rooms": rooms,
+            "total_price": hotel["price_per_night"] * len(nights) * rooms
+        }
+        for hotel in hotels
+    ]
+
+async def debit_coins(user_id: str, most: int) -> int:
+    """Take up to ``most`` coins from the user's balance; returns how many were taken.
+
+    Reads the balance from the primary and debits only while it still covers
+    the amount, so concurrent bookings, on any worker, cannot overdraw it.
+    """
+    while True:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "ecocoin_balance": 1})
+        coins = min(most, (user or {}).get("ecocoin_balance", 0))
+        if coins <= 0:
+            return 0
+        result = await db.users.update_one(
+            {"id": user_id, "ecocoin_balance": {"$gte": coins}},
+            {"$inc": {"ecocoin_balance": -coins}}
+        )
+        if result.modified_count == 1:
+            return coins
 
 @api_router.post("/hotels/book")
-async def book_hotel(hotel_id: str, check_in: str, check_out: str, guests: int, current_user: dict = Depends(get_current_user)):
-    hotel = await db.hotels.find_one({"id": hotel_id}, {"_id": 0})
+async def book_hotel(hotel_id: str, check_in: str, check_out: str, guests: int, current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    await catalog.ensure()
+    hotel = catalog.hotels_by_id.get(hotel_id)
     if not hotel:
         raise HTTPException(status_code=404, detail="Hotel not found")
+    if guests < 1:
+        raise HTTPException(status_code=400, detail="At least one guest is required")
+    try:
+        nights = stay_nights(check_in, check_out)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    rooms = rooms_for(guests)
+    if not await hotel_inventory.reserve(hotel, nights, rooms):
+        raise HTTPException(status_code=409, detail="No rooms available for the selected dates")
     
     booking = {
-        "id": str(uuid.uuid4()),
+        "id": uuid7(),
         "user_id": current_user["user_id"],
         "hotel_id": hotel_id,
         "hotel_name": hotel["name"],
         "check_in": check_in,
         "check_out": check_out,
         "guests": guests,
-        "total_price": hotel["price_per_night"],
+        "rooms": rooms,
+        "nights": len(nights),
+        "price_per_night": hotel["price_per_night"],
+        "total_price": hotel["price_per_night"] * len(nights) * rooms,
         "payment_status": "completed",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.bookings.insert_one(booking)
+    try:
+        # insert_one adds an ObjectId _id to the dict it is given, which the response cannot serialize
+        await db.bookings.insert_one(dict(booking))
+    except Exception:
+        await hotel_inventory.release(hotel_id, nights, rooms)
+        raise
     
     if hotel["is_partner"]:
-        user = await db.users.find_one({"id": current_user["user_id"]}, {"_id": 0})
-        coins_used = min(100, user.get("ecocoin_balance", 0))
+        coins_used = await debit_coins(current_user["user_id"], 100)
         if coins_used > 0:
-            await db.users.update_one(
-                {"id": current_user["user_id"]},
-                {"$inc": {"ecocoin_balance": -coins_used}}
-            )
+            users.invalidate(current_user["user_id"])
             transaction = EcocoinTransaction(
                 user_id=current_user["user_id"],
                 amount=-coins_used,
@@ -171,7 +345,7 @@ async def book_hotel(hotel_id: str, check_in: str, check_out: str, guests: int,
 @api_router.post("/contact/send")
 async def send_contact_email(name: str, email: str, message: str):
     contact_message = {
-        "id": str(uuid.uuid4()),
+        "id": uuid7(),
         "name": name,
         "email": email,
         "message": message,
@@ -185,7 +359,7 @@ async def send_contact_email(name: str, email: str, message: str):
     return {"message": "Message sent successfully", "contact_email": "contact@ecosayahat.kz"}
 
 
-@api_router.post("/taxi/order", response_model=TaxiOrder)
+@api_router.post("/taxi/order", response_model=QuotedTaxiOrder)
 async def create_taxi_order(order_data: TaxiOrderCreate, current_user: dict = Depends(get_current_user)):
     order = TaxiOrder(
         user_id=current_user["user_id"],
@@ -199,16 +373,41 @@ async def create_taxi_order(order_data: TaxiOrderCreate, current_user: dict = De
         created_at=datetime.now(timezone.utc).isoformat()
     )
     
-    await db.taxi_orders.insert_one(order.model_dump())
-    return order
+    await db.taxi_orders.insert_one({**order.model_dump(), "pickup": pickup_point(order.from_lat, order.from_lng)})
+    return annotate([order.model_dump()])[0]
 
-@api_router.get("/taxi/orders", response_model=List[TaxiOrder])
-async def get_taxi_orders(current_user: dict = Depends(get_current_user)):
-    if current_user["role"] == "taxi_driver":
-        orders = await db.taxi_orders.find({"status": "pending"}, {"_id": 0}).to_list(100)
-    else:
-        orders = await db.taxi_orders.find({"user_id": current_user["user_id"]}, {"_id": 0}).to_list(100)
-    return [TaxiOrder(**o) for o in orders]
+@api_router.post("/taxi/quote", response_model=TaxiQuote)
+async def quote_taxi_trip(trip: TaxiQuoteRequest, current_user: dict = Depends(get_current_user)):
+    return annotate([trip.model_dump()])[0]
+
+@api_router.get("/taxi/orders", response_model=List[QuotedTaxiOrder])
+async def get_taxi_orders(
+    current_user: dict = Depends(get_current_user),
+    before: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Driver position; pending orders come nearest pickup first"),
+    lng: Optional[float] = Query(None, ge=-180, le=180)
+):
+    return trusted_response(await list_taxi_orders(current_user, before, limit, lat, lng), QuotedTaxiOrder)
+
+async def list_taxi_orders(current_user: dict, before: Optional[str] = None, limit: int = 100,
+                           lat: Optional[float] = None, lng: Optional[float] = None) -> List[dict]:
+    """Orders with their fare quote; for a driver who sends a position, the pending orders nearest to them."""
+    if lat is None or lng is None:
+        lat = lng = None
+    with deadline("list"):
+        if current_user["role"] != "taxi_driver":
+            orders = await db.taxi_orders.find(
+                await keyset(db.taxi_orders, {"user_id": current_user["user_id"]}, before), projection(TaxiOrder)
+            ).sort(NEWEST_FIRST).to_list(limit)
+        elif lat is None:
+            orders = await db.taxi_orders.find({"status": "pending"}, projection(TaxiOrder)).to_list(limit)
+        else:
+            # The pickup 2dsphere index returns the nearest orders first, so only the page itself is read
+            orders = await db.taxi_orders.find(
+                {"status": "pending", "pickup": {"$near": {"$geometry": pickup_point(lat, lng)}}}, projection(TaxiOrder)
+            ).to_list(limit)
+    return annotate(orders, lat, lng)
 
 @api_router.post("/taxi/accept/{order_id}")
 async def accept_taxi_order(order_id: str, current_user: dict = Depends(get_current_user)):
@@ -216,7 +415,7 @@ async def accept_taxi_order(order_id: str, current_user: dict = Depends(get_curr
         raise HTTPException(status_code=403, detail="Only taxi drivers can accept orders")
     
     result = await db.taxi_orders.update_one(
-        {"id": order_id, "status": "pending"},
+        {**id_query(order_id), "status": "pending"},
         {"$set": {"driver_id": current_user["user_id"], "status": "accepted"}}
     )
     
@@ -226,60 +425,65 @@ async def accept_taxi_order(order_id: str, current_user: dict = Depends(get_curr
     return {"message": "Order accepted"}
 
 @api_router.get("/charging-stations", response_model=List[ChargingStation])
-async def get_charging_stations():
-    stations = await db.charging_stations.find({}, {"_id": 0}).to_list(100)
-    if not stations:
-        await init_charging_stations()
-        stations = await db.charging_stations.find({}, {"_id": 0}).to_list(100)
-    return [ChargingStation(**s) for s in stations]
+async def get_charging_stations(request: Request):
+    await catalog.ensure()
+    return catalog.payload("charging_stations").response(request)
 
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks():
-    tasks = await db.tasks.find({}, {"_id": 0}).to_list(100)
-    if not tasks:
-        await init_tasks()
-        tasks = await db.tasks.find({}, {"_id": 0}).to_list(100)
-    return [Task(**t) for t in tasks]
+async def get_tasks(request: Request):
+    await catalog.ensure()
+    return catalog.payload("tasks").response(request)
 
 @api_router.post("/tasks/submit", response_model=TaskSubmission)
 async def submit_task(submission_data: TaskSubmissionCreate, current_user: dict = Depends(get_current_user)):
+    return await create_task_submission(current_user["user_id"], submission_data.task_id, submission_data.image_base64)
+
+@api_router.post("/tasks/submit/upload", response_model=TaskSubmission)
+async def submit_task_upload(
+    task_id: str = Form(...),
+    image: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    image_base64 = await upload_to_base64(image)
+    return await create_task_submission(current_user["user_id"], task_id, image_base64)
+
+async def create_task_submission(user_id: str, task_id: str, image_base64: str) -> TaskSubmission:
     submission = TaskSubmission(
-        user_id=current_user["user_id"],
-        task_id=submission_data.task_id,
-        image_base64=submission_data.image_base64,
+        user_id=user_id,
+        task_id=task_id,
+        image_base64=image_base64,
         status="verifying",
         created_at=datetime.now(timezone.utc).isoformat()
     )
     
     await db.task_submissions.insert_one(submission.model_dump())
     
-    asyncio.create_task(verify_task_submission(submission.id, submission_data.task_id, submission_data.image_base64, current_user["user_id"]))
+    spawn_background("task_verification", verify_task_submission(submission.id, task_id, image_base64, user_id))
     
     return submission
 
+TASK_VERIFY_SYSTEM_MESSAGE = "You are an eco-task verification assistant. Analyze the image and determine if it shows the user completing an eco-friendly task like recycling, cleaning, or visiting nature. Respond with 'VERIFIED' if valid, or 'REJECTED' if not."
+
+async def send_task_verification(text: str, images: List[str]) -> str:
+    return await llm.complete("task_verification", TASK_VERIFY_SYSTEM_MESSAGE, text, images)
+
+task_verifier = BatchVerifier(send_task_verification)
+
 async def verify_task_submission(submission_id: str, task_id: str, image_base64: str, user_id: str):
+    with start_span("verify_task_submission", submission_id=submission_id, task_id=task_id):
+        await _verify_task_submission(submission_id, task_id, image_base64, user_id)
+
+async def _verify_task_submission(submission_id: str, task_id: str, image_base64: str, user_id: str):
     try:
         task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
         if not task:
             return
         
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"task_verify_{submission_id}",
-            system_message="You are an eco-task verification assistant. Analyze the image and determine if it shows the user completing an eco-friendly task like recycling, cleaning, or visiting nature. Respond with 'VERIFIED' if valid, or 'REJECTED' if not."
-        ).with_model("gemini", "gemini-3-flash-preview")
-        
-        image_content = ImageContent(image_base64=image_base64)
-        user_message = UserMessage(
-            text=f"Task: {task['title_en']}. Description: {task['description_en']}. Does this image show completion of this task?",
-            file_contents=[image_content]
-        )
+        approved = await task_verifier.verify(task, image_base64)
         
-        response = await chat.send_message(user_message)
-        
-        if "VERIFIED" in response.upper():
+        if approved:
             await db.task_submissions.update_one(
-                {"id": submission_id},
+                id_query(submission_id),
                 {"$set": {"status": "approved", "verified_at": datetime.now(timezone.utc).isoformat()}}
             )
             
@@ -287,6 +491,7 @@ async def verify_task_submission(submission_id: str, task_id: str, image_base64:
                 {"id": user_id},
                 {"$inc": {"ecocoin_balance": task["reward_coins"]}}
             )
+            user_loader.invalidate(user_id)
             
             transaction = EcocoinTransaction(
                 user_id=user_id,
@@ -298,78 +503,97 @@ async def verify_task_submission(submission_id: str, task_id: str, image_base64:
             await db.ecocoin_transactions.insert_one(transaction.model_dump())
         else:
             await db.task_submissions.update_one(
-                {"id": submission_id},
+                id_query(submission_id),
                 {"$set": {"status": "rejected", "verified_at": datetime.now(timezone.utc).isoformat()}}
             )
     except Exception as e:
         logging.error(f"Error verifying task: {e}")
         await db.task_submissions.update_one(
-            {"id": submission_id},
+            id_query(submission_id),
             {"$set": {"status": "error"}}
         )
 
 @api_router.get("/ecocoins/balance")
-async def get_balance(current_user: dict = Depends(get_current_user)):
-    user = await db.users.find_one({"id": current_user["user_id"]}, {"_id": 0, "ecocoin_balance": 1})
+async def get_balance(current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    user = await users.load(current_user["user_id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     return {"balance": user.get("ecocoin_balance", 0)}
 
 @api_router.get("/ecocoins/transactions", response_model=List[EcocoinTransaction])
-async def get_transactions(current_user: dict = Depends(get_current_user)):
-    transactions = await db.ecocoin_transactions.find(
-        {"user_id": current_user["user_id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    return [EcocoinTransaction(**t) for t in transactions]
+async def get_transactions(current_user: dict = Depends(get_current_user), before: Optional[str] = None, limit: int = Query(100, ge=1, le=100)):
+    return trusted_response(await list_transactions(current_user["user_id"], before, limit), EcocoinTransaction)
+
+async def list_transactions(user_id: str, before: Optional[str] = None, limit: int = 100) -> List[dict]:
+    with deadline("list"):
+        return await db.ecocoin_transactions.find(
+            await keyset(db.ecocoin_transactions, {"user_id": user_id}, before),
+            projection(EcocoinTransaction)
+        ).sort(NEWEST_FIRST).to_list(limit)
 
 @api_router.get("/ecocoins/leaderboard")
 async def get_leaderboard():
-    users = await db.users.find(
-        {"role": "tourist"},
-        {"_id": 0, "name": 1, "ecocoin_balance": 1}
-    ).sort("ecocoin_balance", -1).limit(10).to_list(10)
-    return users
+    return await list_leaderboard()
+
+async def list_leaderboard() -> List[dict]:
+    with deadline("leaderboard"):
+        return await secondary_db.users.find(
+            {"role": "tourist"},
+            {"_id": 0, "name": 1, "ecocoin_balance": 1}
+        ).sort("ecocoin_balance", -1).limit(10).to_list(10)
 
 @api_router.post("/ai-assistant/chat")
 async def ai_chat(message_data: AIMessage, current_user: dict = Depends(get_current_user)):
+    response = await assistant_reply(current_user["user_id"], message_data.message, message_data.language, message_data.image_base64)
+    return {"response": response}
+
+@api_router.post("/ai-assistant/chat/upload")
+async def ai_chat_upload(
+    message: str = Form(...),
+    language: str = Form("ru"),
+    image: Optional[UploadFile] = File(None),
+    current_user: dict = Depends(get_current_user)
+):
+    image_base64 = await upload_to_base64(image) if image is not None else None
+    response = await assistant_reply(current_user["user_id"], message, language, image_base64)
+    return {"response": response}
+
+async def assistant_reply(user_id: str, message: str, language: str, image_base64: Optional[str] = None) -> str:
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"user_{current_user['user_id']}",
-            system_message=f"""You are EcoSayahat AI Assistant. You help tourists in Kazakhstan with eco-tourism information.
-You speak multiple languages: Russian, English, and Kazakh. Respond in {message_data.language}.
-You can answer questions about regions (Caspian, Burabay, Alakol, Balkhash, Kolsay), attractions, hotels, eco-tasks, and eco-coins.
-Be friendly, helpful, and encourage eco-friendly behavior."""
-        ).with_model("gemini", "gemini-3-flash-preview")
-        
-        if message_data.image_base64:
-            image_content = ImageContent(image_base64=message_data.image_base64)
-            user_message = UserMessage(
-                text=message_data.message,
-                file_contents=[image_content]
-            )
-        else:
-            user_message = UserMessage(text=message_data.message)
-        
-        response = await chat.send_message(user_message)
-        return {"response": response}
+        await catalog.ensure()
+        prompt = await assistant_context.build(user_id, message, language)
+        images = [image_base64] if image_base64 else []
+        response = await llm.complete("assistant_chat", ASSISTANT_SYSTEM_MESSAGE, prompt, images)
+        await conversations.append(user_id, message, response)
+        return response
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="AI assistant is temporarily unavailable")
     except Exception as e:
         logging.error(f"AI chat error: {e}")
         raise HTTPException(status_code=500, detail="AI assistant error")
 
+@api_router.delete("/ai-assistant/history")
+async def clear_ai_history(current_user: dict = Depends(get_current_user)):
+    await conversations.clear(current_user["user_id"])
+    return {"message": "History cleared"}
+
 @api_router.get("/admin/reviews", response_model=List[Review])
-async def get_all_reviews(current_user: dict = Depends(get_current_user)):
+async def get_all_reviews(current_user: dict = Depends(get_current_user), before: Optional[str] = None, limit: int = Query(100, ge=1, le=100)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    reviews = await db.reviews.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return [Review(**r) for r in reviews]
+    return trusted_response(await list_all_reviews(before, limit), Review)
+
+async def list_all_reviews(before: Optional[str] = None, limit: int = 100) -> List[dict]:
+    with deadline("list"):
+        return await db.reviews.find(await keyset(db.reviews, {}, before), projection(Review)).sort(NEWEST_FIRST).to_list(limit)
 
 @api_router.post("/admin/reviews/{review_id}/approve")
 async def approve_review(review_id: str, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    await db.reviews.update_one({"id": review_id}, {"$set": {"status": "approved"}})
+    await db.reviews.update_one(id_query(review_id), {"$set": {"status": "approved"}})
     return {"message": "Review approved"}
 
 @api_router.post("/admin/reviews/{review_id}/reject")
@@ -377,7 +601,7 @@ async def reject_review(review_id: str, current_user: dict = Depends(get_current
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    await db.reviews.update_one({"id": review_id}, {"$set": {"status": "rejected"}})
+    await db.reviews.update_one(id_query(review_id), {"$set": {"status": "rejected"}})
     return {"message": "Review rejected"}
 
 @api_router.get("/admin/stats")
@@ -385,18 +609,187 @@ async def get_admin_stats(current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     
-    total_users = await db.users.count_documents({})
-    total_orders = await db.taxi_orders.count_documents({})
-    total_tasks = await db.task_submissions.count_documents({"status": "approved"})
-    pending_reviews = await db.reviews.count_documents({"status": "pending"})
+    return await admin_stats()
+
+async def admin_stats() -> dict:
+    # Finished orders and submissions move to the archive collections, so totals count both
+    total_users, total_orders, archived_orders, total_tasks, archived_tasks, pending_reviews = await asyncio.gather(
+        db.users.count_documents({}),
+        db.taxi_orders.count_documents({}),
+        db.taxi_orders_archive.count_documents({}),
+        db.task_submissions.count_documents({"status": "approved"}),
+        db.task_submissions_archive.count_documents({"status": "approved"}),
+        db.reviews.count_documents({"status": "pending"}),
+    )
     
     return {
         "total_users": total_users,
-        "total_orders": total_orders,
-        "total_tasks_completed": total_tasks,
+        "total_orders": total_orders + archived_orders,
+        "total_tasks_completed": total_tasks + archived_tasks,
         "pending_reviews": pending_reviews
     }
 
+@api_router.get("/admin/db/pool")
+async def get_db_pool_stats(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return pool_stats.snapshot()
+
+@api_router.get("/admin/archive")
+async def get_archive_status(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {"last_run": archiver.last_run, "after_days": archiver.after.days, "batch_size": archiver.batch_size}
+
+@api_router.post("/admin/archive/run")
+async def run_archive(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    moved = await archiver.run_exclusive()
+    if moved is None:
+        raise HTTPException(status_code=409, detail="An archival pass is already running")
+    return {"archived": moved}
+
+@api_router.get("/admin/export/{name}")
+async def export_admin_data(
+    name: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="ISO date or datetime, inclusive"),
+    date_to: Optional[str] = Query(None, description="ISO date (inclusive) or datetime (exclusive)"),
+    cursor: Optional[str] = Query(None, description="_cursor of the last row received, to resume an export"),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    export = EXPORTS.get(name)
+    if export is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export; available: {', '.join(EXPORTS)}")
+    try:
+        query = build_query(export, status, user_id, date_from, date_to, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.{format}"
+    return StreamingResponse(
+        exporter.stream(export, format, query, header=cursor is None),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+async def gather_sections(sections: dict) -> dict:
+    """Run dashboard sections concurrently, reporting each one's duration and failure separately."""
+    timings = {}
+    errors = {}
+
+    async def timed(name, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        except Exception as e:
+            logging.error(f"Dashboard section {name} failed: {e}")
+            errors[name] = "unavailable"
+            return None
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    results = await asyncio.gather(*(timed(name, coro) for name, coro in sections.items()))
+    payload = dict(zip(sections, results))
+    payload["timings_ms"] = timings
+    if errors:
+        payload["errors"] = errors
+    return payload
+
+@api_router.get("/dashboard/tourist")
+async def get_tourist_dashboard(region_id: Optional[str] = None, include_catalog: bool = True, current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    payload = await gather_sections({
+        "me": users.load(current_user["user_id"]),
+        "transactions": list_transactions(current_user["user_id"]),
+        "leaderboard": list_leaderboard(),
+        # Clients with an offline region bundle skip the catalog sections
+        **({"catalog": catalog.ensure()} if include_catalog else {}),
+    })
+    me = payload["me"]
+    if me is None and "me" not in payload.get("errors", {}):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    payload["me"] = project(me, User) if me else None
+    payload["balance"] = me.get("ecocoin_balance", 0) if me else None
+    payload["transactions"] = trusted_list(payload["transactions"] or [], EcocoinTransaction)
+    if payload.pop("catalog", None) is not None:
+        payload["regions"] = catalog.regions
+        payload["tasks"] = catalog.tasks
+        payload["charging_stations"] = catalog.charging_stations
+        if region_id:
+            payload["attractions"] = [a for a in catalog.attractions if a["region_id"] == region_id]
+            payload["hotels"] = [h for h in catalog.hotels if h["region_id"] == region_id]
+    return FastJSONResponse(payload)
+
+@api_router.get("/dashboard/driver")
+async def get_driver_dashboard(
+    current_user: dict = Depends(get_current_user),
+    users: RequestLoader = Depends(get_user_loader),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180)
+):
+    if current_user["role"] != "taxi_driver":
+        raise HTTPException(status_code=403, detail="Only taxi drivers can access this dashboard")
+    
+    payload = await gather_sections({
+        "me": users.load(current_user["user_id"]),
+        "orders": list_taxi_orders(current_user, lat=lat, lng=lng),
+        "catalog": catalog.ensure(),
+    })
+    payload["me"] = project(payload["me"], User) if payload["me"] else None
+    payload["orders"] = trusted_list(payload["orders"] or [], QuotedTaxiOrder)
+    if payload.pop("catalog", None) is not None:
+        payload["charging_stations"] = catalog.charging_stations
+    return FastJSONResponse(payload)
+
+@api_router.get("/dashboard/admin")
+async def get_admin_dashboard(current_user: dict = Depends(get_current_user), users: RequestLoader = Depends(get_user_loader)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    payload = await gather_sections({
+        "me": users.load(current_user["user_id"]),
+        "stats": admin_stats(),
+        "reviews": list_all_reviews(),
+    })
+    payload["me"] = project(payload["me"], User) if payload["me"] else None
+    payload["reviews"] = trusted_list(payload["reviews"] or [], Review)
+    return FastJSONResponse(payload)
+
+@api_router.get("/admin/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """Sample this worker's event loop thread and return flamegraph-compatible collapsed stacks"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    stacks = await profiler.profile(seconds, interval_ms)
+    return Response(
+        content=stacks,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'}
+    )
+
+@api_router.get("/admin/loop-lag")
+async def get_loop_lag(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    
+    return {"pid": os.getpid(), **loop_lag_monitor.snapshot()}
+
 @api_router.get("/db/recreate")
 async def recreate_database():
     """Recreate all initial data - for development use only"""
@@ -410,6 +803,7 @@ async def recreate_database():
     await init_hotels()
     await init_tasks()
     await init_charging_stations()
+    catalog.invalidate()
     
     return {"message": "Database recreated successfully"}
 
@@ -601,6 +995,7 @@ async def init_hotels():
             "name": "Eco Resort Burabay",
             "description": "Эко-отель с видом на озеро",
             "price_per_night": 15000,
+            "rooms": 12,
             "is_partner": True,
             "image_url": "https://images.pexels.com/photos/14106949/pexels-photo-14106949.jpeg?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940",
             "rating": 4.7
@@ -611,6 +1006,7 @@ async def init_hotels():
             "name": "Caspian Eco Lodge",
             "description": "Современный эко-отель на берегу моря",
             "price_per_night": 20000,
+            "rooms": 20,
             "is_partner": True,
             "image_url": "https://images.pexels.com/photos/14106949/pexels-photo-14106949.jpeg?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940",
             "rating": 4.5
@@ -621,6 +1017,7 @@ async def init_hotels():
             "name": "Mountain Eco Camp",
             "description": "Эко-кемпинг в горах",
             "price_per_night": 10000,
+            "rooms": 8,
             "is_partner": False,
             "image_url": "https://images.pexels.com/photos/14106949/pexels-photo-14106949.jpeg?auto=compress&cs=tinysrgb&dpr=2&h=650&w=940",
             "rating": 4.3
@@ -707,8 +1104,68 @@ async def init_charging_stations():
     ]
     await db.charging_stations.insert_many(stations)
 
+catalog = Catalog(db, read_db=secondary_db, seeders={
+    "regions": init_regions,
+    "hotels": init_hotels,
+    "tasks": init_tasks,
+    "charging_stations": init_charging_stations,
+})
+
+hotel_search = HotelSearch(catalog)
+hotel_inventory = InventoryStore(db.hotel_inventory)
+conversations = ConversationStore(db.conversations)
+catalog_retriever = CatalogRetriever(catalog)
+assistant_context = ContextBuilder(conversations, catalog_retriever)
+region_bundles = BundleBuilder(catalog, db.region_bundles)
+rate_limit_store = create_store(db)
+exporter = Exporter(db)
+archiver = Archiver(db)
+id_migration = IdMigration(db)
+image_proxy = ImageProxy()
+
+# Opened concurrently at startup so the first requests do not each pay for a new connection
+WARMUP_MONGO_CONNECTIONS = int(os.environ.get("WARMUP_MONGO_CONNECTIONS", 4))
+
+
+@warmup.step("mongo")
+async def warm_mongo_pool():
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(WARMUP_MONGO_CONNECTIONS)))
+
+
+@warmup.step("indexes")
+async def warm_indexes():
+    await asyncio.gather(conversations.ensure_index(), rate_limit_store.ensure_index(), exporter.ensure_indexes(), archiver.ensure_indexes(),
+                         id_migration.ensure_indexes(), ensure_pickup_index(db.taxi_orders))
+
+
+@warmup.step("catalog")
+async def warm_catalog():
+    await catalog.ensure()
+    hotel_search.search(limit=1)
+    catalog_retriever.sync()
+    region_bundles.sync()
+
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return metrics_response()
+
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    return FastJSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
+
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Inside the metrics and tracing middlewares so that rejected requests are recorded too
+app.add_middleware(RateLimitMiddleware, store=rate_limit_store)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -722,7 +1179,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
@@ -0,0 +1,248 @@
+import asyncio
+import fcntl
+import glob
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from serialization import dumps
+
+# Directory for the shared catalog snapshot; empty keeps a private catalog per process
+CATALOG_SNAPSHOT_DIR = os.environ.get("CATALOG_SNAPSHOT_DIR", "")
+# Identifies one server start, shared by its workers; set it in the launcher when the
+# default (the process group leader) does not change between restarts
+CATALOG_SNAPSHOT_TOKEN = os.environ.get("CATALOG_SNAPSHOT_TOKEN", "")
+
+MAGIC = b"ECOSNAP1"
+HEADER = struct.Struct("<8sQI")
+# epoch (bumped by invalidate), generation (of the newest snapshot file), epoch that snapshot was built for
+CONTROL = struct.Struct("<QQQ")
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+class SnapshotParts:
+    """A mapped snapshot: parsed collections plus payload slices that point into the shared mapping."""
+
+    def __init__(self, generation: int, collections: Dict[str, list], payloads: Dict[str, Tuple[str, memoryview, Dict[str, memoryview]]]):
+        self.generation = generation
+        self.collections = collections
+        self.payloads = payloads
+
+
+class SharedSnapshot:
+    """Catalog snapshot shared by the worker processes of one deployment.
+
+    The builder writes the collections and every serialized and precompressed
+    payload into ``catalog-<generation>.snap``, and publishes it through a
+    small memory-mapped control file. Workers map the snapshot read-only, so
+    payload bytes live once in the page cache instead of once per worker;
+    the collections are still parsed into each worker's own objects.
+    ``invalidate`` bumps the shared epoch, and each worker sees the new state
+    on its next ``is_current`` check, which is a plain memory read.
+
+    Every process using the directory holds a shared lock on ``alive.lock``
+    until it closes the snapshot or exits, which is how ``remove_stale`` tells abandoned directories
+    from live ones.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Kept open until close(), or the life of the process; the kernel drops the lock when it exits
+        self._alive_fd = os.open(os.path.join(directory, "alive.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._alive_fd, fcntl.LOCK_SH)
+        control_path = os.path.join(directory, "control")
+        fd = os.open(control_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < CONTROL.size:
+                os.ftruncate(fd, CONTROL.size)
+            self._control = mmap.mmap(fd, CONTROL.size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+        self._build_lock_path = os.path.join(directory, "build.lock")
+        self._control_lock_path = os.path.join(directory, "control.lock")
+
+    def close(self):
+        """Unmap the control file and drop the ``alive.lock`` hold, so the next start may remove the directory."""
+        self._control.close()
+        os.close(self._alive_fd)
+
+    def _read_control(self) -> Tuple[int, int, int]:
+        return CONTROL.unpack_from(self._control, 0)
+
+    @property
+    def epoch(self) -> int:
+        return self._read_control()[0]
+
+    def is_current(self, generation: int) -> bool:
+        epoch, published, built_for = self._read_control()
+        return published == generation and built_for == epoch
+
+    def fresh_generation(self) -> Optional[int]:
+        """The published generation if it is not invalidated, else None."""
+        epoch, published, built_for = self._read_control()
+        return published if published and built_for == epoch else None
+
+    def _path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"catalog-{generation}.snap")
+
+    def _update_control(self, fn):
+        """Read-modify-write of the control block; held only for the update, never across a build."""
+        fd = os.open(self._control_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            return fn()
+        finally:
+            os.close(fd)
+
+    def invalidate(self):
+        def bump():
+            epoch, published, built_for = self._read_control()
+            CONTROL.pack_into(self._control, 0, epoch + 1, published, built_for)
+
+        self._update_control(bump)
+
+    @asynccontextmanager
+    async def build_lock(self):
+        """Held while one worker rebuilds from Mongo, so the others wait for its snapshot instead of querying too."""
+        fd = os.open(self._build_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def publish(self, epoch: int, collections: Dict[str, list], payloads: Dict) -> int:
+        """Write a snapshot built for ``epoch`` and make it current; call with ``build_lock`` held."""
+        blobs = bytearray()
+
+        def put(data: bytes):
+            offset = len(blobs)
+            blobs.extend(data)
+            return [offset, len(data)]
+
+        index = {
+            "collections": {name: put(dumps(docs)) for name, docs in collections.items()},
+            "payloads": {
+                key: {
+                    "etag": payload.etag,
+                    "body": put(payload.body),
+                    "variants": {encoding: put(data) for encoding, data in payload.variants.items()},
+                }
+                for key, payload in payloads.items()
+            },
+        }
+        _, published, _ = self._read_control()
+        generation = published + 1
+        index_bytes = dumps(index)
+        path = self._path(generation)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, generation, len(index_bytes)))
+            f.write(index_bytes)
+            f.write(blobs)
+        os.replace(tmp, path)
+
+        def swap():
+            # Keep the current epoch: an invalidate during the build leaves this snapshot stale
+            current_epoch = self._read_control()[0]
+            CONTROL.pack_into(self._control, 0, current_epoch, generation, epoch)
+
+        self._update_control(swap)
+
+        # Workers still on the previous generation keep their mapping even once the file is unlinked
+        for old in glob.glob(os.path.join(self.directory, "catalog-*.snap")):
+            try:
+                if int(os.path.basename(old)[8:-5]) < generation - 1:
+                    os.unlink(old)
+            except (ValueError, OSError):
+                pass
+        return generation
+
+    def read(self, generation: int) -> SnapshotParts:
+        with open(self._path(generation), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, stored_generation, index_size = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or stored_generation != generation:
+            raise ValueError(f"Corrupt catalog snapshot {generation}")
+        index = _loads(view[HEADER.size:HEADER.size + index_size])
+        base = HEADER.size + index_size
+
+        def get(span):
+            return view[base + span[0]:base + span[0] + span[1]]
+
+        return SnapshotParts(
+            generation,
+            {name: _loads(get(span)) for name, span in index["collections"].items()},
+            {
+                key: (entry["etag"], get(entry["body"]), {enc: get(span) for enc, span in entry["variants"].items()})
+                for key, entry in index["payloads"].items()
+            },
+        )
+
+
+def server_token() -> str:
+    """Same in every worker of one server start, different after a restart; letters, digits, ``_`` and ``-`` only."""
+    if CATALOG_SNAPSHOT_TOKEN:
+        return re.sub(r"[^\w-]", "_", CATALOG_SNAPSHOT_TOKEN)
+    # Supervisors and shells start the server in its own process group, led by the master process;
+    # the leader's start time keeps a recycled pid from matching an old directory
+    leader = os.getpgrp()
+    try:
+        with open(f"/proc/{leader}/stat") as f:
+            started = f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        started = "0"
+    return f"{leader}-{started}"
+
+
+def remove_stale(parent: str, db_name: str, keep: str):
+    """Delete ``db_name``'s snapshot directories in ``parent`` that no running process holds.
+
+    Directories are named ``<db_name>.<server token>``; database names cannot
+    contain a dot, so ``eco`` never matches the directories of ``eco-staging``.
+    """
+    pattern = re.compile(rf"{re.escape(db_name)}\.[\w-]+")
+    for entry in os.scandir(parent):
+        path = entry.path
+        if path == keep or not pattern.fullmatch(entry.name) or not entry.is_dir():
+            continue
+        try:
+            fd = os.open(os.path.join(path, "alive.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
+def create_snapshot(db_name: str) -> Optional[SharedSnapshot]:
+    if not CATALOG_SNAPSHOT_DIR:
+        return None
+    # One directory per server start, so a restart never adopts the previous run's "fresh" snapshot
+    path = os.path.join(CATALOG_SNAPSHOT_DIR, f"{db_name}.{server_token()}")
+    snapshot = SharedSnapshot(path)
+    remove_stale(CATALOG_SNAPSHOT_DIR, db_name, keep=path)
+    return snapshot
@@ -0,0 +1,315 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from pymongo.monitoring import CommandListener
+
+from metrics import route_template
+
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_COLLECTOR_URL = os.environ.get("TRACE_COLLECTOR_URL", "")
+TRACE_SLOW_MS = float(os.environ.get("TRACE_SLOW_MS", 500))
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+# Traces still open after this long are flushed through the sampler anyway
+TRACE_MAX_AGE_SECONDS = float(os.environ.get("TRACE_MAX_AGE_SECONDS", 300))
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    """A span with OpenTelemetry-compatible identifiers (128-bit trace id, 64-bit span id)."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[dict] = None,
+                 start_ns: Optional[int] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _Trace:
+    __slots__ = ("spans", "open", "started")
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.open = 0
+        self.started = time.monotonic()
+
+
+class Tracer:
+    """Buffers spans per trace and decides, once the whole trace has finished, whether to export it.
+
+    A trace stays open while any of its spans or holds (see ``hold``) are
+    active, so work spawned with ``asyncio.create_task`` is part of the trace
+    decision. Traces slower than ``slow_ms`` or with an error are always kept;
+    the rest are sampled at ``sample_rate``.
+    """
+
+    def __init__(self, slow_ms: float, sample_rate: float, exporter=None):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self._traces: Dict[str, _Trace] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def _open(self, trace_id: str):
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                trace = self._traces[trace_id] = _Trace()
+            trace.open += 1
+
+    def _close(self, trace_id: str, span: Optional[Span] = None):
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return
+            if span is not None:
+                trace.spans.append(span)
+            trace.open -= 1
+            finished = [trace_id] if trace.open <= 0 else []
+            cutoff = time.monotonic() - TRACE_MAX_AGE_SECONDS
+            finished += [tid for tid, t in self._traces.items() if t.started < cutoff and tid != trace_id]
+            done = [(tid, self._traces.pop(tid)) for tid in finished]
+        for _, finished_trace in done:
+            self._decide(finished_trace.spans)
+
+    def _decide(self, spans: List[Span]):
+        if not spans:
+            return
+        start = min(s.start_ns for s in spans)
+        end = max(s.end_ns for s in spans)
+        keep = (
+            (end - start) / 1e6 >= self.slow_ms
+            or any(s.status != "ok" for s in spans)
+            or random.random() < self.sample_rate
+        )
+        if keep:
+            self.exporter.export(spans)
+
+    def start(self, name: str, parent: Optional[Span] = None, trace_id: Optional[str] = None,
+              parent_id: Optional[str] = None, attributes: Optional[dict] = None,
+              start_ns: Optional[int] = None) -> Span:
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        span = Span(name, trace_id or f"{random.getrandbits(128):032x}", parent_id, attributes, start_ns)
+        self._open(span.trace_id)
+        return span
+
+    def finish(self, span: Span, end_ns: Optional[int] = None):
+        span.end_ns = end_ns or time.time_ns()
+        self._close(span.trace_id, span)
+
+    def hold(self, span: Span):
+        """Keep the trace of ``span`` open until ``release`` (e.g. for a spawned background task)."""
+        self._open(span.trace_id)
+
+    def release(self, span: Span):
+        self._close(span.trace_id)
+
+
+class SpanExporter:
+    """Writes finished traces from a background thread, as JSON lines to a file and/or POSTed to a collector."""
+
+    def __init__(self, path: str = "", collector_url: str = ""):
+        self.path = path
+        self.collector_url = collector_url
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=1000)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logging.warning("Span export queue full, dropping trace")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty() and len(batch) < 100:
+                batch.append(self._queue.get_nowait())
+            records = [span.to_dict() for spans in batch for span in spans]
+            try:
+                if self.path:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        for record in records:
+                            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                if self.collector_url:
+                    request = urllib.request.Request(
+                        self.collector_url, data=json.dumps({"spans": records}, default=str).encode(),
+                        headers={"Content-Type": "application/json"}, method="POST")
+                    urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                logging.error(f"Span export failed: {e}")
+
+
+tracer = Tracer(
+    TRACE_SLOW_MS,
+    TRACE_SAMPLE_RATE,
+    SpanExporter(TRACE_EXPORT_PATH, TRACE_COLLECTOR_URL) if TRACE_EXPORT_PATH or TRACE_COLLECTOR_URL else None,
+)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Run the block in a child span of the current one; contextvars carry it into create_task'd coroutines."""
+    parent = _current_span.get()
+    if not tracer.enabled or parent is None:
+        yield None
+        return
+    span = tracer.start(name, parent=parent, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.set_attribute("error", repr(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(span)
+
+
+def hold_current_trace():
+    """Keep the current trace open while spawned work runs; returns a release callback."""
+    span = _current_span.get()
+    if not tracer.enabled or span is None:
+        return lambda: None
+    tracer.hold(span)
+    return lambda: tracer.release(span)
+
+
+class TracingMiddleware:
+    """Opens the root span for each request, continuing an incoming W3C traceparent if present."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                match = TRACEPARENT_RE.match(value.decode("latin-1"))
+                if match:
+                    trace_id, parent_id = match.groups()
+                break
+
+        span = tracer.start(f"HTTP {scope['method']}", trace_id=trace_id, parent_id=parent_id,
+                            attributes={"http.method": scope["method"], "http.target": scope["path"]})
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = "error"
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"traceparent", span.traceparent.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            template = route_template(scope)
+            span.name = f"HTTP {scope['method']} {template}"
+            span.set_attribute("http.route", template)
+            tracer.finish(span)
+
+
+class CommandTracer(CommandListener):
+    """Turns Motor command monitoring events into child spans of the span that issued them.
+
+    Motor runs pymongo on executor threads with a copy of the caller's
+    context, so the current span is visible in ``started``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[tuple, Span] = {}
+
+    def started(self, event):
+        parent = _current_span.get()
+        if not tracer.enabled or parent is None:
+            return
+        collection = event.command.get(event.command_name)
+        span = tracer.start(f"mongo.{event.command_name}", parent=parent, attributes={
+            "db.system": "mongodb",
+            "db.operation": event.command_name,
+            "db.mongodb.collection": collection if isinstance(collection, str) else "",
+        })
+        with self._lock:
+            self._spans[(event.request_id, event.connection_id)] = span
+
+    def _finish(self, event, status: str):
+        with self._lock:
+            span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            span.status = status
+            tracer.finish(span, end_ns=span.start_ns + event.duration_micros * 1000)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+command_tracer = CommandTracer()
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import re
+from typing import Awaitable, Callable, List, Optional
+
+from metrics import verification_batch_size, verification_fallbacks
+
+VERIFY_BATCH_WINDOW_MS = float(os.environ.get("VERIFY_BATCH_WINDOW_MS", 1500))
+VERIFY_BATCH_MAX_ITEMS = int(os.environ.get("VERIFY_BATCH_MAX_ITEMS", 8))
+
+VERDICT_RE = re.compile(r"^\W*(?:image\s*)?#?(\d+)\s*[:.)\-]\s*\W*(VERIFIED|REJECTED)\b", re.IGNORECASE | re.MULTILINE)
+
+SendFn = Callable[[str, List[str]], Awaitable[str]]
+
+
+def describe_task(task: dict) -> str:
+    return f"Task: {task['title_en']}. Description: {task['description_en']}."
+
+
+def single_prompt(task: dict) -> str:
+    return f"{describe_task(task)} Does this image show completion of this task?"
+
+
+def batch_prompt(tasks: List[dict]) -> str:
+    lines = [f"You are given {len(tasks)} images, in order. Image N was submitted for task N:"]
+    lines += [f"{i}. {describe_task(task)}" for i, task in enumerate(tasks, 1)]
+    lines.append(
+        "For each image decide whether it shows completion of its task. Answer with exactly one line per image, "
+        "in the form '<N>: VERIFIED' or '<N>: REJECTED', and nothing else."
+    )
+    return "\n".join(lines)
+
+
+def parse_single(response: str) -> bool:
+    return "VERIFIED" in response.upper()
+
+
+def parse_verdicts(response: str, count: int) -> Optional[List[bool]]:
+    """Per-image verdicts from a batch answer, or None unless every image got exactly one."""
+    verdicts = {}
+    for number, verdict in VERDICT_RE.findall(response):
+        index = int(number)
+        if not 1 <= index <= count or index in verdicts:
+            return None
+        verdicts[index] = verdict.upper() == "VERIFIED"
+    if len(verdicts) != count:
+        return None
+    return [verdicts[i] for i in range(1, count + 1)]
+
+
+class _Pending:
+    __slots__ = ("task", "image_base64", "future")
+
+    def __init__(self, task: dict, image_base64: str, future: asyncio.Future):
+        self.task = task
+        self.image_base64 = image_base64
+        self.future = future
+
+    # A waiter cancelled meanwhile (e.g. at shutdown) must not keep the rest of its batch from resolving
+    def resolve(self, verdict: bool):
+        if not self.future.done():
+            self.future.set_result(verdict)
+
+    def fail(self, error: Exception):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class BatchVerifier:
+    """Collects task submissions for ``window_ms`` (or until ``max_items``) and verifies them in one LLM call.
+
+    ``send(text, images)`` makes a single LLM request with the images attached
+    in order. When a batch answer cannot be matched to every image, the batch
+    is re-verified one image per call, so a malformed answer never decides a
+    submission.
+    """
+
+    def __init__(self, send: SendFn, window_ms: float = VERIFY_BATCH_WINDOW_MS, max_items: int = VERIFY_BATCH_MAX_ITEMS):
+        self.send = send
+        self.window = window_ms / 1000
+        self.max_items = max(1, max_items)
+        self.calls = 0
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def verify(self, task: dict, image_base64: str) -> bool:
+        """True when the image is judged to show completion of ``task``."""
+        loop = asyncio.get_running_loop()
+        item = _Pending(task, image_base64, loop.create_future())
+        self._pending.append(item)
+        if len(self._pending) >= self.max_items:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+        return await item.future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        flush = asyncio.get_running_loop().create_task(self._verify_batch(batch))
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    async def _send(self, text: str, images: List[str]) -> str:
+        self.calls += 1
+        verification_batch_size.observe(value=len(images))
+        return await self.send(text, images)
+
+    async def _verify_one(self, item: _Pending):
+        try:
+            response = await self._send(single_prompt(item.task), [item.image_base64])
+        except Exception as e:
+            item.fail(e)
+            return
+        item.resolve(parse_single(response))
+
+    async def _verify_batch(self, batch: List[_Pending]):
+        if len(batch) == 1:
+            await self._verify_one(batch[0])
+            return
+
+        try:
+            response = await self._send(batch_prompt([item.task for item in batch]), [item.image_base64 for item in batch])
+        except Exception as e:
+            # The provider itself failed; repeating the work per image would only add load
+            for item in batch:
+                item.fail(e)
+            return
+
+        verdicts = parse_verdicts(response, len(batch))
+        if verdicts is None:
+            logging.warning(f"Unparseable batch verdict for {len(batch)} submissions, verifying individually")
+            verification_fallbacks.inc("unparseable")
+            await asyncio.gather(*(self._verify_one(item) for item in batch))
+            return
+        for item, verdict in zip(batch, verdicts):
+            item.resolve(verdict)
+
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Contention benchmark for the hotel inventory: many users booking the same weekend.
+
+Every user tries to book one room at one hotel at the same moment. Half take
+Friday-Sunday, a quarter Friday-Saturday and a quarter Saturday-Sunday, so
+partially successful reservations have to be rolled back. The run then checks
+that no night was oversold and that every room taken belongs to a successful
+booking.
+
+    # against a local Mongo (MONGO_URL from the env, a throwaway database)
+    python benchmarks/bench_booking.py --users 500 --rooms 20
+
+    # in-memory (needs mongomock-motor; checks correctness, not Mongo latency)
+    python benchmarks/bench_booking.py --mock-mongo
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from inventory import InventoryStore  # noqa: E402
+
+# Nights of each stay, assigned round-robin to users
+STAYS = [
+    ["2026-07-03", "2026-07-04"],
+    ["2026-07-03", "2026-07-04"],
+    ["2026-07-03"],
+    ["2026-07-04"],
+]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+
+def make_client(mock_mongo):
+    if mock_mongo:
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"), maxPoolSize=100)
+
+
+async def main_async(args):
+    client = make_client(args.mock_mongo)
+    db_name = f"ecosayahat_bench_booking_{uuid.uuid4().hex[:6]}"
+    collection = client[db_name].hotel_inventory
+    store = InventoryStore(collection)
+    hotel = {"id": "bench_hotel", "rooms": args.rooms}
+
+    latencies = []
+    booked = {}
+
+    async def book(user):
+        nights = STAYS[user % len(STAYS)]
+        start = time.perf_counter()
+        ok = await store.reserve(hotel, nights, 1)
+        latencies.append(time.perf_counter() - start)
+        if ok:
+            for night in nights:
+                booked[night] = booked.get(night, 0) + 1
+        return ok
+
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(book(user) for user in range(args.users)))
+        elapsed = time.perf_counter() - start
+
+        nights = sorted({night for stay in STAYS for night in stay})
+        free = {doc["date"]: doc["available"] async for doc in collection.find({"hotel_id": hotel["id"]})}
+        print(f"{args.users} users, {args.rooms} rooms, {elapsed:.2f}s total")
+        print(f"successful bookings: {sum(results)}, rejected: {len(results) - sum(results)}")
+        print(f"reserve latency ms: p50={percentile(latencies, 0.5):.2f} "
+              f"p95={percentile(latencies, 0.95):.2f} p99={percentile(latencies, 0.99):.2f}")
+
+        consistent = True
+        for night in nights:
+            taken = booked.get(night, 0)
+            available = free.get(night, args.rooms)
+            ok = available >= 0 and taken + available == args.rooms
+            consistent &= ok
+            print(f"  {night}: booked={taken} available={available} {'ok' if ok else 'INCONSISTENT'}")
+        if not consistent:
+            sys.exit(1)
+    finally:
+        await client.drop_database(db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hotel booking contention benchmark")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--mock-mongo", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
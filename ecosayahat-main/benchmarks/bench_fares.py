@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Time to quote a batch of pending taxi orders against a driver's position.
+
+Generates orders around Almaty with trips of up to a few hundred kilometres,
+then times, per batch size:
+
+  annotate     fare, trip and pickup estimates added to every order (fares.annotate)
+  python-loop  the same estimates computed one order at a time with math,
+               for comparison
+
+Choosing the nearest orders is left to Mongo's 2dsphere index on ``pickup``,
+so a driver's listing annotates one page, 100 orders at most.
+
+    python benchmarks/bench_fares.py --orders 100,1000 --repeat 20
+"""
+
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import fares  # noqa: E402
+
+DRIVER = (43.2389, 76.8897)
+
+
+def make_orders(count, seed):
+    rng = random.Random(seed)
+    orders = []
+    for i in range(count):
+        from_lat, from_lng = DRIVER[0] + rng.uniform(-0.5, 0.5), DRIVER[1] + rng.uniform(-0.5, 0.5)
+        orders.append({
+            "id": f"order_{i}", "from_lat": from_lat, "from_lng": from_lng,
+            "to_lat": from_lat + rng.uniform(-2, 2), "to_lng": from_lng + rng.uniform(-2, 2),
+        })
+    return orders
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return fares.EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+
+
+def python_loop(orders, lat, lng):
+    def minutes(km):
+        city = min(km, fares.TAXI_CITY_KM)
+        return (city / fares.TAXI_CITY_SPEED_KMH + (km - city) / fares.TAXI_HIGHWAY_SPEED_KMH) * 60
+
+    for o in orders:
+        km = distance_km(o["from_lat"], o["from_lng"], o["to_lat"], o["to_lng"]) * fares.TAXI_ROAD_FACTOR
+        trip_minutes = minutes(km)
+        fare = max(fares.TAXI_BASE_FARE + fares.TAXI_PER_KM * km + fares.TAXI_PER_MINUTE * trip_minutes, fares.TAXI_MIN_FARE)
+        pickup_km = distance_km(lat, lng, o["from_lat"], o["from_lng"]) * fares.TAXI_ROAD_FACTOR
+        o.update({"distance_km": round(km, 1), "duration_minutes": round(trip_minutes, 1),
+                  "fare": int(math.ceil(fare / fares.TAXI_FARE_STEP) * fares.TAXI_FARE_STEP),
+                  "pickup_km": round(pickup_km, 1), "pickup_minutes": round(minutes(pickup_km), 1)})
+    return orders
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Taxi fare and ETA batch benchmark")
+    parser.add_argument("--orders", default="100,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    lat, lng = DRIVER
+    print(f"median of {args.repeat} runs, driver at {lat}, {lng}")
+    for count in map(int, args.orders.split(",")):
+        orders = make_orders(count, args.seed)
+        vectorized = [o["fare"] for o in fares.annotate(orders, lat, lng)]
+        looped = [o["fare"] for o in python_loop(orders, lat, lng)]
+        mismatched = sum(a != b for a, b in zip(vectorized, looped))
+        results = {
+            "annotate": timed(lambda: fares.annotate(orders, lat, lng), args.repeat),
+            "python-loop": timed(lambda: python_loop(orders, lat, lng), args.repeat),
+        }
+        line = "  ".join(f"{name} {ms:8.2f} ms" for name, ms in results.items())
+        print(f"  {count:>6} orders  {line}  fares differing {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Insert throughput and index size for random vs time-ordered document ids.
+
+Inserts the same transaction-shaped documents into one collection per id
+scheme, each with a unique index on ``id``, then reports inserts per second
+and the size of the ``id`` index from collStats:
+
+  uuid4         random UUID strings (the previous default)
+  uuid7         time-ordered UUID strings (ids.uuid7, the current default)
+  uuid7-binary  the same ids stored as 16-byte BSON binary, for comparison
+
+    # against a local Mongo (MONGO_URL from the env, a throwaway database)
+    python benchmarks/bench_ids.py --docs 500000
+
+    # in-memory (needs mongomock-motor; throughput only, no index sizes)
+    python benchmarks/bench_ids.py --mock-mongo --docs 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from ids import uuid7  # noqa: E402
+
+SCHEMES = {
+    "uuid4": lambda: str(uuid.uuid4()),
+    "uuid7": uuid7,
+    "uuid7-binary": lambda: uuid.UUID(uuid7()).bytes,
+}
+
+
+def make_client(mock_mongo):
+    if mock_mongo:
+        from mongomock_motor import AsyncMongoMockClient
+
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+
+
+async def run_scheme(db, name, make_id, docs, batch):
+    collection = db[f"ids_{name.replace('-', '_')}"]
+    await collection.create_index("id", unique=True)
+    start = time.perf_counter()
+    for offset in range(0, docs, batch):
+        now = datetime.now(timezone.utc).isoformat()
+        await collection.insert_many([
+            {"id": make_id(), "user_id": f"user_{i % 1000}", "amount": 10, "type": "earned",
+             "description": "Task completed", "created_at": now}
+            for i in range(offset, min(offset + batch, docs))
+        ], ordered=False)
+    elapsed = time.perf_counter() - start
+    try:
+        stats = await db.command("collStats", collection.name)
+        index_size = stats["indexSizes"].get("id_1")
+    except Exception:
+        index_size = None
+    return docs / elapsed, index_size
+
+
+async def main_async(args):
+    client = make_client(args.mock_mongo)
+    db_name = f"ecosayahat_bench_ids_{uuid.uuid4().hex[:6]}"
+    db = client[db_name]
+    try:
+        print(f"{args.docs} documents per scheme, batches of {args.batch}")
+        for name in args.schemes.split(","):
+            rate, index_size = await run_scheme(db, name, SCHEMES[name], args.docs, args.batch)
+            size = f"{index_size / 1024 / 1024:8.1f} MiB id index" if index_size is not None else "    (index size n/a)"
+            print(f"  {name:<13} {rate:10.0f} inserts/s  {size}")
+    finally:
+        await client.drop_database(db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Random vs time-ordered id benchmark")
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--schemes", default=",".join(SCHEMES))
+    parser.add_argument("--mock-mongo", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
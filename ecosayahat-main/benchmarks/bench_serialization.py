@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Per-document serialization cost of get_reviews / get_transactions, before and after.
+
+"before" mirrors the old handlers: build a model per document, then let FastAPI
+validate the list against ``response_model`` and encode it. "after" is the
+trusted projection + orjson path from ``serialization.py``.
+
+    python benchmarks/bench_serialization.py --docs 100 --rounds 200
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from models import Review, EcocoinTransaction  # noqa: E402
+from serialization import FastJSONResponse, projection, trusted_list  # noqa: E402
+
+
+def make_reviews(n):
+    return [{
+        "id": str(uuid.uuid4()),
+        "attraction_id": "kolsay_lakes",
+        "user_id": str(uuid.uuid4()),
+        "user_name": "Айгерим Нурланова",
+        "rating": 5,
+        "comment": "Невероятно красивые озёра, вода прозрачная, обязательно вернёмся летом. " * 3,
+        "status": "approved",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    } for _ in range(n)]
+
+
+def make_transactions(n):
+    return [{
+        "id": str(uuid.uuid4()),
+        "user_id": "user-1",
+        "amount": 50,
+        "type": "earned",
+        "description": "Task completed: Waste Sorting",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    } for _ in range(n)]
+
+
+def before(docs, model):
+    adapter = TypeAdapter(List[model])
+    content = [model(**d) for d in docs]
+    # FastAPI: dump returned models, validate against response_model, serialize, json.dumps
+    value = adapter.validate_python([m.model_dump() for m in content])
+    return json.dumps(adapter.dump_python(value, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def after(docs, model):
+    return FastJSONResponse(trusted_list(docs, model)).body
+
+
+def measure(fn, docs, model, rounds):
+    fn(docs, model)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(docs, model)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(docs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    for endpoint, model, docs in (
+        ("get_reviews", Review, make_reviews(args.docs)),
+        ("get_transactions", EcocoinTransaction, make_transactions(args.docs)),
+    ):
+        assert json.loads(before(docs, model)) == json.loads(after(docs, model))
+        old = measure(before, docs, model, args.rounds)
+        new = measure(after, docs, model, args.rounds)
+        print(f"{endpoint:<18} before {old:7.2f} us/doc   after {new:7.2f} us/doc   "
+              f"speedup x{old / new:.1f}   projection={sorted(projection(model))}")
+
+
+if __name__ == "__main__":
+    main()
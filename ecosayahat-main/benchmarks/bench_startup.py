@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Cold start benchmark: import time, time to live/ready and the first catalog request.
+
+Every run starts a fresh interpreter, imports ``server``, runs the ASGI
+startup and then polls /health/live and /health/ready before timing the
+first /api/regions request. With ``--no-warmup`` the first request pays for
+the catalog build and Mongo connections itself, which is what warmup moves
+out of the request path.
+
+    # against a local Mongo (MONGO_URL from the env, a throwaway database)
+    python benchmarks/bench_startup.py --runs 5
+
+    # in-memory (needs mongomock-motor), plus the slowest imports
+    python benchmarks/bench_startup.py --mock-mongo --top 15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def child_env(args):
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", f"ecosayahat_bench_startup_{uuid.uuid4().hex[:6]}")
+    env.setdefault("LLM_PROVIDER", "mock")
+    env.setdefault("LOOP_LAG_MONITOR", "false")
+    env["WARMUP_ENABLED"] = "false" if args.no_warmup else "true"
+    return env
+
+
+async def child_async(mock_mongo):
+    started = time.perf_counter()
+    sys.path.insert(0, str(BACKEND_DIR))
+    if mock_mongo:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        class MockClient(AsyncMongoMockClient):
+            def __init__(self, *args, **kwargs):
+                super().__init__()
+
+        motor.motor_asyncio.AsyncIOMotorClient = MockClient
+    import httpx
+    import server
+
+    timings = {"import_ms": (time.perf_counter() - started) * 1000}
+    await server.app.router.startup()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/health/live")
+        timings["live_ms"] = (time.perf_counter() - started) * 1000
+        while (await client.get("/health/ready")).status_code != 200:
+            await asyncio.sleep(0.005)
+        timings["ready_ms"] = (time.perf_counter() - started) * 1000
+        request_started = time.perf_counter()
+        response = await client.get("/api/regions")
+        response.raise_for_status()
+        timings["first_request_ms"] = (time.perf_counter() - request_started) * 1000
+    if not mock_mongo:
+        await server.client.drop_database(os.environ["DB_NAME"])
+    await server.app.router.shutdown()
+    print(json.dumps(timings))
+
+
+def run_child(args) -> dict:
+    command = [sys.executable, __file__, "--child"] + (["--mock-mongo"] if args.mock_mongo else [])
+    output = subprocess.run(command, env=child_env(args), capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(args, top: int):
+    """Modules imported directly by ``server``, by cumulative import time, from ``python -X importtime``."""
+    command = [sys.executable, "-X", "importtime", "-c", "import server"]
+    stderr = subprocess.run(command, env=child_env(args), cwd=BACKEND_DIR, capture_output=True, text=True).stderr
+    modules = []
+    for match in IMPORTTIME_RE.finditer(stderr):
+        # One indent level: imported by server itself, not by one of its dependencies
+        if len(match.group(3)) == 3:
+            modules.append((int(match.group(2)) / 1000, match.group(4)))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EcoSayahat cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mock-mongo", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--no-warmup", action="store_true", help="start with WARMUP_ENABLED=false")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child_async(args.mock_mongo))
+        return
+
+    runs = [run_child(args) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts, warmup {'off' if args.no_warmup else 'on'}, medians:")
+    for metric in ("import_ms", "live_ms", "ready_ms", "first_request_ms"):
+        values = [run[metric] for run in runs]
+        print(f"  {metric:<17} {statistics.median(values):8.1f}  (min {min(values):.1f}, max {max(values):.1f})")
+    if args.top:
+        print("slowest imports of server (cumulative ms):")
+        for ms, module in slowest_imports(args, args.top):
+            print(f"  {ms:8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Local stand-in for the catalog's image hosts, for testing the /api/img proxy offline.
+
+``GET /<name>.jpg?w=2400&h=1600`` returns a JPEG of that size, drawn from
+the name so each path is a distinct, repeatable image; ``/<name>.png`` gives
+a PNG with transparency. ``/missing.jpg`` answers 404 and ``/page.html`` a
+non-image. ``GET /stats`` reports how many images were served per path, so
+a run can check that each source was fetched only once.
+
+    python benchmarks/image_fixture_server.py --port 8091 --latency-ms 200
+    IMAGE_PROXY_ALLOWED_HOSTS=127.0.0.1:8091 uvicorn server:app --port 8001
+    curl -o out.webp -H 'Accept: image/webp' \\
+        'http://localhost:8001/api/img?w=320&url=http://127.0.0.1:8091/hotel.jpg'
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image, ImageDraw
+
+
+class FixtureState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.served = Counter()
+
+    def image(self, name: str, fmt: str, width: int, height: int) -> bytes:
+        seed = hashlib.sha1(name.encode()).digest()
+        mode = "RGBA" if fmt == "PNG" else "RGB"
+        image = Image.new(mode, (width, height), tuple(seed[:3]) + ((0,) if mode == "RGBA" else ()))
+        draw = ImageDraw.Draw(image)
+        step = max(width // 16, 1)
+        for i, x in enumerate(range(0, width, step)):
+            draw.rectangle((x, height // 4, x + step // 2, height * 3 // 4), fill=tuple(seed[(i % 6) + 3: (i % 6) + 6]) + ((255,) if mode == "RGBA" else ()))
+        out = io.BytesIO()
+        image.save(out, fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+        return out.getvalue()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": sum(self.served.values()), "paths": dict(self.served)}
+
+
+def make_handler(state: FixtureState):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, content_type: str, data: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/stats":
+                self._reply(200, "application/json", json.dumps(state.stats()).encode())
+                return
+            with state.lock:
+                state.served[parts.path] += 1
+            time.sleep(state.args.latency_ms / 1000)
+            if parts.path == "/page.html":
+                self._reply(200, "text/html", b"<html><body>not an image</body></html>")
+                return
+            if parts.path == "/missing.jpg" or not parts.path.endswith((".jpg", ".png")):
+                self._reply(404, "text/plain", b"not found")
+                return
+            query = parse_qs(parts.query)
+            width = min(int(query.get("w", [state.args.width])[0]), 8000)
+            height = min(int(query.get("h", [state.args.height])[0]), 8000)
+            fmt = "PNG" if parts.path.endswith(".png") else "JPEG"
+            data = state.image(parts.path, fmt, width, height)
+            self._reply(200, "image/png" if fmt == "PNG" else "image/jpeg", data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image fixture server for the image proxy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--width", type=int, default=2400, help="default image width")
+    parser.add_argument("--height", type=int, default=1600, help="default image height")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before every answer")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FixtureState(args)))
+    print(f"Image fixtures on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Latency/throughput benchmark for the EcoSayahat API.
+
+Drives realistic request mixes either in-process through ASGI (no network,
+no uvicorn) or against a running server, then reports throughput and
+p50/p95/p99 per route. Results can be saved as a baseline and later runs
+compared against it, failing when a route regresses beyond a threshold.
+
+    # in-process against a local Mongo (MONGO_URL / DB_NAME from the env)
+    python benchmarks/loadtest.py --asgi --duration 30 --save benchmarks/baseline.json
+
+    # in-process against an in-memory mock Mongo (needs mongomock-motor)
+    python benchmarks/loadtest.py --asgi --mock-mongo --compare benchmarks/baseline.json
+
+    # against a local uvicorn (started with RATE_LIMIT_ENABLED=false)
+    python benchmarks/loadtest.py --base-url http://localhost:8001/api --concurrency 50
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+PASSWORD = "LoadTest123!"
+
+
+def make_image_base64(size_kb: int) -> str:
+    try:
+        from PIL import Image
+
+        side = max(64, int((size_kb * 1024 / 3) ** 0.5))
+        image = Image.effect_noise((side, side), 64).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        data = buffer.getvalue()
+    except ImportError:
+        data = os.urandom(size_kb * 1024)
+    return base64.b64encode(data).decode()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, route, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.samples[route].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[route] += 1
+        return response if ok else None
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Workload:
+    def __init__(self, client, recorder, image_kb):
+        self.client = client
+        self.rec = recorder
+        self.image = make_image_base64(image_kb)
+        self.accounts = {"tourist": [], "taxi_driver": [], "admin": []}
+        self.regions = []
+        self.attractions = []
+        self.tasks = []
+
+    async def register(self, role):
+        email = f"load_{role}_{uuid.uuid4().hex[:10]}@loadtest.kz"
+        response = await self.client.post("/auth/register", json={
+            "email": email, "password": PASSWORD, "name": f"Load {role}", "role": role
+        })
+        response.raise_for_status()
+        self.accounts[role].append((email, {"Authorization": f"Bearer {response.json()['token']}"}))
+
+    async def setup(self, tourists, drivers, admins):
+        for role, count in (("tourist", tourists), ("taxi_driver", drivers), ("admin", admins)):
+            await asyncio.gather(*(self.register(role) for _ in range(count)))
+        headers = self.accounts["tourist"][0][1]
+        self.regions = (await self.client.get("/regions", headers=headers)).json()
+        for region in self.regions:
+            self.attractions += (await self.client.get(f"/regions/{region['id']}/attractions", headers=headers)).json()
+        self.tasks = (await self.client.get("/tasks", headers=headers)).json()
+
+    def account(self, role):
+        return random.choice(self.accounts[role])
+
+    async def login_storm(self):
+        email, _ = self.account(random.choice(["tourist", "taxi_driver"]))
+        await self.rec.call(self.client, "POST /auth/login", "POST", "/auth/login",
+                            json={"email": email, "password": PASSWORD})
+
+    async def catalog_browsing(self):
+        _, headers = self.account("tourist")
+        region = random.choice(self.regions)["id"]
+        await self.rec.call(self.client, "GET /dashboard/tourist", "GET", "/dashboard/tourist",
+                            params={"region_id": region}, headers=headers)
+        await self.rec.call(self.client, "GET /regions", "GET", "/regions", headers=headers)
+        await self.rec.call(self.client, "GET /regions/{region_id}/attractions", "GET",
+                            f"/regions/{region}/attractions", headers=headers)
+        await self.rec.call(self.client, "GET /hotels/{region_id}", "GET", f"/hotels/{region}", headers=headers)
+        if self.attractions:
+            attraction = random.choice(self.attractions)["id"]
+            await self.rec.call(self.client, "GET /attractions/{attraction_id}", "GET",
+                                f"/attractions/{attraction}", headers=headers)
+            await self.rec.call(self.client, "GET /attractions/{attraction_id}/reviews", "GET",
+                                f"/attractions/{attraction}/reviews", headers=headers)
+            if random.random() < 0.2:
+                await self.rec.call(self.client, "POST /attractions/{attraction_id}/reviews", "POST",
+                                    f"/attractions/{attraction}/reviews", headers=headers,
+                                    json={"attraction_id": attraction, "rating": 5, "comment": "Отличное место"})
+        await self.rec.call(self.client, "GET /ecocoins/balance", "GET", "/ecocoins/balance", headers=headers)
+        await self.rec.call(self.client, "GET /ecocoins/leaderboard", "GET", "/ecocoins/leaderboard", headers=headers)
+
+    async def task_submission(self):
+        _, headers = self.account("tourist")
+        task = random.choice(self.tasks)["id"]
+        await self.rec.call(self.client, "POST /tasks/submit", "POST", "/tasks/submit", headers=headers,
+                            json={"task_id": task, "image_base64": self.image})
+        await self.rec.call(self.client, "GET /ecocoins/transactions", "GET", "/ecocoins/transactions",
+                            headers=headers)
+
+    async def driver_polling(self):
+        _, tourist = self.account("tourist")
+        _, driver = self.account("taxi_driver")
+        if random.random() < 0.3:
+            await self.rec.call(self.client, "POST /taxi/order", "POST", "/taxi/order", headers=tourist, json={
+                "from_location": "Актау", "to_location": "Пляж Актау",
+                "from_lat": 43.65, "from_lng": 51.17, "to_lat": 43.66, "to_lng": 51.16,
+            })
+        response = await self.rec.call(self.client, "GET /taxi/orders", "GET", "/taxi/orders", headers=driver)
+        orders = response.json() if response is not None else []
+        if orders and random.random() < 0.2:
+            order = random.choice(orders)["id"]
+            await self.rec.call(self.client, "POST /taxi/accept/{order_id}", "POST",
+                                f"/taxi/accept/{order}", headers=driver)
+        await self.rec.call(self.client, "GET /charging-stations", "GET", "/charging-stations", headers=driver)
+
+    async def admin_moderation(self):
+        _, headers = self.account("admin")
+        await self.rec.call(self.client, "GET /admin/stats", "GET", "/admin/stats", headers=headers)
+        response = await self.rec.call(self.client, "GET /admin/reviews", "GET", "/admin/reviews", headers=headers)
+        pending = [r for r in (response.json() if response is not None else []) if r["status"] == "pending"]
+        for review in pending[:3]:
+            action = random.choice(["approve", "reject"])
+            await self.rec.call(self.client, f"POST /admin/reviews/{{review_id}}/{action}", "POST",
+                                f"/admin/reviews/{review['id']}/{action}", headers=headers)
+
+
+MIXES = {
+    "default": {"catalog_browsing": 50, "login_storm": 15, "task_submission": 10,
+                "driver_polling": 20, "admin_moderation": 5},
+    "login": {"login_storm": 100},
+    "browse": {"catalog_browsing": 100},
+    "tasks": {"task_submission": 100},
+    "drivers": {"driver_polling": 100},
+    "admin": {"admin_moderation": 100},
+}
+
+
+async def run_mix(workload, mix, concurrency, duration, max_iterations):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.perf_counter() + duration
+    iterations = 0
+
+    async def virtual_user():
+        nonlocal iterations
+        while time.perf_counter() < deadline and (not max_iterations or iterations < max_iterations):
+            iterations += 1
+            await getattr(workload, random.choices(names, weights)[0])()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        routes[route] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(route, 0),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+        }
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total_requests": total,
+        "total_errors": sum(r["errors"] for r in routes.values()),
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def print_report(summary):
+    print(f"\n{'route':<45} {'count':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, r in summary["routes"].items():
+        print(f"{route:<45} {r['count']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f}ms {r['p95_ms']:>8.1f}ms {r['p99_ms']:>8.1f}ms")
+    print(f"\ntotal {summary['total_requests']} requests, {summary['total_errors']} errors, "
+          f"{summary['rps']} req/s over {summary['elapsed_s']}s")
+
+
+def compare(summary, baseline, threshold, min_samples=20):
+    """Return the regressions of ``summary`` against ``baseline`` (relative p95/p99 increase above threshold)."""
+    regressions = []
+    for route, base in baseline["routes"].items():
+        current = summary["routes"].get(route)
+        if current is None or current["count"] < min_samples or base["count"] < min_samples:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] > 0 and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{route} {metric}: {base[metric]} -> {current[metric]}")
+    if baseline["rps"] and summary["rps"] < baseline["rps"] * (1 - threshold):
+        regressions.append(f"throughput: {baseline['rps']} -> {summary['rps']} req/s")
+    return regressions
+
+
+def asgi_app(mock_mongo):
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", f"ecosayahat_loadtest_{uuid.uuid4().hex[:6]}")
+    # Every virtual user shares one client address, which the per-IP login/register limits would throttle
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("LLM_PROVIDER", "mock")
+    if mock_mongo:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+
+        class MockClient(AsyncMongoMockClient):
+            def __init__(self, *args, **kwargs):
+                super().__init__()
+
+        motor.motor_asyncio.AsyncIOMotorClient = MockClient
+    import server
+
+    return server.app
+
+
+async def main_async(args):
+    if args.asgi:
+        transport = httpx.ASGITransport(app=asgi_app(args.mock_mongo))
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest/api", timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+
+    async with client:
+        recorder = Recorder()
+        workload = Workload(client, recorder, args.image_kb)
+        await workload.setup(args.tourists, args.drivers, args.admins)
+        elapsed = await run_mix(workload, MIXES[args.mix], args.concurrency, args.duration, args.iterations)
+
+    summary = summarize(recorder, elapsed)
+    summary["config"] = {k: v for k, v in vars(args).items() if k not in ("save", "compare")}
+    print_report(summary)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(summary, indent=2, ensure_ascii=False))
+        print(f"saved baseline to {args.save}")
+
+    if args.compare:
+        regressions = compare(summary, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print(f"\nREGRESSIONS (> {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions against {args.compare}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EcoSayahat API load test")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--asgi", action="store_true", help="drive backend/server.py in-process")
+    target.add_argument("--base-url", help="API root of a running server, e.g. http://localhost:8001/api")
+    parser.add_argument("--mock-mongo", action="store_true", help="with --asgi, use mongomock-motor")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--iterations", type=int, default=0, help="stop after N scenarios (0 = duration only)")
+    parser.add_argument("--tourists", type=int, default=20)
+    parser.add_argument("--drivers", type=int, default=5)
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--image-kb", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the summary JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
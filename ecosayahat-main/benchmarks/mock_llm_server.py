@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Deterministic OpenAI-compatible mock LLM for load tests and local runs.
+
+Serves ``POST /v1/chat/completions`` and answers task verification prompts
+without calling a real provider. The verdict for an image depends only on its
+bytes, so a run can be repeated exactly. Batch prompts (several images) get
+one ``<N>: VERIFIED|REJECTED`` line per image, and ``--malformed-every`` makes
+every k-th batch answer unparseable to exercise the single-call fallback.
+``GET /stats`` reports request and image counts.
+
+    python benchmarks/mock_llm_server.py --port 8090 --latency-ms 800 --per-image-ms 100
+    LLM_PROVIDER=openai LLM_BASE_URL=http://localhost:8090 python benchmarks/loadtest.py --asgi --mix tasks
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.images = 0
+
+    def verdict(self, image_url: str) -> str:
+        digest = hashlib.sha1(image_url.encode()).digest()
+        return "REJECTED" if digest[0] < 256 * self.args.reject_ratio else "VERIFIED"
+
+    def complete(self, body: dict) -> str:
+        content = body["messages"][-1]["content"]
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content}]
+        images = [p["image_url"]["url"] for p in parts if p.get("type") == "image_url"]
+        text = " ".join(p.get("text", "") for p in parts if p.get("type") == "text")
+
+        with self.lock:
+            self.requests += 1
+            self.images += len(images)
+            if len(images) > 1:
+                self.batches += 1
+                batch_number = self.batches
+
+        time.sleep((self.args.latency_ms + self.args.per_image_ms * len(images)) / 1000)
+
+        if not images:
+            return f"Mock answer to: {text[:200]}"
+        if len(images) == 1:
+            return self.verdict(images[0])
+        if self.args.malformed_every and batch_number % self.args.malformed_every == 0:
+            return "All of the images look fine to me."
+        return "\n".join(f"{i}: {self.verdict(url)}" for i, url in enumerate(images, 1))
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "batches": self.batches, "images": self.images}
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, state.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/v1/chat/completions":
+                self._reply(404, {"error": "not found"})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            answer = state.complete(body)
+            self._reply(200, {
+                "id": "mock",
+                "object": "chat.completion",
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="base latency per request")
+    parser.add_argument("--per-image-ms", type=float, default=100.0, help="extra latency per attached image")
+    parser.add_argument("--reject-ratio", type=float, default=0.2, help="share of images answered REJECTED")
+    parser.add_argument("--malformed-every", type=int, default=0, help="garble every k-th batch answer (0 = never)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(args)))
+    print(f"Mock LLM listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
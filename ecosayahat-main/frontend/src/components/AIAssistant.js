@@ -19,19 +19,21 @@ export const AIAssistant = () => {
   const handleSendMessage = async () => {
     if (!input.trim() && !selectedImage) return;
 
-    const userMessage = { role: 'user', content: input, image: selectedImage };
+    const userMessage = { role: 'user', content: input, image: selectedImage?.preview };
     setMessages(prev => [...prev, userMessage]);
     setInput('');
     setLoading(true);
 
     try {
+      const formData = new FormData();
+      formData.append('message', input);
+      formData.append('language', i18n.language);
+      if (selectedImage) {
+        formData.append('image', selectedImage.file);
+      }
       const response = await axios.post(
-        `${API}/ai-assistant/chat`,
-        {
-          message: input,
-          image_base64: selectedImage,
-          language: i18n.language
-        },
+        `${API}/ai-assistant/chat/upload`,
+        formData,
         { headers: { Authorization: `Bearer ${token}` } }
       );
 
@@ -49,12 +51,7 @@ export const AIAssistant = () => {
   const handleImageUpload = (e) => {
     const file = e.target.files[0];
     if (file) {
-      const reader = new FileReader();
-      reader.onload = () => {
-        const base64 = reader.result.split(',')[1];
-        setSelectedImage(base64);
-      };
-      reader.readAsDataURL(file);
+      setSelectedImage({ file, preview: URL.createObjectURL(file) });
     }
   };
 
@@ -106,7 +103,7 @@ export const AIAssistant = () => {
           <div key={idx} className={`flex ${msg.role === 'user' ? 'justify-end' : 'justify-start'}`}>
             <div className={`max-w-[80%] rounded-2xl px-4 py-3 ${msg.role === 'user' ? 'bg-emerald-500 text-white' : 'bg-white border border-emerald-100 text-slate-800'}`}>
               {msg.image && (
-                <img src={`data:image/jpeg;base64,${msg.image}`} alt="User upload" className="rounded-lg mb-2 max-w-full" />
+                <img src={msg.image} alt="User upload" className="rounded-lg mb-2 max-w-full" />
               )}
               <p className="text-sm whitespace-pre-wrap">{msg.content}</p>
             </div>
@@ -128,7 +125,7 @@ export const AIAssistant = () => {
       <div className="p-4 border-t border-emerald-100 bg-white">
         {selectedImage && (
           <div className="mb-2 relative inline-block">
-            <img src={`data:image/jpeg;base64,${selectedImage}`} alt="Preview" className="h-16 rounded-lg" />
+            <img src={selectedImage.preview} alt="Preview" className="h-16 rounded-lg" />
             <button
               onClick={() => setSelectedImage(null)}
               className="absolute -top-2 -right-2 bg-red-500 text-white rounded-full p-1"
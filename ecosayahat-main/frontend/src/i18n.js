@@ -62,6 +62,11 @@ const resources = {
       askQuestion: 'Задайте вопрос...',
       send: 'Отправить',
       acceptOrder: 'Принять заказ',
+      fare: 'Стоимость',
+      trip: 'Поездка',
+      pickup: 'До клиента',
+      km: 'км',
+      min: 'мин',
       approve: 'Одобрить',
       reject: 'Отклонить',
       totalUsers: 'Всего пользователей',
@@ -130,6 +135,11 @@ const resources = {
       askQuestion: 'Ask a question...',
       send: 'Send',
       acceptOrder: 'Accept Order',
+      fare: 'Fare',
+      trip: 'Trip',
+      pickup: 'To pickup',
+      km: 'km',
+      min: 'min',
       approve: 'Approve',
       reject: 'Reject',
       totalUsers: 'Total Users',
@@ -198,6 +208,11 @@ const resources = {
       askQuestion: 'Сұрақ қойыңыз...',
       send: 'Жіберу',
       acceptOrder: 'Тапсырысты қабылдау',
+      fare: 'Құны',
+      trip: 'Сапар',
+      pickup: 'Клиентке дейін',
+      km: 'км',
+      min: 'мин',
       approve: 'Мақұлдау',
       reject: 'Қабылдамау',
       totalUsers: 'Барлық пайдаланушылар',
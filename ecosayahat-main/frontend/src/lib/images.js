@@ -0,0 +1,16 @@
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+// Catalog image resized by the backend image proxy; the browser gets WebP when it accepts it.
+export const imgUrl = (url, width) => {
+  if (!url || !/^https?:\/\//.test(url)) {
+    return url;
+  }
+  return `${API}/img?w=${width}&url=${encodeURIComponent(url)}`;
+};
+
+export const imgSrcSet = (url, widths) => {
+  if (imgUrl(url, widths[0]) === url) {
+    return undefined;
+  }
+  return widths.map((width) => `${imgUrl(url, width)} ${width}w`).join(', ');
+};
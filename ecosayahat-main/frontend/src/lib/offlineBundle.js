@@ -0,0 +1,49 @@
+import axios from 'axios';
+
+const storageKey = (regionId, lang) => `bundle:${regionId}:${lang}`;
+
+const readCached = (regionId, lang) => {
+  try {
+    return JSON.parse(localStorage.getItem(storageKey(regionId, lang)));
+  } catch (error) {
+    return null;
+  }
+};
+
+const applyDelta = (cached, delta) => {
+  const collections = { ...cached.collections };
+  Object.entries(delta.removed || {}).forEach(([name, ids]) => {
+    collections[name] = (collections[name] || []).filter((item) => !ids.includes(item.id));
+  });
+  Object.entries(delta.collections || {}).forEach(([name, items]) => {
+    const changed = new Map(items.map((item) => [item.id, item]));
+    const kept = (collections[name] || []).map((item) => changed.get(item.id) || item);
+    const known = new Set(kept.map((item) => item.id));
+    collections[name] = kept.concat(items.filter((item) => !known.has(item.id)));
+  });
+  const images = [...new Set([...(cached.images || []), ...(delta.images || [])])];
+  return { ...delta, delta: false, collections, images };
+};
+
+// Region catalog for offline use: sends the stored version so the server returns only what changed,
+// and falls back to the stored copy when the network is unavailable.
+export const loadRegionBundle = async (api, regionId, lang) => {
+  const cached = readCached(regionId, lang);
+  try {
+    const response = await axios.get(`${api}/regions/${regionId}/bundle`, {
+      params: { lang, ...(cached ? { since: cached.version } : {}) }
+    });
+    const bundle = response.data.delta && cached ? applyDelta(cached, response.data) : response.data;
+    try {
+      localStorage.setItem(storageKey(regionId, lang), JSON.stringify(bundle));
+    } catch (error) {
+      console.error('Failed to store offline bundle', error);
+    }
+    return bundle.collections;
+  } catch (error) {
+    if (cached) {
+      return cached.collections;
+    }
+    throw error;
+  }
+};
@@ -17,10 +17,21 @@ export const AdminDashboard = () => {
   const [reviews, setReviews] = useState([]);
 
   useEffect(() => {
-    fetchStats();
-    fetchReviews();
+    fetchDashboard();
   }, []);
 
+  const fetchDashboard = async () => {
+    try {
+      const response = await axios.get(`${API}/dashboard/admin`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setStats(response.data.stats);
+      setReviews(response.data.reviews || []);
+    } catch (error) {
+      console.error('Failed to fetch dashboard', error);
+    }
+  };
+
   const fetchStats = async () => {
     try {
       const response = await axios.get(`${API}/admin/stats`, {
@@ -4,6 +4,7 @@ import { useTranslation } from 'react-i18next';
 import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
 import { Globe } from 'lucide-react';
+import { imgUrl, imgSrcSet } from '../lib/images';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -133,7 +134,9 @@ export const RegionSelection = () => {
               }`}
             >
               <img
-                src={region.image_url}
+                src={imgUrl(region.image_url, 640)}
+                srcSet={imgSrcSet(region.image_url, [320, 640, 960])}
+                sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                 alt={getRegionName(region)}
                 className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700"
               />
@@ -24,43 +24,56 @@ export const TaxiDriverDashboard = () => {
   const [orders, setOrders] = useState([]);
   const [chargingStations, setChargingStations] = useState([]);
   const [userLocation, setUserLocation] = useState([51.1694, 71.4491]);
+  const [located, setLocated] = useState(false);
 
   useEffect(() => {
-    fetchOrders();
-    fetchChargingStations();
+    fetchDashboard();
     getUserLocation();
   }, []);
 
+  // Once the real position is known, pending orders come nearest pickup first
+  useEffect(() => {
+    if (located) {
+      fetchOrders();
+    }
+  }, [located]);
+
   const getUserLocation = () => {
     if (navigator.geolocation) {
       navigator.geolocation.getCurrentPosition(
         (position) => {
           setUserLocation([position.coords.latitude, position.coords.longitude]);
+          setLocated(true);
         },
         (error) => console.error('Geolocation error:', error)
       );
     }
   };
 
-  const fetchOrders = async () => {
+  const positionParams = () => (located ? { lat: userLocation[0], lng: userLocation[1] } : {});
+
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/taxi/orders`, {
+      const response = await axios.get(`${API}/dashboard/driver`, {
+        params: positionParams(),
         headers: { Authorization: `Bearer ${token}` }
       });
-      setOrders(response.data);
+      setOrders(response.data.orders || []);
+      setChargingStations(response.data.charging_stations || []);
     } catch (error) {
-      console.error('Failed to fetch orders', error);
+      console.error('Failed to fetch dashboard', error);
     }
   };
 
-  const fetchChargingStations = async () => {
+  const fetchOrders = async () => {
     try {
-      const response = await axios.get(`${API}/charging-stations`, {
+      const response = await axios.get(`${API}/taxi/orders`, {
+        params: positionParams(),
         headers: { Authorization: `Bearer ${token}` }
       });
-      setChargingStations(response.data);
+      setOrders(response.data);
     } catch (error) {
-      console.error('Failed to fetch charging stations', error);
+      console.error('Failed to fetch orders', error);
     }
   };
 
@@ -128,6 +141,13 @@ export const TaxiDriverDashboard = () => {
                     <span className="text-slate-700">{order.to_location}</span>
                   </div>
                 </div>
+                <div data-testid={`order-quote-${order.id}`} className="flex flex-wrap gap-x-6 gap-y-1 text-sm text-slate-600 mb-4">
+                  <span><span className="font-semibold text-slate-800">{t('fare')}:</span> {order.fare} ₸</span>
+                  <span>{t('trip')}: {order.distance_km} {t('km')} · {Math.round(order.duration_minutes)} {t('min')}</span>
+                  {order.pickup_km != null && (
+                    <span>{t('pickup')}: {order.pickup_km} {t('km')} · {Math.round(order.pickup_minutes)} {t('min')}</span>
+                  )}
+                </div>
                 <button
                   data-testid={`accept-order-btn-${order.id}`}
                   onClick={() => acceptOrder(order.id)}
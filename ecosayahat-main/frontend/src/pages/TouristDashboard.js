@@ -4,6 +4,8 @@ import { useTranslation } from 'react-i18next';
 import { MapContainer, TileLayer, Marker, Popup } from 'react-leaflet';
 import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
+import { loadRegionBundle } from '../lib/offlineBundle';
+import { imgUrl, imgSrcSet } from '../lib/images';
 import { Globe, LogOut, Map as MapIcon, Landmark, Car, Hotel as HotelIcon, CheckSquare, Info, Star, Send, X, Calendar, Users } from 'lucide-react';
 import { toast } from 'sonner';
 import 'leaflet/dist/leaflet.css';
@@ -43,6 +45,10 @@ export const TouristDashboard = () => {
     getUserLocation();
   }, [regionId]);
 
+  useEffect(() => {
+    fetchCatalog();
+  }, [regionId, i18n.language]);
+
   const getUserLocation = () => {
     if (navigator.geolocation) {
       navigator.geolocation.getCurrentPosition(
@@ -61,21 +67,27 @@ export const TouristDashboard = () => {
 
   const fetchData = async () => {
     try {
-      const [attractionsRes, hotelsRes, tasksRes, balanceRes] = await Promise.all([
-        axios.get(`${API}/regions/${regionId}/attractions`, { headers: { Authorization: `Bearer ${token}` } }),
-        axios.get(`${API}/hotels/${regionId}`, { headers: { Authorization: `Bearer ${token}` } }),
-        axios.get(`${API}/tasks`, { headers: { Authorization: `Bearer ${token}` } }),
-        axios.get(`${API}/ecocoins/balance`, { headers: { Authorization: `Bearer ${token}` } })
-      ]);
-      setAttractions(attractionsRes.data);
-      setHotels(hotelsRes.data);
-      setTasks(tasksRes.data);
-      setEcocoins(balanceRes.data.balance);
+      const response = await axios.get(`${API}/dashboard/tourist`, {
+        params: { region_id: regionId, include_catalog: false },
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setEcocoins(response.data.balance || 0);
     } catch (error) {
       console.error('Failed to fetch data', error);
     }
   };
 
+  const fetchCatalog = async () => {
+    try {
+      const collections = await loadRegionBundle(API, regionId, i18n.language);
+      setAttractions(collections.attractions || []);
+      setHotels(collections.hotels || []);
+      setTasks(collections.tasks || []);
+    } catch (error) {
+      console.error('Failed to load region catalog', error);
+    }
+  };
+
   const fetchAttractionReviews = async (attractionId) => {
     try {
       const response = await axios.get(`${API}/attractions/${attractionId}/reviews`, {
@@ -119,12 +131,12 @@ export const TouristDashboard = () => {
         {},
         { headers: { Authorization: `Bearer ${token}` } }
       );
-      toast.success('Booking successful! Payment completed.');
+      toast.success(`Booking successful! Paid ${response.data.booking.total_price} ₸ for ${response.data.booking.nights} night(s).`);
       setShowBookingModal(null);
       setBookingData({ checkIn: '', checkOut: '', guests: 2 });
       fetchData();
     } catch (error) {
-      toast.error('Booking failed');
+      toast.error(error.response?.data?.detail || 'Booking failed');
     }
   };
 
@@ -139,7 +151,7 @@ export const TouristDashboard = () => {
     const toCoords = [fromCoords[0] + 0.1, fromCoords[1] + 0.1];
 
     try {
-      await axios.post(
+      const response = await axios.post(
         `${API}/taxi/order`,
         {
           from_location: taxiOrder.from,
@@ -151,7 +163,7 @@ export const TouristDashboard = () => {
         },
         { headers: { Authorization: `Bearer ${token}` } }
       );
-      toast.success('Taxi order placed! Driver will accept soon.');
+      toast.success(`Taxi order placed! ${t('fare')}: ${response.data.fare} ₸. Driver will accept soon.`);
       setTaxiOrder({ from: '', to: '', fromLat: 0, fromLng: 0, toLat: 0, toLng: 0 });
     } catch (error) {
       toast.error('Failed to order taxi');
@@ -184,22 +196,20 @@ export const TouristDashboard = () => {
     input.onchange = async (e) => {
       const file = e.target.files[0];
       if (file) {
-        const reader = new FileReader();
-        reader.onload = async () => {
-          const base64 = reader.result.split(',')[1];
-          try {
-            await axios.post(
-              `${API}/tasks/submit`,
-              { task_id: taskId, image_base64: base64 },
-              { headers: { Authorization: `Bearer ${token}` } }
-            );
-            toast.success(t('submitTask') + ' - ' + t('pending'));
-            setTimeout(fetchData, 3000);
-          } catch (error) {
-            toast.error('Failed to submit task');
-          }
-        };
-        reader.readAsDataURL(file);
+        const formData = new FormData();
+        formData.append('task_id', taskId);
+        formData.append('image', file);
+        try {
+          await axios.post(
+            `${API}/tasks/submit/upload`,
+            formData,
+            { headers: { Authorization: `Bearer ${token}` } }
+          );
+          toast.success(t('submitTask') + ' - ' + t('pending'));
+          setTimeout(fetchData, 3000);
+        } catch (error) {
+          toast.error('Failed to submit task');
+        }
       }
     };
     input.click();
@@ -323,7 +333,7 @@ export const TouristDashboard = () => {
                 onClick={() => handleAttractionClick(attraction)}
                 className="bg-white rounded-2xl shadow-lg overflow-hidden cursor-pointer hover:shadow-2xl hover:-translate-y-1 transition-all duration-300"
               >
-                <img src={attraction.image_url} alt={getText(attraction, 'name')} className="w-full h-48 object-cover" />
+                <img src={imgUrl(attraction.image_url, 640)} srcSet={imgSrcSet(attraction.image_url, [320, 640])} sizes="(min-width: 768px) 50vw, 100vw" alt={getText(attraction, 'name')} className="w-full h-48 object-cover" loading="lazy" />
                 <div className="p-6">
                   <h3 className="text-xl font-bold text-slate-800 mb-2" style={{ fontFamily: 'Outfit' }}>
                     {getText(attraction, 'name')}
@@ -394,7 +404,7 @@ export const TouristDashboard = () => {
           <div data-testid="hotels-tab" className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
             {hotels.map(hotel => (
               <div key={hotel.id} data-testid={`hotel-card-${hotel.id}`} className="bg-white rounded-2xl shadow-lg overflow-hidden hover:shadow-2xl transition-all duration-300">
-                <img src={hotel.image_url} alt={hotel.name} className="w-full h-48 object-cover" />
+                <img src={imgUrl(hotel.image_url, 640)} srcSet={imgSrcSet(hotel.image_url, [320, 640])} sizes="(min-width: 768px) 50vw, 100vw" alt={hotel.name} className="w-full h-48 object-cover" loading="lazy" />
                 <div className="p-6">
                   <div className="flex items-start justify-between mb-2">
                     <h3 className="text-xl font-bold text-slate-800" style={{ fontFamily: 'Outfit' }}>{hotel.name}</h3>
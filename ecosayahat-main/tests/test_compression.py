@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+import compression
+from catalog import CatalogPayload, etag_matches
+from compression import CompressionMiddleware, negotiate_encoding
+
+requires_brotli = pytest.mark.skipif(compression.brotli is None, reason="Brotli is not installed")
+
+ITEMS = [{"id": f"region-{i}", "name": f"Region {i}", "description": "Steppe, lakes and mountains " * 3} for i in range(50)]
+CATALOG = CatalogPayload(ITEMS)
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/catalog")
+    async def catalog(request: Request):
+        return CATALOG.response(request)
+
+    @app.get("/json")
+    async def big_json():
+        return JSONResponse(ITEMS, headers={"Vary": "Origin"})
+
+    @app.get("/small")
+    async def small_json():
+        return {"ok": True}
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + bytes(4096), media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for item in ITEMS:
+                yield json.dumps(item) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return CompressionMiddleware(app)
+
+
+def get(path, **headers):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZip;q=0.5", "gzip"),
+    ("gzip;q=bad", None),
+    ("gzip;q=0", None),
+    pytest.param("gzip, deflate, br", "br", marks=requires_brotli),
+    pytest.param("br;q=0, gzip", "gzip", marks=requires_brotli),
+    pytest.param("gzip;q=0.9, br;q=0.4", "gzip", marks=requires_brotli),
+    pytest.param("*", "br", marks=requires_brotli),
+    pytest.param("*;q=0.1, br;q=0", "gzip", marks=requires_brotli),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc" ', True),
+    ("*", True),
+    ('"abc-gzip"', False),
+    ('"xyz"', False),
+])
+def test_etag_matches_if_none_match_lists(if_none_match, matches):
+    assert etag_matches(if_none_match, '"abc"') is matches
+
+
+def test_each_encoding_of_a_catalog_payload_has_its_own_etag():
+    plain = get("/catalog", **{"accept-encoding": "identity"})
+    gzipped = get("/catalog", **{"accept-encoding": "gzip"})
+
+    assert plain.headers["etag"] == CATALOG.etag
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == CATALOG.etag[:-1] + '-gzip"'
+    assert gzipped.json() == plain.json() == ITEMS
+    assert plain.headers["vary"] == gzipped.headers["vary"] == "Accept-Encoding"
+
+
+def test_revalidation_is_per_encoding():
+    gzip_etag = CATALOG.etag[:-1] + '-gzip"'
+
+    not_modified = get("/catalog", **{"accept-encoding": "gzip", "if-none-match": f'"stale", {gzip_etag}'})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == gzip_etag
+    assert "content-encoding" not in not_modified.headers
+    assert not_modified.content == b""
+
+    # The identity tag names other bytes than the gzip ones the client is about to get
+    changed = get("/catalog", **{"accept-encoding": "gzip", "if-none-match": CATALOG.etag})
+    assert changed.status_code == 200
+    assert changed.json() == ITEMS
+
+
+def test_precompressed_response_passes_through_the_middleware():
+    response = get("/catalog", **{"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(CATALOG.variants["gzip"])
+    assert response.json() == ITEMS
+
+
+def test_large_json_is_compressed_and_keeps_its_vary():
+    response = get("/json", **{"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+    assert response.json() == ITEMS
+
+
+@pytest.mark.parametrize("path", ["/small", "/image"])
+def test_small_and_incompressible_responses_pass_through(path):
+    response = get(path, **{"accept-encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+
+def test_streamed_response_is_compressed_as_it_goes():
+    response = get("/stream", **{"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line) for line in response.text.splitlines()] == ITEMS
+
+
+def test_no_accept_encoding_leaves_responses_alone():
+    response = get("/json", **{"accept-encoding": ""})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Origin"
+    assert response.json() == ITEMS
@@ -0,0 +1,29 @@
+import math
+
+import pytest
+from pydantic import ValidationError
+
+import fares
+from models import TaxiOrderCreate
+
+ALMATY = (43.2389, 76.8897)
+
+
+def order(from_lat, from_lng=76.9, to_lat=43.3, to_lng=76.95):
+    return {"from_lat": from_lat, "from_lng": from_lng, "to_lat": to_lat, "to_lng": to_lng}
+
+
+def test_non_finite_coordinates_give_no_estimate():
+    orders = fares.annotate([order(math.nan), order(43.2), order(math.inf)], *ALMATY)
+
+    for bad in (orders[0], orders[2]):
+        assert [bad[k] for k in ("distance_km", "duration_minutes", "fare", "pickup_km", "pickup_minutes")] == [None] * 5
+    assert orders[1]["fare"] > 0
+    assert isinstance(orders[1]["fare"], int)
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", "90.5"])
+def test_order_coordinates_are_bounded(value):
+    body = f'{{"from_location": "a", "to_location": "b", "from_lat": {value}, "from_lng": 1, "to_lat": 1, "to_lng": 1}}'
+    with pytest.raises(ValidationError):
+        TaxiOrderCreate.model_validate_json(body)
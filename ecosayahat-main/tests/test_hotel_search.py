@@ -0,0 +1,49 @@
+import pytest
+
+from hotel_search import HotelSearch
+
+
+class FakeCatalog:
+    def __init__(self, hotels, version=1):
+        self.hotels = hotels
+        self.version = version
+
+
+def make_search():
+    hotels = [
+        {"id": f"h{i:02d}", "name": f"Hotel {i}", "region_id": "almaty" if i % 2 else "shymkent",
+         "price_per_night": 10000 + 1000 * i, "rating": 3 + (i % 3), "is_partner": i % 4 == 0}
+        for i in range(20)
+    ]
+    return HotelSearch(FakeCatalog(hotels))
+
+
+def test_cursor_pages_through_the_same_search():
+    search = make_search()
+    seen, cursor = [], None
+    while True:
+        result = search.search(region_id="almaty", sort="-rating", limit=3, cursor=cursor)
+        seen += [h["id"] for h in result["items"]]
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [h["id"] for h in search.search(region_id="almaty", sort="-rating", limit=100)["items"]]
+
+
+@pytest.mark.parametrize("changed", [{"region_id": "shymkent"}, {"sort": "price"}, {"min_price": 15000}, {"is_partner": True}])
+def test_cursor_from_another_search_is_refused(changed):
+    search = make_search()
+    query = {"region_id": "almaty", "sort": "-rating", "limit": 3}
+    cursor = search.search(**query)["next_cursor"]
+
+    with pytest.raises(ValueError, match="other filters or sort"):
+        search.search(**{**query, **changed, "cursor": cursor})
+
+
+def test_cursor_from_an_older_catalog_is_refused():
+    search = make_search()
+    cursor = search.search(limit=3)["next_cursor"]
+    search.catalog.version += 1
+
+    with pytest.raises(ValueError, match="expired"):
+        search.search(limit=3, cursor=cursor)
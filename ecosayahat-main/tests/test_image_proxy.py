@@ -0,0 +1,96 @@
+import asyncio
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from image_proxy import DiskLRU, ImageProxy, ImageProxyError
+
+URL = "https://img.test/hotel.jpg"
+TIMEOUT = 2
+
+
+def jpeg(width=400, height=300) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (30, 120, 60)).save(out, "JPEG")
+    return out.getvalue()
+
+
+class FakeFetch:
+    """Stands in for the source host: answers every fetch with ``data`` or raises ``error`` after ``delay``."""
+
+    def __init__(self, data=b"", error=None, delay=0.0):
+        self.data = data
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, url):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.data
+
+
+def make_proxy(tmp_path, fetch):
+    proxy = ImageProxy(cache_dir=str(tmp_path), max_bytes=10 * 1024 * 1024, allowed_hosts={"img.test"})
+    proxy._fetch = fetch
+    return proxy
+
+
+def test_cancelled_first_caller_leaves_the_fetch_to_the_others(tmp_path):
+    fetch = FakeFetch(jpeg(), delay=0.05)
+    proxy = make_proxy(tmp_path, fetch)
+
+    async def run():
+        waiters = [asyncio.create_task(proxy.variant(URL, 160, "webp")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        return await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), TIMEOUT)
+
+    first, *rest = asyncio.run(run())
+    assert isinstance(first, asyncio.CancelledError)
+    for data, media_type in rest:
+        assert media_type == "image/webp"
+        assert Image.open(io.BytesIO(data)).width == 160
+    assert fetch.calls == 1
+
+
+def test_fetch_error_reaches_every_waiter(tmp_path):
+    proxy = make_proxy(tmp_path, FakeFetch(error=ImageProxyError(502, "Source answered 404"), delay=0.02))
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            *(proxy.variant(URL, 320, "jpeg") for _ in range(3)), return_exceptions=True), TIMEOUT)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ImageProxyError) and r.status_code == 502 for r in results)
+    assert proxy._inflight == {}
+
+
+def test_variant_evicted_by_another_worker_is_a_miss(tmp_path):
+    fetch = FakeFetch(jpeg())
+    proxy = make_proxy(tmp_path, fetch)
+
+    async def run():
+        first = await proxy.variant(URL, 320, "jpeg")
+        for name in os.listdir(tmp_path):
+            if not name.startswith("."):
+                os.unlink(tmp_path / name)
+        return first, await proxy.variant(URL, 320, "jpeg")
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert fetch.calls == 2
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_cache_cap_holds_across_workers_sharing_a_directory(tmp_path, workers):
+    caches = [DiskLRU(str(tmp_path), 100_000) for _ in range(workers)]
+    for i in range(40):
+        caches[i % workers].put(f"k{i}", b"x" * 10_000)
+
+    stored = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path) if not name.startswith("."))
+    assert stored <= 100_000
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from inventory import InventoryStore, stay_nights
+
+TODAY = date(2026, 7, 10)
+
+
+def test_stay_from_today_lists_every_night():
+    assert stay_nights("2026-07-10", "2026-07-13", today=TODAY) == ["2026-07-10", "2026-07-11", "2026-07-12"]
+
+
+@pytest.mark.parametrize("check_in, check_out, error", [
+    ("2026-07-09", "2026-07-11", "in the past"),
+    ("2026-07-12", "2026-07-12", "after check-in"),
+    ("2026-07-12", "2026-09-12", "limited to"),
+    ("12.07.2026", "2026-07-13", "YYYY-MM-DD"),
+])
+def test_invalid_stays_are_refused(check_in, check_out, error):
+    with pytest.raises(ValueError, match=error):
+        stay_nights(check_in, check_out, today=TODAY)
+
+
+class FakeInventoryCollection:
+    """Just the operations InventoryStore issues, with a yield before each write so reservations interleave."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            await asyncio.sleep(0)
+            doc_id = request._filter["_id"]
+            if doc_id not in self.docs:
+                self.docs[doc_id] = {"_id": doc_id, **request._doc["$setOnInsert"]}
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        doc = self.docs.get(query["_id"])
+        matched = doc is not None and doc["available"] >= query["available"]["$gte"]
+        if matched:
+            doc["available"] += update["$inc"]["available"]
+        return SimpleNamespace(modified_count=int(matched))
+
+    async def update_many(self, query, update):
+        await asyncio.sleep(0)
+        for doc_id in query["_id"]["$in"]:
+            self.docs[doc_id]["available"] += update["$inc"]["available"]
+
+    async def find(self, query, projection=None):
+        for doc_id in query["_id"]["$in"]:
+            if doc_id in self.docs:
+                yield self.docs[doc_id]
+
+
+HOTEL = {"id": "hotel-1", "rooms": 2}
+NIGHTS = ["2026-07-10", "2026-07-11", "2026-07-12"]
+
+
+def available(store):
+    return {doc["date"]: doc["available"] for doc in store.collection.docs.values()}
+
+
+def test_full_night_rolls_back_the_rest_of_the_stay():
+    store = InventoryStore(FakeInventoryCollection())
+
+    async def run():
+        assert await store.reserve(HOTEL, NIGHTS[1:2], 2)
+        return await store.reserve(HOTEL, NIGHTS, 1)
+
+    assert asyncio.run(run()) is False
+    assert available(store) == {"2026-07-10": 2, "2026-07-11": 0, "2026-07-12": 2}
+
+
+def test_concurrent_stays_never_oversell_a_shared_night():
+    store = InventoryStore(FakeInventoryCollection())
+    hotel = {"id": "hotel-1", "rooms": 1}
+
+    async def run():
+        return await asyncio.gather(store.reserve(hotel, NIGHTS[:2], 1), store.reserve(hotel, NIGHTS[1:], 1))
+
+    results = asyncio.run(run())
+    assert sorted(results) == [False, True]
+    assert min(available(store).values()) == 0
+    # Only the winner's two nights stay taken; the loser's other night was given back
+    assert sorted(available(store).values()) == [0, 0, 1]
+
+
+def test_availability_is_the_tightest_night_of_the_stay():
+    store = InventoryStore(FakeInventoryCollection())
+
+    async def run():
+        await store.reserve(HOTEL, NIGHTS[2:], 1)
+        return await store.availability([HOTEL, {"id": "hotel-2", "rooms": 5}], NIGHTS)
+
+    assert asyncio.run(run()) == {"hotel-1": 1, "hotel-2": 5}
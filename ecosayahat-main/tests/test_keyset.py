@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ids import NEWEST_FIRST, is_uuid7, keyset_filter, uuid7
+from migrations import IdMigration, created_at_ms
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+PAGE = 4
+
+
+def review(minute: int, legacy: bool) -> dict:
+    created_at = (START + timedelta(minutes=minute)).isoformat()
+    doc_id = str(uuid.uuid4()) if legacy else uuid7(created_at_ms(created_at))
+    return {"id": doc_id, "attraction_id": "a1", "status": "approved", "created_at": created_at, "minute": minute}
+
+
+def reviews():
+    # Old uuid4 reviews before and after new uuid7 ones, with several sharing a created_at
+    docs = [review(minute, legacy=minute < 6 or minute % 5 == 0) for minute in range(16)]
+    docs += [review(minute, legacy=True) for minute in (3, 3, 9, 12)]
+    docs += [review(12, legacy=False)]
+    return docs
+
+
+async def page(collection, before):
+    query = await keyset_filter(collection, {"attraction_id": "a1", "status": "approved"}, before)
+    return await collection.find(query, {"_id": 0}).sort(NEWEST_FIRST).limit(PAGE).to_list(PAGE)
+
+
+def collect(migrate_after_page=None, use_legacy_cursor=False):
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        await db.reviews.insert_many(reviews())
+        migration = IdMigration(db, collections=("reviews",), batch_size=8, pause_ms=0)
+        seen, before, pages = [], None, 0
+        while True:
+            items = await page(db.reviews, before)
+            if not items:
+                return seen
+            pages += 1
+            # Items are identified by their original id, which survives the migration as legacy_id
+            seen += [(item["minute"], item.get("legacy_id", item["id"])) for item in items]
+            if pages == migrate_after_page:
+                _, after = await migration._migrate_batch("reviews", None)
+                await migration._migrate_batch("reviews", after)
+            last = items[-1]
+            # An old client may still hold the pre-migration id it was shown
+            before = last.get("legacy_id", last["id"]) if use_legacy_cursor else last["id"]
+
+    return asyncio.run(run())
+
+
+def test_pages_of_mixed_ids_run_newest_first_without_gaps_or_repeats():
+    seen = collect()
+
+    assert len(seen) == len(set(seen)) == len(reviews())
+    assert [minute for minute, _ in seen] == sorted((doc["minute"] for doc in reviews()), reverse=True)
+
+
+@pytest.mark.parametrize("use_legacy_cursor", [False, True])
+def test_migration_between_pages_keeps_the_listing(use_legacy_cursor):
+    expected = collect()
+    seen = collect(migrate_after_page=2, use_legacy_cursor=use_legacy_cursor)
+
+    assert [minute for minute, _ in seen] == [minute for minute, _ in expected]
+    assert len(set(seen)) == len(reviews())
+
+
+def test_unknown_before_is_refused():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        await db.reviews.insert_many(reviews())
+        await keyset_filter(db.reviews, {}, str(uuid.uuid4()))
+
+    with pytest.raises(ValueError, match="Unknown"):
+        asyncio.run(run())
+
+
+def test_legacy_ids_are_told_apart_from_uuid7():
+    assert is_uuid7(uuid7())
+    assert not is_uuid7(str(uuid.uuid4()))
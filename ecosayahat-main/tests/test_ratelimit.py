@@ -0,0 +1,92 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import ratelimit
+from metrics import MetricsMiddleware, registry
+from ratelimit import MemoryBucketStore, RateLimitMiddleware, RatePolicy, client_ip
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_the_policy_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    store = MemoryBucketStore()
+
+    def take():
+        return asyncio.run(store.take("login:ip:1.2.3.4", rate=1.0, burst=2))
+
+    assert [take(), take()] == [0.0, 0.0]
+    assert take() == pytest.approx(1.0)
+    clock.now += 0.5
+    assert take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert take() == 0.0
+    # Idle time refills up to the burst, not beyond
+    clock.now += 60
+    assert [take(), take()] == [0.0, 0.0]
+    assert take() > 0
+
+
+def sample(name: str, **labels) -> float:
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}\{{{re.escape(selector)}\}} (\S+)$", registry.render(), re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_rejected_requests_are_counted_under_their_route(monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    app = FastAPI()
+
+    @app.post("/api/test/login")
+    async def login():
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, store=MemoryBucketStore(),
+                       policies=[RatePolicy("test_login", "POST", r"/api/test/login", per_minute=1, burst=2, key="ip")])
+    app.add_middleware(MetricsMiddleware)
+
+    labels = {"method": "POST", "route": "/api/test/login"}
+    before = {status: sample("http_request_duration_seconds_count", **labels, status=status) for status in ("200", "429")}
+    rejected_before = sample("rate_limited_requests_total", policy="test_login")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.post("/api/test/login") for _ in range(3)]
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].headers["retry-after"] == "60"
+    assert sample("http_request_duration_seconds_count", **labels, status="200") == before["200"] + 2
+    assert sample("http_request_duration_seconds_count", **labels, status="429") == before["429"] + 1
+    assert sample("rate_limited_requests_total", policy="test_login") == rejected_before + 1
+
+
+def scope(forwarded_for=None, peer="10.0.0.9"):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return {"type": "http", "headers": headers, "client": (peer, 50000)}
+
+
+@pytest.mark.parametrize("forwarded_for, trust_proxy, hops, expected", [
+    # Without a trusted proxy the header is the client's word and is ignored
+    ("6.6.6.6", False, 1, "10.0.0.9"),
+    (None, True, 1, "10.0.0.9"),
+    ("203.0.113.7", True, 1, "203.0.113.7"),
+    # Entries a client sends itself sit left of the one the proxy appends
+    ("6.6.6.6, 203.0.113.7", True, 1, "203.0.113.7"),
+    ("6.6.6.6, 203.0.113.7, 10.1.0.4", True, 2, "203.0.113.7"),
+    ("203.0.113.7", True, 2, "10.0.0.9"),
+    (" , ", True, 1, "10.0.0.9"),
+])
+def test_client_ip_takes_the_entry_added_by_the_trusted_proxy(forwarded_for, trust_proxy, hops, expected):
+    assert client_ip(scope(forwarded_for), trust_proxy=trust_proxy, hops=hops) == expected
@@ -0,0 +1,30 @@
+import fcntl
+import os
+
+from snapshot import remove_stale
+
+
+def snapshot_dir(parent, name, held=False):
+    path = parent / name
+    path.mkdir()
+    (path / "catalog-1.snap").write_bytes(b"x")
+    if held:
+        fd = os.open(path / "alive.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        return fd
+    return None
+
+
+def test_only_abandoned_directories_of_the_same_database_are_removed(tmp_path):
+    snapshot_dir(tmp_path, "eco.100-5")
+    snapshot_dir(tmp_path, "eco.nightly")
+    held = snapshot_dir(tmp_path, "eco.200-7", held=True)
+    snapshot_dir(tmp_path, "eco.300-9")
+    snapshot_dir(tmp_path, "eco-staging.100-5")
+    snapshot_dir(tmp_path, "eco-100-5")
+    try:
+        remove_stale(str(tmp_path), "eco", keep=str(tmp_path / "eco.300-9"))
+    finally:
+        os.close(held)
+
+    assert sorted(os.listdir(tmp_path)) == ["eco-100-5", "eco-staging.100-5", "eco.200-7", "eco.300-9"]
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from verification import BatchVerifier
+
+TASKS = [
+    {"title_en": f"Task {i}", "description_en": f"Do thing {i}"}
+    for i in range(1, 4)
+]
+# Unresolved futures would otherwise hang the test instead of failing it
+TIMEOUT = 2
+
+
+class FakeSend:
+    """Stands in for the LLM: answers batches with ``batch_answer`` and single images by their name."""
+
+    def __init__(self, batch_answer="", error=None, delay=0.0):
+        self.batch_answer = batch_answer
+        self.error = error
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, text, images):
+        self.calls.append(list(images))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if len(images) > 1:
+            return self.batch_answer
+        return "VERIFIED" if images[0].startswith("good") else "REJECTED"
+
+
+def verify_all(verifier, images, tasks=TASKS):
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            *(verifier.verify(task, image) for task, image in zip(tasks, images)), return_exceptions=True), TIMEOUT)
+
+    return asyncio.run(run())
+
+
+def test_batch_answer_decides_every_submission_in_one_call():
+    send = FakeSend("1: VERIFIED\n2: REJECTED\n3: VERIFIED")
+    verifier = BatchVerifier(send, window_ms=50, max_items=3)
+
+    assert verify_all(verifier, ["a", "b", "c"]) == [True, False, True]
+    assert send.calls == [["a", "b", "c"]]
+
+
+def test_unparseable_batch_answer_falls_back_to_one_call_per_image():
+    send = FakeSend("All of the images look fine to me.")
+    verifier = BatchVerifier(send, window_ms=50, max_items=3)
+
+    assert verify_all(verifier, ["good-1", "bad-2", "good-3"]) == [True, False, True]
+    assert send.calls[0] == ["good-1", "bad-2", "good-3"]
+    assert sorted(send.calls[1:]) == [["bad-2"], ["good-1"], ["good-3"]]
+
+
+def test_provider_failure_fails_the_batch_without_retrying_per_image():
+    error = RuntimeError("provider down")
+    send = FakeSend(error=error)
+    verifier = BatchVerifier(send, window_ms=50, max_items=3)
+
+    assert verify_all(verifier, ["a", "b", "c"]) == [error, error, error]
+    assert len(send.calls) == 1
+
+
+def test_cancelled_waiter_does_not_block_the_rest_of_its_batch():
+    send = FakeSend("1: VERIFIED\n2: REJECTED\n3: VERIFIED", delay=0.05)
+    verifier = BatchVerifier(send, window_ms=10, max_items=3)
+
+    async def run():
+        waiters = [asyncio.create_task(verifier.verify(task, image)) for task, image in zip(TASKS, "abc")]
+        await asyncio.sleep(0.03)
+        waiters[0].cancel()
+        return await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), TIMEOUT)
+
+    first, *rest = asyncio.run(run())
+    assert isinstance(first, asyncio.CancelledError)
+    assert rest == [False, True]
+
+
+@pytest.mark.parametrize("error", [None, RuntimeError("provider down")])
+def test_flush_completes_cleanly_after_its_only_waiter_is_cancelled(error):
+    send = FakeSend(error=error, delay=0.05)
+    verifier = BatchVerifier(send, window_ms=10, max_items=3)
+
+    async def run():
+        waiter = asyncio.create_task(verifier.verify(TASKS[0], "good"))
+        await asyncio.sleep(0.03)
+        flushes = list(verifier._flushes)
+        waiter.cancel()
+        await asyncio.wait_for(asyncio.gather(*flushes), TIMEOUT)
+
+    asyncio.run(run())